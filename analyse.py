@@ -1,5 +1,37 @@
-from habit import Habit
+import heapq
+from datetime import datetime, timedelta
 from db import Database
+from periods import period_index
+from profiling import profiled
+
+ROLLING_WINDOWS = (7, 30, 90) # Days of the rolling completion rates
+
+
+def add_to_leaderboard(board, kind, habit_id, name, streak, top_k):
+    """
+    Adds the streak of a habit to one ranking of a leaderboard, used by Analyse.get_leaderboard
+    and by the workers of parallel.parallel_leaderboard.
+
+    :param board: The rankings of one periodicity, a min-heap of (streak, -habit_id, name) entries
+        under kind and a (names, streak) tuple of the leaders under kind + '_leaders'.
+    :param kind: 'current' or 'longest'.
+    :param habit_id: The ID of the habit, habits must be added in ascending ID order.
+    :param name: The name of the habit.
+    :param streak: The length of the streak.
+    :param top_k: The number of entries to keep in the heap.
+    """
+    # Keep the top_k entries in a min-heap, older habits win ties.
+    entry = (streak, -habit_id, name)
+    if len(board[kind]) < top_k:
+        heapq.heappush(board[kind], entry)
+    elif top_k and entry > board[kind][0]:
+        heapq.heapreplace(board[kind], entry)
+
+    leaders, longest_streak = board[kind + "_leaders"]
+    if streak > longest_streak:
+        board[kind + "_leaders"] = ([name], streak) # Reset list with this habit
+    elif streak == longest_streak:
+        leaders.append(name) # Add habit to the list
 
 
 class Analyse:
@@ -7,32 +39,27 @@ class Analyse:
         """Initialize the Analyse class with a Database instance."""
         self.db = db
 
+    @profiled
     def get_all_stored_habits(self):
         """Retrieve a list of all stored habit names, regardless of their checkoff dates"""
-        habits = self.db.get_all_habits()
-        all_habits = [habit['name'] for habit in habits]
-        return all_habits
+        return self.db.get_habit_names()
 
+    @profiled
     def get_all_checked_off_habits(self):
         """Retrieve a list of habit names that have at least one tracked checkoff date."""
-        habits = self.db.get_all_habits()
-        tracked_habits = [habit['name'] for habit in habits if habit['checkoff_dates']]
-        return tracked_habits
+        return self.db.get_habit_names(checked_off=True)
 
+    @profiled
     def get_habits_by_periodicity(self, periodicity):
         """Retrieve two lists of habit names based on the specified periodicity:
         - One list contains habits with checkoff dates.
         - The other list contains habits without checkoff dates.
         """
-        habits = self.db.get_all_habits()
-
-        with_checkoff = [habit['name'] for habit in habits if habit['periodicity'] == periodicity
-                         and habit['checkoff_dates']]
-        without_checkoff = [habit['name'] for habit in habits if habit['periodicity'] == periodicity
-                            and not habit['checkoff_dates']]
-
+        with_checkoff = self.db.get_habit_names(periodicity, checked_off=True)
+        without_checkoff = self.db.get_habit_names(periodicity, checked_off=False)
         return with_checkoff, without_checkoff
 
+    @profiled
     def get_longest_streak_daily(self):
         """Calculate the longest streak among all daily habits.
 
@@ -40,28 +67,9 @@ class Analyse:
          - A list of habit names that have the longest streak.
          - The length of the longest streak.
         """
-        habits = self.db.get_all_habits()
-        longest_streak = 0
-        habit_with_longest_streak = []
-
-        for habit_data in habits:
-            if habit_data["periodicity"] != "daily":
-                continue # Means: Skip non-daily habits
-
-            checkoff_dates = self.db.get_all_checkoff_dates(habit_data["id"])
-            habit = Habit(habit_data["name"], habit_data["description"], habit_data["periodicity"])
-            habit.checkoff_dates = checkoff_dates
-
-            streak = habit.streak() # Calculate the current streak
-
-            if streak > longest_streak:
-                longest_streak = streak
-                habit_with_longest_streak = [habit_data["name"]] # Reset list with this habit
-            elif streak == longest_streak:
-                habit_with_longest_streak.append(habit_data["name"]) # Add habit to the list
-
-        return habit_with_longest_streak, longest_streak
+        return self.get_longest_current_streak("daily")
 
+    @profiled
     def get_longest_streak_weekly(self):
         """Calculate the longest streak among all weekly habits.
 
@@ -69,28 +77,49 @@ class Analyse:
          - A list of habit names that have the longest streak.
          - The length of the longest streak.
         """
-        habits = self.db.get_all_habits()
-        longest_streak = 0
-        habit_with_longest_streak = []
+        return self.get_longest_current_streak("weekly")
 
-        for habit_data in habits:
-            if habit_data["periodicity"] != "weekly":
-                continue  # Means: Skip non-weekly habits
+    @profiled
+    def get_longest_current_streak(self, periodicity):
+        """Find the habits of a periodicity with the longest current streak.
 
-            checkoff_dates = self.db.get_all_checkoff_dates(habit_data["id"])
-            habit = Habit(habit_data["name"], habit_data["description"], habit_data["periodicity"])
-            habit.checkoff_dates = checkoff_dates
+        Returns a tuple containing:
+         - A list of habit names that have the longest streak.
+         - The length of the longest streak.
+        """
+        leaderboard = self.get_leaderboard(top_k=0)
+        if periodicity not in leaderboard:
+            return [], 0 # No habits with this periodicity
+        return leaderboard[periodicity]["current_leaders"]
+
+    @profiled
+    def get_leaderboard(self, top_k=3):
+        """Rank the habits of every periodicity by current and by longest streak in a single pass
+        over the cached streaks.
+
+        Returns a dictionary keyed by periodicity, each value containing:
+         - 'current': A list of up to top_k (habit name, streak) tuples with the best current streaks.
+         - 'longest': The same for the longest streaks in the whole history.
+         - 'current_leaders' and 'longest_leaders': A tuple of all habit names sharing the best streak
+           and the length of that streak.
+        Equal streaks are ranked by habit ID, so the result is deterministic.
+        """
+        leaderboard = {}
 
-            streak = habit.streak()  # Calculate the current streak
+        for habit_data in self.db.iter_streaks():
+            board = leaderboard.setdefault(habit_data["periodicity"], {
+                "current": [], "longest": [], "current_leaders": ([], 0), "longest_leaders": ([], 0)})
 
-            if streak > longest_streak:
-                longest_streak = streak
-                habit_with_longest_streak = [habit_data["name"]]  # Reset list with this habit
-            elif streak == longest_streak:
-                habit_with_longest_streak.append(habit_data["name"])  # Add habit to the list
+            for kind in ("current", "longest"):
+                add_to_leaderboard(board, kind, habit_data["id"], habit_data["name"], habit_data[kind + "_streak"],
+                                   top_k)
 
-        return habit_with_longest_streak, longest_streak
+        for board in leaderboard.values():
+            for kind in ("current", "longest"):
+                board[kind] = [(name, streak) for streak, _, name in sorted(board[kind], reverse=True)]
+        return leaderboard
 
+    @profiled
     def get_longest_streak_by_name(self, habit_name):
         """Calculate the longest streak for a specific habit identified by its name.
 
@@ -102,12 +131,84 @@ class Analyse:
         if habit_id is None:
             return None, 0 # Habit not found
 
-        checkoff_dates = self.db.get_all_checkoff_dates(habit_id)
-        habit_data = self.db.conn.execute("SELECT name, description, periodicity FROM habits WHERE id = ?",
-                                          (habit_id,)).fetchone()
-        if not habit_data:
+        streak_state = self.db.get_streak_state(habit_id)
+        if streak_state is None:
             return None, 0 # Habit not found
 
-        habit = Habit(habit_data[0], habit_data[1],habit_data[2])
-        habit.checkoff_dates = checkoff_dates
-        return habit_name, habit.streak() # Return the habit name and its streak
\ No newline at end of file
+        return habit_name, streak_state.longest # Return the habit name and its longest streak
+
+    @profiled
+    def get_completion_rates(self, start=None, end=None):
+        """Calculate the completion rate of every habit in a date window, computed in SQL.
+
+        The expected periods are counted from the habit's creation (or its first checkoff, if that is
+        earlier) or from start, whichever is later, until end.
+
+        Returns a list of dictionaries ordered by ID, each containing:
+         - 'name' and 'periodicity' of the habit.
+         - 'expected': The number of days or weeks the habit should have been checked off.
+         - 'checked_off': The number of these periods that were checked off.
+         - 'rate': checked_off / expected, None if the habit did not exist in the window.
+        """
+        end = end or datetime.now()
+        rates = []
+        for habit_data in self.db.get_completion_counts([(start, end)]):
+            expected, checked_off = habit_data['windows'][0]
+            rates.append({'name': habit_data['name'], 'periodicity': habit_data['periodicity'],
+                          'expected': expected, 'checked_off': checked_off,
+                          'rate': checked_off / expected if expected else None})
+        return rates
+
+    @profiled
+    def get_rolling_completion_rates(self, windows=ROLLING_WINDOWS, end=None):
+        """Calculate the completion rate of every habit over the last days, e.g. 7, 30 and 90,
+        with a single SQL query for all windows.
+
+        Returns a list of dictionaries ordered by ID, each containing the 'name' and 'periodicity'
+        and 'rates', a dictionary {days: rate} with None for habits that did not exist in a window.
+        """
+        end = end or datetime.now()
+        counts = self.db.get_completion_counts([(end - timedelta(days=days - 1), end) for days in windows])
+        return [{'name': habit_data['name'], 'periodicity': habit_data['periodicity'],
+                 'rates': {days: checked_off / expected if expected else None
+                           for days, (expected, checked_off) in zip(windows, habit_data['windows'])}}
+                for habit_data in counts]
+
+    @profiled
+    def get_gap_stats(self, end=None):
+        """Find the gaps (days or weeks without checkoff) in the history of every habit, computed in SQL.
+
+        Returns a list of dictionaries ordered by ID, each containing:
+         - 'name' and 'periodicity' of the habit.
+         - 'gaps': The number of breaks between the first and the last checkoff.
+         - 'longest_gap': The most periods missed in a row, 'mean_gap' the average per break (None without breaks).
+         - 'missed': The total number of missed periods between the first and the last checkoff.
+         - 'since_last': The periods missed since the last checkoff until end, the current period not
+           counted; None without checkoffs.
+        """
+        end = end or datetime.now()
+        stats = []
+        for habit_data in self.db.get_gap_counts():
+            last_period = habit_data['last_period']
+            since_last = None
+            if last_period is not None:
+                since_last = max(0, period_index(end, habit_data['periodicity']) - last_period - 1)
+            stats.append({'name': habit_data['name'], 'periodicity': habit_data['periodicity'],
+                          'gaps': habit_data['gaps'], 'longest_gap': habit_data['longest_gap'],
+                          'mean_gap': habit_data['missed'] / habit_data['gaps'] if habit_data['gaps'] else None,
+                          'missed': habit_data['missed'], 'since_last': since_last})
+        return stats
+
+    @profiled
+    def get_activity(self, periodicity="daily", start=None, end=None):
+        """Retrieve the checkoff activity of all habits per day or ISO week, e.g. for a calendar or heatmap.
+
+        The counts come from the rollups table, so a year of days is 365 rows however many checkoffs there are.
+
+        Returns a list of dictionaries ordered by date, each containing:
+         - 'period' and 'date': The day or week number and its first day.
+         - 'checkoffs': The number of checkoffs of all habits.
+         - 'active_habits': The number of habits checked off.
+         - 'habits_on_streak': The number of habits whose previous day or week was checked off too.
+        """
+        return self.db.get_rollups(periodicity, start, end)
@@ -0,0 +1,54 @@
+from analyse import ROLLING_WINDOWS, Analyse
+
+
+class AsyncAnalyse:
+    """Coroutine versions of the Analyse methods, running on the reader pool of an AsyncDatabase."""
+
+    def __init__(self, async_db):
+        """Initialize the AsyncAnalyse class with an AsyncDatabase instance."""
+        self.async_db = async_db
+        self.analyse = Analyse(async_db.read_db)
+
+    async def get_all_stored_habits(self):
+        """Retrieve a list of all stored habit names."""
+        return await self.async_db.read(self.analyse.get_all_stored_habits)
+
+    async def get_all_checked_off_habits(self):
+        """Retrieve a list of habit names that have at least one tracked checkoff date."""
+        return await self.async_db.read(self.analyse.get_all_checked_off_habits)
+
+    async def get_habits_by_periodicity(self, periodicity):
+        """Retrieve the habit names of a periodicity with and without checkoff dates."""
+        return await self.async_db.read(self.analyse.get_habits_by_periodicity, periodicity)
+
+    async def get_longest_streak_daily(self):
+        """Find the daily habits with the longest current streak."""
+        return await self.async_db.read(self.analyse.get_longest_streak_daily)
+
+    async def get_longest_streak_weekly(self):
+        """Find the weekly habits with the longest current streak."""
+        return await self.async_db.read(self.analyse.get_longest_streak_weekly)
+
+    async def get_leaderboard(self, top_k=3):
+        """Rank the habits of every periodicity by current and by longest streak."""
+        return await self.async_db.read(self.analyse.get_leaderboard, top_k)
+
+    async def get_longest_streak_by_name(self, habit_name):
+        """Calculate the longest streak for a specific habit identified by its name."""
+        return await self.async_db.read(self.analyse.get_longest_streak_by_name, habit_name)
+
+    async def get_completion_rates(self, start=None, end=None):
+        """Calculate the completion rate of every habit in a date window."""
+        return await self.async_db.read(self.analyse.get_completion_rates, start, end)
+
+    async def get_rolling_completion_rates(self, windows=ROLLING_WINDOWS, end=None):
+        """Calculate the completion rate of every habit over the last 7, 30 and 90 days."""
+        return await self.async_db.read(self.analyse.get_rolling_completion_rates, windows, end)
+
+    async def get_gap_stats(self, end=None):
+        """Find the gaps in the history of every habit."""
+        return await self.async_db.read(self.analyse.get_gap_stats, end)
+
+    async def get_activity(self, periodicity="daily", start=None, end=None):
+        """Retrieve the checkoff activity of all habits per day or week."""
+        return await self.async_db.read(self.analyse.get_activity, periodicity, start, end)
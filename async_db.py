@@ -0,0 +1,154 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from db import DEFAULT_PAGE_SIZE, Database
+
+
+class AsyncDatabase:
+    """
+    Coroutine versions of the Database methods for use inside an asyncio event loop.
+
+    Reads run on a bounded pool of reader threads, each with its own read-only connection, and all
+    writes run on a single writer thread, so SQLite never sees two writers of this process at once.
+    A missing cache entry (e.g. a streak or the rollups after a SQL script) is computed by a reader
+    but only saved by the next write. Any number of coroutines can wait on the pools without needing
+    a thread of their own.
+    """
+
+    def __init__(self, db_name='main.db', max_readers=4, **database_options):
+        """
+        Initializes the database (creating and migrating tables) and the thread pools.
+
+        :param db_name: The name of the database file (default is 'main.db').
+        :param max_readers: The maximum number of concurrent read queries.
+        :param database_options: Further arguments for Database, e.g. journal_mode='WAL'.
+        """
+        self.db = Database(db_name, **database_options)
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="habit-writer")
+        if db_name == ":memory:":
+            self.readers = self.writer # An in-memory database has only one shared connection
+            self.read_db = self.db
+        else:
+            self.readers = ThreadPoolExecutor(max_workers=max_readers, thread_name_prefix="habit-reader")
+            self.read_db = Database(db_name, read_only=True, **database_options)
+            # Shared caches: writes invalidate them after the commit, and a reader's entry loaded before an
+            # invalidation is dropped (see LRUCache.put), so readers cannot bring back an old row.
+            self.read_db.habit_cache, self.read_db.name_cache = self.db.habit_cache, self.db.name_cache
+
+    async def read(self, function, *args, **kwargs):
+        """Runs a blocking read function on the reader pool and waits for its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.readers, functools.partial(function, *args, **kwargs))
+
+    async def write(self, function, *args, **kwargs):
+        """Runs a blocking write function on the writer thread and waits for its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.writer, functools.partial(function, *args, **kwargs))
+
+    async def close(self):
+        """Waits for pending queries, then stops the thread pools and closes all connections."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.readers.shutdown)
+        await loop.run_in_executor(None, self.writer.shutdown)
+        self.read_db.close()
+        self.db.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    # Write methods
+    async def add_habit_to_table(self, habit):
+        """Saves a habit in the database and returns its ID."""
+        return await self.write(self.db.add_habit_to_table, habit)
+
+    async def delete_habit_from_table(self, habit_id):
+        """Deletes a habit and its associated checkoff dates."""
+        return await self.write(self.db.delete_habit_from_table, habit_id)
+
+    async def add_streak_to_table(self, habit_id, checkoff_date):
+        """Saves a checkoff date to the tracking table."""
+        return await self.write(self.db.add_streak_to_table, habit_id, checkoff_date)
+
+    async def add_streaks_bulk(self, checkoffs, chunk_size=1000):
+        """Saves many checkoff dates in one transaction and returns the inserted and rejected counts."""
+        return await self.write(self.db.add_streaks_bulk, checkoffs, chunk_size)
+
+    async def update_habit_in_table(self, habit_id, new_name, new_description):
+        """Saves an updated habit name and description."""
+        return await self.write(self.db.update_habit_in_table, habit_id, new_name, new_description)
+
+    async def migrate(self):
+        """Applies all pending schema migrations."""
+        return await self.write(self.db.migrate)
+
+    async def rebuild_rollups(self):
+        """Recomputes the daily and weekly rollups and returns the number of rollup rows."""
+        return await self.write(self.db.rebuild_rollups)
+
+    # Read methods
+    async def get_schema_version(self):
+        """Returns the schema version stored in the database file."""
+        return await self.read(self.read_db.get_schema_version)
+
+    async def check_habit_exists(self, name):
+        """Checks if a habit with the given name already exists."""
+        return await self.read(self.read_db.check_habit_exists, name)
+
+    async def get_all_habits(self):
+        """Retrieves all stored habits along with their checkoff dates."""
+        return await self.read(self.read_db.get_all_habits)
+
+    async def get_all_checkoff_dates(self, habit_id):
+        """Retrieves all stored checkoff dates of a habit."""
+        return await self.read(self.read_db.get_all_checkoff_dates, habit_id)
+
+    async def get_checkoff_dates(self, habit_id, start=None, end=None):
+        """Retrieves the checkoff dates of a habit in a date range."""
+        return await self.read(self.read_db.get_checkoff_dates, habit_id, start, end)
+
+    async def get_checkoffs_page(self, habit_ids=None, start=None, end=None, after=None, limit=DEFAULT_PAGE_SIZE):
+        """Retrieves one page of the checkoffs of several habits in a date range."""
+        return await self.read(self.read_db.get_checkoffs_page, habit_ids, start, end, after, limit)
+
+    async def get_habit_names(self, periodicity=None, checked_off=None):
+        """Retrieves habit names filtered by periodicity and checkoffs."""
+        return await self.read(self.read_db.get_habit_names, periodicity, checked_off)
+
+    async def get_habit(self, habit_id):
+        """Retrieves a stored habit as a Habit object."""
+        return await self.read(self.read_db.get_habit, habit_id)
+
+    async def get_streak_state(self, habit_id):
+        """Retrieves the cached streak state of a habit."""
+        return await self.read(self.read_db.get_streak_state, habit_id)
+
+    async def get_all_streaks(self):
+        """Retrieves the cached current and longest streak of all habits."""
+        return await self.read(self.read_db.get_all_streaks)
+
+    async def get_habit_id(self, name):
+        """Retrieves the ID of a stored habit by name."""
+        return await self.read(self.read_db.get_habit_id, name)
+
+    async def get_habit_info(self, habit_id):
+        """Retrieves the metadata of a habit without its checkoff dates."""
+        return await self.read(self.read_db.get_habit_info, habit_id)
+
+    async def get_completion_counts(self, windows):
+        """Counts the expected and the checked off periods of every habit in date windows."""
+        return await self.read(self.read_db.get_completion_counts, windows)
+
+    async def get_gap_counts(self):
+        """Finds the gaps between consecutive checkoffs of every habit."""
+        return await self.read(self.read_db.get_gap_counts)
+
+    async def get_rollups(self, periodicity="daily", start=None, end=None):
+        """Retrieves the checkoff counts of all habits per day or per ISO week."""
+        return await self.read(self.read_db.get_rollups, periodicity, start, end)
+
+    async def cache_info(self):
+        """Returns the hit and miss counters of the habit metadata and name caches."""
+        return self.db.cache_info()
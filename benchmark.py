@@ -0,0 +1,296 @@
+"""
+Benchmarks for db.py, analyse.py and habit.py on synthetic habit stores.
+
+Example:
+    python benchmark.py --habits 10000 --checkoffs 1000000 --save-baseline baseline.json
+    python benchmark.py --habits 10000 --checkoffs 1000000 --baseline baseline.json
+
+The startup cases run main.py in a new interpreter, so they include the import time.
+With --baseline, the run fails (exit code 1) if any median latency regressed by more than the tolerance.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from analyse import Analyse
+from db import Database
+from habit import Habit
+
+try: # Not available on Windows
+    import resource
+except ImportError:
+    resource = None
+
+START_DATE = datetime(2020, 1, 6) # A Monday, the first possible checkoff of the synthetic habits
+
+
+def generate_store(db_name, habits=1000, checkoffs=100000, weekly_share=0.3, continue_probability=0.85,
+                   seed=42, chunk_size=10000):
+    """
+    Creates a database filled with synthetic habits and checkoff histories.
+
+    The checkoffs are spread evenly over the habits. After each checkoff the next one follows in the
+    next period with continue_probability, otherwise after a geometrically distributed gap, which
+    gives runs of realistic, varying lengths.
+
+    :param db_name: The name of the database file to create.
+    :param habits: The number of habits.
+    :param checkoffs: The total number of checkoffs.
+    :param weekly_share: The share of weekly habits.
+    :param continue_probability: The probability that a streak continues in the next period.
+    :param seed: The seed of the random generator, the same seed creates the same store.
+    :param chunk_size: The number of rows per executemany call.
+    :return: The Database instance of the new store.
+    """
+    generator = random.Random(seed)
+    db = Database(db_name, journal_mode="WAL", synchronous="NORMAL")
+    periodicities = ["weekly" if generator.random() < weekly_share else "daily" for _ in range(habits)]
+    creation_date = START_DATE.strftime("%Y-%m-%d %H:%M:%S")
+    db.conn.executemany("INSERT INTO habits (name, description, periodicity, creation_date) VALUES (?, ?, ?, ?)",
+                        ((f"Habit {i}", f"Synthetic habit {i}", periodicity, creation_date)
+                         for i, periodicity in enumerate(periodicities, start=1)))
+    db.conn.execute("INSERT INTO streaks (habit_id) SELECT id FROM habits") # Empty streak state per habit
+    db.conn.commit()
+
+    def generate_checkoffs():
+        per_habit, remainder = divmod(checkoffs, habits)
+        for habit_id, periodicity in enumerate(periodicities, start=1):
+            step = timedelta(weeks=1) if periodicity == "weekly" else timedelta(days=1)
+            date = START_DATE + timedelta(hours=generator.randrange(6, 22))
+            for _ in range(per_habit + (habit_id <= remainder)):
+                yield habit_id, date
+                gap = 1
+                while generator.random() > continue_probability:
+                    gap += 1 # Missed periods break the streak
+                date += gap * step
+
+    db.add_streaks_bulk(generate_checkoffs(), chunk_size=chunk_size)
+    return db
+
+
+def percentile(sorted_values, fraction):
+    """Returns the nearest-rank percentile of an ascending list."""
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def peak_rss_kib():
+    """Returns the peak resident set size of this process in KiB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak # macOS reports bytes, Linux KiB
+
+
+def time_case(function, repeat):
+    """
+    Runs a function repeat times and measures each call.
+
+    :param function: The function to call without arguments.
+    :param repeat: The number of calls.
+    :return: A dictionary with the runs, ops_per_sec, mean/p50/p95/p99 latency in ms and peak_rss_kib.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+
+    durations.sort()
+    total = sum(durations)
+    return {
+        'runs': repeat,
+        'ops_per_sec': repeat / total if total else float("inf"),
+        'mean_ms': total / repeat * 1000,
+        'p50_ms': percentile(durations, 0.50) * 1000,
+        'p95_ms': percentile(durations, 0.95) * 1000,
+        'p99_ms': percentile(durations, 0.99) * 1000,
+        'peak_rss_kib': peak_rss_kib()
+    }
+
+
+def build_cases(db):
+    """
+    Creates the benchmark cases for every public Database and Analyse method and Habit.streak.
+
+    :param db: A Database created by generate_store.
+    :return: A list of (name, function) tuples, run in this order.
+    """
+    analyse = Analyse(db)
+    habit_count = db.conn.execute("SELECT COUNT(*) FROM habits").fetchone()[0]
+    busiest_id = db.conn.execute("SELECT habit_id FROM tracking GROUP BY habit_id "
+                                 "ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+    busiest_name = db.get_habit_info(busiest_id)['name']
+    busiest = db.get_habit(busiest_id)
+    busiest_dates = list(busiest.checkoff_dates)
+    generator = random.Random(0)
+    added_ids = []
+    counter = iter(range(1, 10 ** 9))
+
+    def random_name():
+        return f"Habit {generator.randint(1, habit_count)}"
+
+    def random_id():
+        return generator.randint(1, habit_count)
+
+    def add_habit():
+        added_ids.append(db.add_habit_to_table(Habit(f"Benchmark habit {next(counter)}", "", "daily")))
+
+    def add_streak():
+        db.add_streak_to_table(added_ids[0], START_DATE + timedelta(days=next(counter)))
+
+    def add_streaks_bulk():
+        first = next(counter) * 100
+        db.add_streaks_bulk((added_ids[0], START_DATE + timedelta(days=first + day)) for day in range(100))
+
+    def full_streak():
+        busiest.checkoff_dates = busiest_dates # Drops the cached streak, so it is computed from scratch
+        return busiest.streak()
+
+    return [
+        ("Database.check_habit_exists", lambda: db.check_habit_exists(random_name())),
+        ("Database.get_habit_id", lambda: db.get_habit_id(random_name())),
+        ("Database.get_habit_info", lambda: db.get_habit_info(random_id())),
+        ("Database.get_habit", lambda: db.get_habit(random_id())),
+        ("Database.get_all_checkoff_dates", lambda: db.get_all_checkoff_dates(random_id())),
+        ("Database.get_streak_state", lambda: db.get_streak_state(random_id())),
+        ("Database.get_habit_names", lambda: db.get_habit_names("daily", checked_off=True)),
+        ("Database.get_all_habits", db.get_all_habits),
+        ("Database.iter_habits", lambda: sum(1 for _ in db.iter_habits(include_checkoffs=True))),
+        ("Database.iter_checkoffs", lambda: sum(1 for _ in db.iter_checkoffs())),
+        ("Database.get_all_streaks", db.get_all_streaks),
+        ("Database.get_checkoffs_page",
+         lambda: db.get_checkoffs_page(start=START_DATE + timedelta(days=30), end=START_DATE + timedelta(days=60))),
+        ("Database.add_habit_to_table", add_habit),
+        ("Database.add_streak_to_table", add_streak),
+        ("Database.add_streaks_bulk (100 rows)", add_streaks_bulk),
+        ("Database.update_habit_in_table",
+         lambda: db.update_habit_in_table(added_ids[-1], f"Benchmark habit {next(counter)}", "Renamed")),
+        ("Database.delete_habit_from_table", lambda: db.delete_habit_from_table(added_ids.pop())),
+        ("Analyse.get_all_stored_habits", analyse.get_all_stored_habits),
+        ("Analyse.get_all_checked_off_habits", analyse.get_all_checked_off_habits),
+        ("Analyse.get_habits_by_periodicity", lambda: analyse.get_habits_by_periodicity("weekly")),
+        ("Analyse.get_longest_streak_daily", analyse.get_longest_streak_daily),
+        ("Analyse.get_longest_streak_weekly", analyse.get_longest_streak_weekly),
+        ("Analyse.get_leaderboard", analyse.get_leaderboard),
+        ("Analyse.get_longest_streak_by_name", lambda: analyse.get_longest_streak_by_name(busiest_name)),
+        ("Analyse.get_completion_rates", analyse.get_completion_rates),
+        ("Analyse.get_rolling_completion_rates", analyse.get_rolling_completion_rates),
+        ("Analyse.get_gap_stats", analyse.get_gap_stats),
+        ("Analyse.get_activity", analyse.get_activity),
+        (f"Habit.streak ({len(busiest_dates)} checkoffs)", full_streak),
+    ]
+
+
+def run_benchmarks(db, repeat=20):
+    """
+    Runs all benchmark cases.
+
+    :param db: A Database created by generate_store.
+    :param repeat: The number of calls per case.
+    :return: A dictionary {case name: timing results}.
+    """
+    return {name: time_case(function, repeat) for name, function in build_cases(db)}
+
+
+def benchmark_startup(db_name, repeat=10):
+    """
+    Measures one-shot commands of main.py, each in a new interpreter including all imports.
+
+    :param db_name: A database created by generate_store, the checkoffs are added to 'Habit 1'.
+    :param repeat: The number of runs per command.
+    :return: A dictionary {case name: timing results}.
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    counter = iter(range(1, 10 ** 9))
+
+    def run_main(*argv):
+        subprocess.run([sys.executable, script, "--db", db_name] + list(argv), check=True, stdout=subprocess.DEVNULL)
+
+    def checkoff():
+        # Far after the synthetic history, so every run saves a new checkoff.
+        date = START_DATE + timedelta(days=100000 + next(counter))
+        run_main("checkoff", "Habit 1", "--date", date.strftime("%Y-%m-%d"))
+
+    return {
+        "Startup: main.py checkoff": time_case(checkoff, repeat),
+        "Startup: main.py leaderboard": time_case(lambda: run_main("leaderboard"), repeat)
+    }
+
+
+def compare_to_baseline(results, baseline, tolerance=0.25):
+    """
+    Finds the cases whose median latency is more than tolerance slower than in the baseline.
+
+    :param results: The results of run_benchmarks.
+    :param baseline: Earlier results of run_benchmarks, e.g. loaded from JSON.
+    :param tolerance: The allowed slowdown, 0.25 means 25 %.
+    :return: A list of (case name, baseline p50 ms, current p50 ms) for every regression.
+    """
+    regressions = []
+    for name, result in results.items():
+        # Case names may contain sizes that differ between runs, compare by the name before the size.
+        key = name.split(" (")[0]
+        previous = next((value for other, value in baseline.items() if other.split(" (")[0] == key), None)
+        if previous is not None and result['p50_ms'] > previous['p50_ms'] * (1 + tolerance):
+            regressions.append((name, previous['p50_ms'], result['p50_ms']))
+    return regressions
+
+
+def print_results(results):
+    """Prints the results as a table."""
+    print(f"{'case':<42} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak RSS KiB':>13}")
+    for name, result in results.items():
+        print(f"{name:<42} {result['ops_per_sec']:>10.1f} {result['p50_ms']:>9.3f} {result['p95_ms']:>9.3f} "
+              f"{result['p99_ms']:>9.3f} {result['peak_rss_kib'] or '-':>13}")
+
+
+def main(argv=None):
+    """Runs the benchmark from the command line, returns the exit code."""
+    parser = argparse.ArgumentParser(description="Benchmark 'Make it a Habit' on a synthetic habit store.")
+    parser.add_argument("--habits", type=int, default=1000, help="number of synthetic habits")
+    parser.add_argument("--checkoffs", type=int, default=100000, help="total number of synthetic checkoffs")
+    parser.add_argument("--repeat", type=int, default=20, help="calls per benchmark case")
+    parser.add_argument("--startup-runs", type=int, default=10, help="runs per startup case, 0 to skip them")
+    parser.add_argument("--seed", type=int, default=42, help="seed of the data generator")
+    parser.add_argument("--db", help="database file to create (a temporary file by default)")
+    parser.add_argument("--baseline", help="JSON file with earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed median slowdown, e.g. 0.25")
+    parser.add_argument("--save-baseline", help="write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_name = args.db or os.path.join(directory, "benchmark.db")
+        start = time.perf_counter()
+        db = generate_store(db_name, habits=args.habits, checkoffs=args.checkoffs, seed=args.seed)
+        elapsed = time.perf_counter() - start
+        print(f"Generated {args.habits} habits and {args.checkoffs} checkoffs in {elapsed:.1f} s "
+              f"({args.checkoffs / elapsed:.0f} checkoffs/s)")
+
+        results = run_benchmarks(db, repeat=args.repeat)
+        db.close()
+        if args.startup_runs:
+            results.update(benchmark_startup(db_name, repeat=args.startup_runs))
+
+    print_results(results)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare_to_baseline(results, json.load(baseline_file), args.tolerance)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: p50 {before:.3f} ms -> {after:.3f} ms")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+import threading
+from collections import OrderedDict, namedtuple
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+# Sentinel for lookups that found nothing, since None can be a cached value.
+MISSING = object()
+
+
+class LRUCache:
+    """A thread-safe, bounded mapping that evicts the least recently used entry and counts hits and misses."""
+
+    def __init__(self, maxsize=1024):
+        """
+        Initializing a new LRUCache instance.
+        :param maxsize: The maximum number of entries, at least 1.
+        """
+        if maxsize < 1:
+            raise ValueError(f"The cache size must be at least 1, not {maxsize}.")
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0 # Counts removals, see put
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Looks up an entry and marks it as recently used.
+
+        :param key: The key to look up.
+        :return: The cached value, or MISSING.
+        """
+        with self.lock:
+            value = self.entries.get(key, MISSING)
+            if value is MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, generation=None):
+        """
+        Stores an entry, evicting the least recently used one if the cache is full.
+
+        :param key: The key of the entry.
+        :param value: The value to cache.
+        :param generation: The generation read before the value was loaded, the entry is dropped if an
+            entry was removed since then, because the value may have been loaded before that change.
+        """
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def pop(self, key):
+        """Removes an entry if it is cached."""
+        with self.lock:
+            self.entries.pop(key, None)
+            self.generation += 1
+
+    def clear(self):
+        """Removes all entries, the counters are kept."""
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
+
+    def info(self):
+        """Returns the hit and miss counters and the size, like functools.lru_cache."""
+        with self.lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self.entries))
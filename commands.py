@@ -0,0 +1,302 @@
+"""
+Non-interactive commands of 'Make it a Habit' for scripts, cron jobs and pipelines.
+
+Examples:
+    python main.py add "Read" --description "Read 10 pages" --periodicity daily
+    python main.py checkoff "Read" --date 2024-05-01
+    python main.py bulk-checkoff checkoffs.csv
+    python main.py --format json stats --periodicity weekly
+    python main.py --format csv leaderboard --top 5
+    python main.py import seed_data.ndjson
+    python main.py export nightly.ndjson --since-last nightly
+    python main.py --format csv activity --periodicity weekly --start 2024-01-01
+    python main.py rebuild-rollups
+    python main.py history "Read" --start 2024-05-01 --end 2024-06-01
+"""
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime
+from analyse import Analyse
+from db import DEFAULT_PAGE_SIZE, Database
+from habit import Habit
+from exporter import FORMATS as EXPORT_FORMATS, export_file
+from importer import FORMATS as IMPORT_FORMATS, import_file
+
+FORMATS = ("text", "json", "csv")
+DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S")
+
+
+class CommandError(Exception):
+    """An error caused by the command line input, reported without a traceback."""
+
+
+def parse_date(value):
+    """
+    Parses a checkoff date given as YYYY-MM-DD, optionally followed by a time HH:MM:SS.
+
+    :param value: The date string.
+    :return: A datetime.
+    """
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), date_format)
+        except ValueError:
+            pass
+    raise CommandError(f"Invalid date '{value}', use the format YYYY-MM-DD.")
+
+
+def at_least(minimum):
+    """
+    Returns an argparse type for whole numbers of at least minimum.
+
+    :param minimum: The smallest accepted number.
+    :return: A function that parses the argument string.
+    """
+    def parse(value):
+        try:
+            number = int(value)
+        except ValueError:
+            number = minimum - 1
+        if number < minimum:
+            raise argparse.ArgumentTypeError(f"expected a whole number of at least {minimum}, got '{value}'")
+        return number
+    return parse
+
+
+def write_rows(rows, fields, output_format, out):
+    """
+    Writes result rows as text, JSON or CSV.
+
+    :param rows: A list of dictionaries.
+    :param fields: The keys of the dictionaries, in output order.
+    :param output_format: 'text', 'json' or 'csv'.
+    :param out: The file to write to.
+    """
+    if output_format == "json":
+        json.dump(rows, out, default=str)
+        out.write("\n")
+    elif output_format == "csv":
+        writer = csv.DictWriter(out, fieldnames=fields, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        for row in rows:
+            out.write("  ".join(f"{field}={row[field]}" for field in fields) + "\n")
+
+
+def add_command(db, args):
+    """Adds a new habit."""
+    if db.check_habit_exists(args.name):
+        raise CommandError(f"The habit '{args.name}' already exists.")
+    habit_id = db.add_habit_to_table(Habit(args.name, args.description, args.periodicity))
+    return [{'id': habit_id, 'name': args.name, 'periodicity': args.periodicity}], ["id", "name", "periodicity"]
+
+
+def checkoff_command(db, args):
+    """Checks off a habit today or on a given date."""
+    habit_id = db.get_habit_id(args.name)
+    if habit_id is None:
+        raise CommandError(f"The habit '{args.name}' does not exist.")
+    checkoff_date = parse_date(args.date) if args.date else datetime.now()
+    checked_off = db.add_streak_to_table(habit_id, checkoff_date)
+    return [{'name': args.name, 'date': checkoff_date, 'checked_off': checked_off}], ["name", "date", "checked_off"]
+
+
+def read_checkoffs(db, lines, unknown):
+    """
+    Parses CSV lines with a habit name and a checkoff date, a header line 'name,date' is skipped.
+
+    :param db: The Database used to look up the habit IDs.
+    :param lines: An iterable of CSV lines, e.g. an open file.
+    :param unknown: A set that receives the names of habits that do not exist.
+    :return: A generator of (habit_id, checkoff_date) pairs.
+    """
+    for line_number, row in enumerate(csv.reader(lines), start=1):
+        if not row or (line_number == 1 and [field.strip().lower() for field in row] == ["name", "date"]):
+            continue
+        if len(row) != 2:
+            raise CommandError(f"Line {line_number}: expected a habit name and a date.")
+        habit_id = db.get_habit_id(row[0])
+        if habit_id is None:
+            unknown.add(row[0])
+            continue
+        yield habit_id, parse_date(row[1])
+
+
+def bulk_checkoff_command(db, args):
+    """Checks off many habits from a CSV file or standard input in a single transaction."""
+    unknown = set()
+    try:
+        lines = sys.stdin if args.file == "-" else open(args.file, newline="")
+    except OSError as e:
+        raise CommandError(f"Bulk checkoff from '{args.file}' failed: {e}")
+    try:
+        inserted, skipped = db.add_streaks_bulk(read_checkoffs(db, lines, unknown))
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+    return ([{'inserted': inserted, 'skipped': skipped, 'unknown_habits': len(unknown)}],
+            ["inserted", "skipped", "unknown_habits"])
+
+
+def stats_command(db, args):
+    """Lists the current and longest streak of the habits."""
+    rows = [habit_data for habit_data in db.iter_streaks()
+            if args.periodicity is None or habit_data['periodicity'] == args.periodicity]
+    return rows, ["id", "name", "periodicity", "current_streak", "longest_streak"]
+
+
+def leaderboard_command(db, args):
+    """Ranks the habits of every periodicity by current and by longest streak."""
+    rows = []
+    for periodicity, board in Analyse(db).get_leaderboard(args.top).items():
+        for kind in ("current", "longest"):
+            rows.extend({'periodicity': periodicity, 'ranking': kind, 'rank': rank, 'name': name, 'streak': streak}
+                        for rank, (name, streak) in enumerate(board[kind], start=1))
+    return rows, ["periodicity", "ranking", "rank", "name", "streak"]
+
+
+def import_command(db, args):
+    """Imports habits and checkoffs from an SQL, CSV or NDJSON dump, resuming an interrupted import."""
+    try:
+        report = import_file(db, args.file, args.input_format, args.chunk_size, args.restart)
+    except (OSError, ValueError) as e:
+        raise CommandError(f"Import of '{args.file}' failed: {e}")
+    fields = ["records", "habits", "checkoffs", "skipped", "rejected", "resumed_from", "seconds", "rows_per_sec"]
+    return [report], fields
+
+
+def export_command(db, args):
+    """Exports the habits and checkoffs to a CSV, NDJSON or columnar file, optionally only the new ones."""
+    try:
+        report = export_file(db, args.file, args.output_format, args.since_last)
+    except (OSError, ValueError) as e:
+        raise CommandError(f"Export to '{args.file}' failed: {e}")
+    return [report], ["habits", "checkoffs", "last_tracking_id", "seconds", "rows_per_sec"]
+
+
+def activity_command(db, args):
+    """Lists the checkoffs, active habits and habits on a streak per day or ISO week."""
+    activity = Analyse(db).get_activity(args.periodicity, parse_date(args.start) if args.start else None,
+                                        parse_date(args.end) if args.end else None)
+    fields = ["date", "checkoffs", "active_habits", "habits_on_streak"]
+    return [{'date': row['date'].date(), **{field: row[field] for field in fields[1:]}} for row in activity], fields
+
+
+def rebuild_rollups_command(db, args):
+    """Recomputes the daily and weekly rollups from all checkoffs."""
+    return [{'rollups': db.rebuild_rollups()}], ["rollups"]
+
+
+def history_command(db, args):
+    """Lists the checkoffs of some or all habits in a date range, one page at a time."""
+    habit_ids = None
+    if args.names:
+        habit_ids = [db.get_habit_id(name) for name in args.names]
+        if None in habit_ids:
+            raise CommandError(f"The habit '{args.names[habit_ids.index(None)]}' does not exist.")
+    after = None
+    if args.after:
+        habit_id, _, date = args.after.partition(",")
+        if not habit_id.strip().isdigit():
+            raise CommandError(f"Invalid page key '{args.after}', use the format ID,DATE.")
+        after = (int(habit_id), parse_date(date))
+
+    checkoffs, next_key = db.get_checkoffs_page(habit_ids, parse_date(args.start) if args.start else None,
+                                                parse_date(args.end) if args.end else None, after, args.limit)
+    if next_key is not None:
+        print(f"More checkoffs follow, continue with --after {next_key[0]},{next_key[1]:%Y-%m-%dT%H:%M:%S}",
+              file=sys.stderr)
+    rows = [{'id': habit_id, 'name': db.get_habit_info(habit_id)['name'], 'date': date}
+            for habit_id, date in checkoffs]
+    return rows, ["id", "name", "date"]
+
+
+def build_parser():
+    """Creates the argument parser with one subcommand per command."""
+    parser = argparse.ArgumentParser(prog="main.py", description="Make it a Habit without the interactive menu.")
+    parser.add_argument("--db", default="main.db", help="database file (default: main.db)")
+    parser.add_argument("--format", choices=FORMATS, default="text", help="output format (default: text)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = subparsers.add_parser("add", help="add a new habit")
+    add_parser.add_argument("name")
+    add_parser.add_argument("--description", default="")
+    add_parser.add_argument("--periodicity", choices=["daily", "weekly"], default="daily")
+    add_parser.set_defaults(handler=add_command)
+
+    checkoff_parser = subparsers.add_parser("checkoff", help="check off a habit")
+    checkoff_parser.add_argument("name")
+    checkoff_parser.add_argument("--date", help="checkoff date YYYY-MM-DD (default: now)")
+    checkoff_parser.set_defaults(handler=checkoff_command)
+
+    bulk_parser = subparsers.add_parser("bulk-checkoff", help="check off habits from CSV lines 'name,date'")
+    bulk_parser.add_argument("file", nargs="?", default="-", help="CSV file (default: standard input)")
+    bulk_parser.set_defaults(handler=bulk_checkoff_command)
+
+    stats_parser = subparsers.add_parser("stats", help="show the streaks of all habits")
+    stats_parser.add_argument("--periodicity", choices=["daily", "weekly"])
+    stats_parser.set_defaults(handler=stats_command)
+
+    leaderboard_parser = subparsers.add_parser("leaderboard", help="rank the habits by streak")
+    leaderboard_parser.add_argument("--top", type=at_least(0), default=3, help="entries per ranking (default: 3)")
+    leaderboard_parser.set_defaults(handler=leaderboard_command)
+
+    import_parser = subparsers.add_parser("import", help="import an SQL, CSV or NDJSON dump without duplicates")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--input-format", choices=sorted(set(IMPORT_FORMATS.values())),
+                               help="format of the file (default: by extension)")
+    import_parser.add_argument("--chunk-size", type=int, default=10000, help="records per transaction")
+    import_parser.add_argument("--restart", action="store_true", help="ignore the position of an earlier import")
+    import_parser.set_defaults(handler=import_command)
+
+    export_parser = subparsers.add_parser("export", help="export to a CSV, NDJSON or columnar (.hcol) file")
+    export_parser.add_argument("file")
+    export_parser.add_argument("--output-format", choices=sorted(set(EXPORT_FORMATS.values())),
+                               help="format of the file (default: by extension)")
+    export_parser.add_argument("--since-last", metavar="NAME",
+                               help="only export rows added since the last export with this name")
+    export_parser.set_defaults(handler=export_command)
+
+    activity_parser = subparsers.add_parser("activity", help="show the checkoffs of all habits per day or week")
+    activity_parser.add_argument("--periodicity", choices=["daily", "weekly"], default="daily")
+    activity_parser.add_argument("--start", help="first date YYYY-MM-DD (default: the first checkoff)")
+    activity_parser.add_argument("--end", help="last date YYYY-MM-DD (default: the last checkoff)")
+    activity_parser.set_defaults(handler=activity_command)
+
+    rebuild_parser = subparsers.add_parser("rebuild-rollups", help="recompute the daily and weekly rollups")
+    rebuild_parser.set_defaults(handler=rebuild_rollups_command)
+
+    history_parser = subparsers.add_parser("history", help="list the checkoffs in a date range, page by page")
+    history_parser.add_argument("names", nargs="*", help="habit names (default: all habits)")
+    history_parser.add_argument("--start", help="first date YYYY-MM-DD (default: no limit)")
+    history_parser.add_argument("--end", help="first date YYYY-MM-DD not listed (default: no limit)")
+    history_parser.add_argument("--limit", type=at_least(1), default=DEFAULT_PAGE_SIZE,
+                                help=f"checkoffs per page (default: {DEFAULT_PAGE_SIZE})")
+    history_parser.add_argument("--after", metavar="ID,DATE", help="continue after this key of the previous page")
+    history_parser.set_defaults(handler=history_command)
+    return parser
+
+
+def run(argv=None, out=None):
+    """
+    Runs one command.
+
+    :param argv: The command line arguments without the program name, sys.argv[1:] if None.
+    :param out: The file for the results, standard output if None.
+    :return: The exit code, 0 on success and 1 if the command failed.
+    """
+    args = build_parser().parse_args(argv)
+    out = out or sys.stdout
+    db = Database(db_name=args.db)
+    try:
+        rows, fields = args.handler(db, args)
+    except CommandError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    write_rows(rows, fields, args.format, out)
+    return 0
@@ -0,0 +1,100 @@
+import sqlite3
+import threading
+from pathlib import Path
+from profiling import ProfiledConnection
+
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+class ConnectionManager:
+    """Opens tuned SQLite connections and hands out one connection per thread."""
+
+    def __init__(self, db_name, read_only=False, journal_mode=None, synchronous=None, cache_size=None,
+                 mmap_size=None, timeout=5.0, profiler=None):
+        """
+        Initializing a new ConnectionManager instance.
+        :param db_name: The name of the database file.
+        :param read_only: Open the file in read-only mode, e.g. for analyses next to a writer.
+        :param journal_mode: The journal mode to set, e.g. 'WAL' so that readers do not block the writer.
+        :param synchronous: The synchronous mode to set, e.g. 'NORMAL' (safe with WAL and faster than 'FULL').
+        :param cache_size: The page cache size, in pages if positive or in KiB if negative.
+        :param mmap_size: The number of bytes of the file that may be memory mapped.
+        :param timeout: The number of seconds to wait for a lock held by another connection.
+        :param profiler: A profiling.Profiler that records the time of every statement, None to disable.
+        """
+        if journal_mode is not None and journal_mode.upper() not in JOURNAL_MODES:
+            raise ValueError(f"Unknown journal mode: {journal_mode}")
+        if synchronous is not None and synchronous.upper() not in SYNCHRONOUS_MODES:
+            raise ValueError(f"Unknown synchronous mode: {synchronous}")
+        if read_only and db_name == ":memory:":
+            raise ValueError("An in-memory database cannot be opened read-only.")
+
+        self.db_name = db_name
+        self.read_only = read_only
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.timeout = timeout
+        self.profiler = profiler
+
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+        self.closed = False
+        # Every connection to ':memory:' is a new database, so all threads share one connection.
+        self.shared = self.connect() if db_name == ":memory:" else None
+
+    def connect(self):
+        """
+        Opens a new connection with the configured settings.
+
+        :return: A sqlite3 connection.
+        """
+        # Each connection is only used by one thread, check_same_thread=False lets close() reach all of them.
+        factory = sqlite3.Connection if self.profiler is None else ProfiledConnection
+        if self.read_only:
+            conn = sqlite3.connect(Path(self.db_name).absolute().as_uri() + "?mode=ro", uri=True,
+                                   timeout=self.timeout, check_same_thread=False, factory=factory)
+        else:
+            conn = sqlite3.connect(self.db_name, timeout=self.timeout, check_same_thread=False, factory=factory)
+        if self.profiler is not None:
+            conn.profiler = self.profiler
+
+        conn.execute("PRAGMA foreign_keys = ON") # Needed for ON DELETE CASCADE
+        if self.journal_mode is not None and not self.read_only:
+            conn.execute(f"PRAGMA journal_mode = {self.journal_mode.upper()}")
+        if self.synchronous is not None:
+            conn.execute(f"PRAGMA synchronous = {self.synchronous.upper()}")
+        if self.cache_size is not None:
+            conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        if self.mmap_size is not None:
+            conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+
+        with self.lock:
+            self.connections.append(conn)
+        return conn
+
+    def get_connection(self):
+        """
+        Returns the connection of the calling thread, opening it on first use.
+
+        :return: A sqlite3 connection.
+        """
+        if self.closed:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        if self.shared is not None:
+            return self.shared
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = self.connect()
+        return conn
+
+    def close(self):
+        """Closes all connections opened by this manager, no new connections are opened afterwards."""
+        with self.lock:
+            self.closed = True
+            connections, self.connections = self.connections, []
+        for conn in connections:
+            conn.close()
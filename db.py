@@ -1,19 +1,495 @@
-import sqlite3
+import logging
 from datetime import datetime
+from cache import MISSING, LRUCache
+from connection import ConnectionManager
+from habit import Habit
+from periods import (day_index, from_timestamp, from_timestamps, period_index, period_indices, period_start,
+                     to_timestamp, week_index)
+from streak import StreakState, compute_streaks
+
+logger = logging.getLogger(__name__)
+
+
+def migrate_indexes(conn):
+    """
+    Schema version 1: adds lookup indexes and cascades habit deletion to the tracking table.
+
+    :param conn: The open database connection.
+    """
+    # Rename case-insensitive duplicates so the unique name index can be created.
+    conn.execute("""UPDATE habits SET name = name || ' (' || id || ')'
+                    WHERE id NOT IN (SELECT MIN(id) FROM habits GROUP BY name COLLATE NOCASE)""")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_habits_name ON habits (name COLLATE NOCASE)")
+
+    # SQLite cannot alter a foreign key, so the tracking table is rebuilt with ON DELETE CASCADE.
+    conn.execute("""CREATE TABLE tracking_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        habit_id INTEGER,
+        checkoff_date DATE,
+        FOREIGN KEY (habit_id) REFERENCES habits(id) ON DELETE CASCADE)
+    """)
+    conn.execute("""INSERT INTO tracking_new (id, habit_id, checkoff_date)
+                    SELECT id, habit_id, checkoff_date FROM tracking
+                    WHERE habit_id IN (SELECT id FROM habits)""") # Orphaned rows are dropped
+    conn.execute("DROP TABLE tracking")
+    conn.execute("ALTER TABLE tracking_new RENAME TO tracking")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tracking_habit_date ON tracking (habit_id, checkoff_date)")
+
+
+def migrate_integer_dates(conn):
+    """
+    Schema version 2: stores checkoff dates as integer seconds since the epoch.
+
+    The TEXT column is kept for readability and for SQL scripts that only fill it,
+    a trigger derives the integer value for such rows.
+
+    :param conn: The open database connection.
+    """
+    conn.execute("ALTER TABLE tracking ADD COLUMN checkoff_ts INTEGER")
+    conn.execute("UPDATE tracking SET checkoff_ts = CAST(strftime('%s', checkoff_date) AS INTEGER)")
+    conn.execute("DROP INDEX IF EXISTS idx_tracking_habit_date")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tracking_habit_ts ON tracking (habit_id, checkoff_ts)")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS trg_tracking_checkoff_ts
+                    AFTER INSERT ON tracking WHEN NEW.checkoff_ts IS NULL
+                    BEGIN
+                        UPDATE tracking SET checkoff_ts = CAST(strftime('%s', NEW.checkoff_date) AS INTEGER)
+                        WHERE id = NEW.id;
+                    END""")
+
+
+def migrate_streak_cache(conn):
+    """
+    Schema version 3: adds the streaks table that caches the streak state of every habit.
+
+    The checkoff_ts trigger now also drops the cached state of habits that get rows from
+    plain SQL scripts, the state is then recomputed on the next read.
+
+    :param conn: The open database connection.
+    """
+    conn.execute("""CREATE TABLE IF NOT EXISTS streaks (
+        habit_id INTEGER PRIMARY KEY,
+        run_start INTEGER,
+        current_length INTEGER NOT NULL DEFAULT 0,
+        longest_length INTEGER NOT NULL DEFAULT 0,
+        last_period INTEGER,
+        FOREIGN KEY (habit_id) REFERENCES habits(id) ON DELETE CASCADE)
+    """)
+    conn.execute("DROP TRIGGER IF EXISTS trg_tracking_checkoff_ts")
+    conn.execute("""CREATE TRIGGER trg_tracking_checkoff_ts
+                    AFTER INSERT ON tracking WHEN NEW.checkoff_ts IS NULL
+                    BEGIN
+                        UPDATE tracking SET checkoff_ts = CAST(strftime('%s', NEW.checkoff_date) AS INTEGER)
+                        WHERE id = NEW.id;
+                        DELETE FROM streaks WHERE habit_id = NEW.habit_id;
+                    END""")
+    for habit_id, periodicity in conn.execute("SELECT id, periodicity FROM habits").fetchall():
+        save_streak_state(conn, habit_id, compute_streak_state(conn, habit_id, periodicity))
+
+
+def compute_streak_state(conn, habit_id, periodicity):
+    """
+    Computes the streak state of a habit from its full checkoff history.
+
+    :param conn: The open database connection.
+    :param habit_id: The ID of the habit.
+    :param periodicity: The periodicity of the habit.
+    :return: A StreakState object.
+    """
+    cursor = conn.execute("SELECT checkoff_ts FROM tracking WHERE habit_id = ? ORDER BY checkoff_ts", (habit_id,))
+    periods = period_indices([row[0] for row in cursor.fetchall()], periodicity)
+    return StreakState.from_stats(compute_streaks(periods))
+
+
+def save_streak_state(conn, habit_id, state):
+    """
+    Stores the streak state of a habit in the streaks table.
+
+    :param conn: The open database connection.
+    :param habit_id: The ID of the habit.
+    :param state: The StreakState to store.
+    """
+    conn.execute("INSERT OR REPLACE INTO streaks (habit_id, run_start, current_length, longest_length, last_period) "
+                 "VALUES (?, ?, ?, ?, ?)",
+                 (habit_id, state.run_start, state.current, state.longest, state.last_period))
+
+
+def fetch_in_batches(cursor, batch_size):
+    """
+    Yields the rows of a cursor, fetching batch_size rows at a time.
+
+    :param cursor: The executed cursor.
+    :param batch_size: The number of rows per fetchmany call.
+    :return: A generator of rows.
+    """
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def migrate_periodicity_index(conn):
+    """
+    Schema version 4: indexes habits by periodicity for the filtered name queries.
+
+    :param conn: The open database connection.
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_habits_periodicity ON habits (periodicity)")
+
+
+def migrate_checkoff_periods(conn):
+    """
+    Schema version 5: stores the period (day or ISO week number) of each checkoff and makes it
+    unique per habit, so a habit can only be checked off once per period.
+
+    Existing duplicates within a period are moved to the tracking_duplicates table, keeping the
+    earliest saved row in tracking, and their number is logged.
+
+    :param conn: The open database connection.
+    """
+    conn.execute("ALTER TABLE tracking ADD COLUMN period INTEGER")
+    conn.execute(f"UPDATE tracking SET period = {PERIOD_SQL}")
+    conn.execute("""CREATE TABLE IF NOT EXISTS tracking_duplicates (
+        id INTEGER PRIMARY KEY,
+        habit_id INTEGER,
+        checkoff_date DATE,
+        checkoff_ts INTEGER,
+        period INTEGER,
+        FOREIGN KEY (habit_id) REFERENCES habits(id) ON DELETE CASCADE)
+    """)
+    duplicates = "id NOT IN (SELECT MIN(id) FROM tracking GROUP BY habit_id, period)"
+    moved = conn.execute(f"INSERT INTO tracking_duplicates (id, habit_id, checkoff_date, checkoff_ts, period) "
+                         f"SELECT id, habit_id, checkoff_date, checkoff_ts, period FROM tracking WHERE {duplicates}")
+    if moved.rowcount:
+        logger.warning("Moved %d checkoffs in an already checked off period to tracking_duplicates.", moved.rowcount)
+    conn.execute(f"DELETE FROM tracking WHERE {duplicates}")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_tracking_habit_period ON tracking (habit_id, period)")
+
+    # Rows inserted by plain SQL scripts also get their period from the trigger.
+    conn.execute("DROP TRIGGER IF EXISTS trg_tracking_checkoff_ts")
+    conn.execute(f"""CREATE TRIGGER trg_tracking_checkoff_ts
+                     AFTER INSERT ON tracking WHEN NEW.checkoff_ts IS NULL OR NEW.period IS NULL
+                     BEGIN
+                         UPDATE tracking
+                         SET checkoff_ts = COALESCE(checkoff_ts, CAST(strftime('%s', checkoff_date) AS INTEGER))
+                         WHERE id = NEW.id;
+                         UPDATE tracking SET period = {PERIOD_SQL} WHERE id = NEW.id;
+                         DELETE FROM streaks WHERE habit_id = NEW.habit_id;
+                     END""")
+
+
+def migrate_import_progress(conn):
+    """
+    Schema version 6: remembers how many records of each import source were committed,
+    so an interrupted import can resume where it stopped.
+
+    :param conn: The open database connection.
+    """
+    conn.execute("""CREATE TABLE IF NOT EXISTS import_progress (
+        source TEXT PRIMARY KEY,
+        position INTEGER NOT NULL,
+        updated_ts INTEGER NOT NULL)
+    """)
+
+
+def migrate_export_progress(conn):
+    """
+    Schema version 7: remembers the last exported habit and tracking IDs of each named
+    incremental export, so the next export only writes newer rows.
+
+    :param conn: The open database connection.
+    """
+    conn.execute("""CREATE TABLE IF NOT EXISTS export_progress (
+        name TEXT PRIMARY KEY,
+        last_habit_id INTEGER NOT NULL,
+        last_tracking_id INTEGER NOT NULL,
+        updated_ts INTEGER NOT NULL)
+    """)
+
+
+def migrate_rollups(conn):
+    """
+    Schema version 8: adds the rollups table with the checkoff counts of every day and ISO week,
+    so calendar views do not aggregate the tracking table.
+
+    Rows added by plain SQL scripts empty the table, it is then rebuilt on the next read.
+
+    :param conn: The open database connection.
+    """
+    conn.execute("""CREATE TABLE IF NOT EXISTS rollups (
+        periodicity TEXT NOT NULL,
+        period INTEGER NOT NULL,
+        checkoffs INTEGER NOT NULL,
+        active_habits INTEGER NOT NULL,
+        habits_on_streak INTEGER NOT NULL,
+        PRIMARY KEY (periodicity, period)) WITHOUT ROWID
+    """)
+    conn.execute("DROP TRIGGER IF EXISTS trg_tracking_checkoff_ts")
+    conn.execute(f"""CREATE TRIGGER trg_tracking_checkoff_ts
+                     AFTER INSERT ON tracking WHEN NEW.checkoff_ts IS NULL OR NEW.period IS NULL
+                     BEGIN
+                         UPDATE tracking
+                         SET checkoff_ts = COALESCE(checkoff_ts, CAST(strftime('%s', checkoff_date) AS INTEGER))
+                         WHERE id = NEW.id;
+                         UPDATE tracking SET period = {PERIOD_SQL} WHERE id = NEW.id;
+                         DELETE FROM streaks WHERE habit_id = NEW.habit_id;
+                         DELETE FROM rollups;
+                     END""")
+    rebuild_rollups(conn)
+
+
+def migrate_import_fingerprint(conn):
+    """
+    Schema version 9: stores the size and modification time of an imported file with its position,
+    so a changed file is imported from the beginning instead of resumed.
+
+    :param conn: The open database connection.
+    """
+    conn.execute("ALTER TABLE import_progress ADD COLUMN fingerprint TEXT")
+
+
+# The rollup rows of all checkoffs. A checkoff is on a streak if the habit's previous period was checked
+# off too, a habit counts once per day or week in active_habits and habits_on_streak.
+ROLLUP_ROWS_SQL = """WITH checkoffs AS (
+                         SELECT habit_id, checkoff_ts / 86400 AS day,
+                                IFNULL(LAG(period) OVER (PARTITION BY habit_id ORDER BY period) = period - 1, 0)
+                                    AS on_streak
+                         FROM tracking)
+                     SELECT 'daily', day, COUNT(*), COUNT(DISTINCT habit_id),
+                            COUNT(DISTINCT CASE WHEN on_streak THEN habit_id END)
+                     FROM checkoffs GROUP BY day
+                     UNION ALL
+                     SELECT 'weekly', (day + 3) / 7, COUNT(*), COUNT(DISTINCT habit_id),
+                            COUNT(DISTINCT CASE WHEN on_streak THEN habit_id END)
+                     FROM checkoffs GROUP BY (day + 3) / 7"""
+
+# The checkoffs of one habit in a period range, the row before the range decides the first streak flag.
+HABIT_ROLLUP_SQL = """SELECT day, (day + 3) / 7, on_streak
+                      FROM (SELECT period, checkoff_ts / 86400 AS day,
+                                   IFNULL(LAG(period) OVER (ORDER BY period) = period - 1, 0) AS on_streak
+                            FROM tracking
+                            WHERE habit_id = ? AND period BETWEEN ? AND ? AND id <= ?)
+                      WHERE period >= ?"""
+
+UPSERT_ROLLUP = """INSERT INTO rollups (periodicity, period, checkoffs, active_habits, habits_on_streak)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT (periodicity, period) DO UPDATE SET
+                       checkoffs = checkoffs + excluded.checkoffs,
+                       active_habits = active_habits + excluded.active_habits,
+                       habits_on_streak = habits_on_streak + excluded.habits_on_streak"""
+MAX_INTEGER = 2 ** 63 - 1 # The largest SQLite integer, an open end of a range
+ROLLUP_REBUILD_SHARE = 0.25 # Bulk inserts of more rows than this share of the tracking IDs rebuild the rollups
+
+
+def timestamp_range(start, end):
+    """
+    Converts a date range [start, end) to checkoff_ts bounds.
+
+    :param start: The first date to include, None for no limit.
+    :param end: The first date to exclude, None for no limit.
+    :return: A (first, end) tuple of timestamps, the end is excluded.
+    """
+    return (to_timestamp(start) if start else -MAX_INTEGER), (to_timestamp(end) if end else MAX_INTEGER)
+
+
+def rebuild_rollups(conn):
+    """
+    Recomputes the rollups table from all tracking rows, without committing.
+
+    :param conn: The open database connection.
+    """
+    conn.execute("DELETE FROM rollups")
+    conn.execute(f"INSERT INTO rollups (periodicity, period, checkoffs, active_habits, habits_on_streak) "
+                 f"{ROLLUP_ROWS_SQL}")
+
+
+def rollup_period_range(first_period, last_period, periodicity):
+    """
+    Returns the periods of a habit whose rollups can change when first_period to last_period are
+    checked off: these periods, the next one (which may now continue a streak) and, for daily
+    habits, the other days of their ISO weeks.
+
+    :param first_period: The earliest changed period.
+    :param last_period: The latest changed period.
+    :param periodicity: The periodicity of the habit.
+    :return: A (first, last) tuple of periods.
+    """
+    if periodicity == "weekly":
+        return first_period, last_period + 1
+    return (first_period + 3) // 7 * 7 - 3, (last_period + 4) // 7 * 7 + 3
+
+
+def compute_habit_rollups(conn, habit_id, first_period, last_period, max_id=MAX_INTEGER):
+    """
+    Computes what the checkoffs of one habit add to the rollups of the days and weeks in a period range.
+
+    :param conn: The open database connection.
+    :param habit_id: The ID of the habit.
+    :param first_period: The first period of the range, see rollup_period_range.
+    :param last_period: The last period of the range.
+    :param max_id: Only tracking rows up to this ID are counted, e.g. to leave out new rows.
+    :return: A dictionary {(periodicity, period): (checkoffs, active_habits, habits_on_streak)}.
+    """
+    rollups = {}
+    for day, week, on_streak in conn.execute(HABIT_ROLLUP_SQL, (habit_id, first_period - 1, last_period,
+                                                                max_id, first_period)):
+        for key in (("daily", day), ("weekly", week)):
+            checkoffs, _, streak = rollups.get(key, (0, 1, 0))
+            rollups[key] = (checkoffs + 1, 1, streak | on_streak) # The habit counts once per day or week
+    return rollups
+
+
+def save_rollup_changes(conn, before, after):
+    """
+    Applies the difference between two results of compute_habit_rollups to the rollups table,
+    without committing. Rows without checkoffs are removed.
+
+    :param conn: The open database connection.
+    :param before: The contribution of the habit before the change.
+    :param after: The contribution of the habit after the change.
+    """
+    changes = []
+    for key in before.keys() | after.keys():
+        old, new = before.get(key, (0, 0, 0)), after.get(key, (0, 0, 0))
+        if old != new:
+            changes.append((*key, *(new_value - old_value for old_value, new_value in zip(old, new))))
+    conn.executemany(UPSERT_ROLLUP, changes)
+    conn.executemany("DELETE FROM rollups WHERE periodicity = ? AND period = ? AND checkoffs <= 0",
+                     [change[:2] for change in changes])
+
+
+# The period of a tracking row in SQL, matching periods.period_index for dates after 1970.
+PERIOD_SQL = """CASE (SELECT periodicity FROM habits WHERE habits.id = tracking.habit_id)
+                    WHEN 'weekly' THEN (checkoff_ts / 86400 + 3) / 7
+                    ELSE checkoff_ts / 86400
+                END"""
+
+
+# Ordered schema migrations, the database's PRAGMA user_version counts the applied ones.
+MIGRATIONS = [
+    migrate_indexes,
+    migrate_integer_dates,
+    migrate_streak_cache,
+    migrate_periodicity_index,
+    migrate_checkoff_periods,
+    migrate_import_progress,
+    migrate_export_progress,
+    migrate_rollups,
+    migrate_import_fingerprint,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+SELECT_STREAK_STATE = """SELECT h.periodicity, s.run_start, s.current_length, s.longest_length, s.last_period
+                         FROM habits h
+                         LEFT JOIN streaks s ON s.habit_id = h.id
+                         WHERE h.id = ?"""
+DEFAULT_BATCH_SIZE = 1000 # Rows fetched at once by the iter_* methods
+DEFAULT_PAGE_SIZE = 100 # Checkoffs per page of get_checkoffs_page
+
+# The first period of every habit: its creation period, or the first checkoff if that is earlier (back-dated).
+HABIT_START_SQL = """SELECT id, name, periodicity,
+                            MIN(COALESCE(created, first_checkoff), COALESCE(first_checkoff, created)) AS habit_start
+                     FROM (SELECT id, name, periodicity,
+                                  CASE periodicity WHEN 'weekly' THEN (created_day + 3) / 7
+                                                   ELSE created_day END AS created,
+                                  (SELECT MIN(period) FROM tracking WHERE habit_id = h.id) AS first_checkoff
+                           FROM (SELECT *, CAST(strftime('%s', creation_date) AS INTEGER) / 86400 AS created_day
+                                 FROM habits) h)"""
+
+# The periods missed between consecutive checkoffs, in one pass over the (habit_id, period) index.
+GAPS_SQL = """SELECT h.id, h.name, h.periodicity, g.gaps, g.longest_gap, g.missed, g.last_period
+              FROM habits h
+              LEFT JOIN (SELECT habit_id, SUM(gap > 0) AS gaps, MAX(gap) AS longest_gap, SUM(gap) AS missed,
+                                MAX(period) AS last_period
+                         FROM (SELECT habit_id, period,
+                                      period - LAG(period) OVER (PARTITION BY habit_id ORDER BY period) - 1 AS gap
+                               FROM tracking)
+                         GROUP BY habit_id) g ON g.habit_id = h.id
+              ORDER BY h.id"""
+
+# SQLite's NOCASE collation only folds ASCII letters, name cache keys are folded the same way.
+NOCASE = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+# Checkoffs in an already checked off period are skipped by the unique (habit_id, period) index.
+INSERT_CHECKOFF = "INSERT OR IGNORE INTO tracking (habit_id, checkoff_date, checkoff_ts, period) VALUES (?, ?, ?, ?)"
 
 
 class Database:
-    def __init__(self, db_name='main.db'):
+    def __init__(self, db_name='main.db', compact_dates=False, read_only=False, metadata_cache_size=1024,
+                 **connection_options):
         """
         Initializes a database connection and create tables if they don't exist.
 
+        Every thread that uses the Database gets its own connection, so one instance can serve
+        concurrent readers. Pass journal_mode='WAL' to let readers run while a checkoff is written.
+
         :param db_name: The name of the database file (default is 'main.db').
+        :param compact_dates: Store checkoff dates only as integers, without the readable TEXT copy.
+        :param read_only: Open an existing database file read-only, e.g. for Analyse.
+        :param metadata_cache_size: The number of habits whose metadata and name -> ID mapping are cached.
+        :param connection_options: Further settings for the ConnectionManager, e.g. journal_mode,
+            synchronous, cache_size, mmap_size, timeout or profiler (a profiling.Profiler that records
+            the time, calls and rows of every SQL statement).
         """
-        self.conn = sqlite3.connect(db_name)
-        self.create_tables()
+        self.compact_dates = compact_dates
+        self.read_only = read_only
+        self.habit_cache = LRUCache(metadata_cache_size) # ID -> (name, description, periodicity, creation_date)
+        self.name_cache = LRUCache(metadata_cache_size) # Case-folded name -> habit ID
+        self.connections = ConnectionManager(db_name, read_only=read_only, **connection_options)
+        if not read_only:
+            self.create_tables()
+
+    @property
+    def conn(self):
+        """The connection of the calling thread."""
+        return self.connections.get_connection()
+
+    def close(self):
+        """Closes all connections of this database."""
+        self.connections.close()
+
+    def cache_info(self):
+        """
+        Returns the hit and miss counters of the habit metadata and name caches.
+
+        :return: A dictionary with a CacheInfo tuple for 'habits' and for 'names'.
+        """
+        return {'habits': self.habit_cache.info(), 'names': self.name_cache.info()}
+
+    def invalidate_habit(self, habit_id, name=None):
+        """
+        Removes a habit from the caches. Call it after the change was committed (or rolled back),
+        otherwise another thread can cache the old row again before the commit.
+
+        :param habit_id: The ID of the habit.
+        :param name: The name of the habit before the change, looked up if None.
+        """
+        if name is None:
+            name = self.get_stored_name(habit_id)
+        if name is not None:
+            self.name_cache.pop(name.translate(NOCASE))
+        self.habit_cache.pop(habit_id)
+
+    def get_stored_name(self, habit_id):
+        """
+        Reads the name of a habit from the table, bypassing the caches.
+
+        :param habit_id: The ID of the habit.
+        :return: The name, or None if the habit does not exist.
+        """
+        row = self.conn.execute("SELECT name FROM habits WHERE id = ?", (habit_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def clear_caches(self):
+        """Empties the habit metadata and name caches, e.g. after a rolled back transaction."""
+        self.habit_cache.clear()
+        self.name_cache.clear()
 
     def create_tables(self):
         """Creates tables for storing habits and tracking information."""
+        if self.get_schema_version() >= SCHEMA_VERSION:
+            return # Already created and migrated, so a start only costs this one read
+
         self.conn.execute("""CREATE TABLE IF NOT EXISTS habits (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT, 
@@ -29,6 +505,29 @@ class Database:
             FOREIGN KEY (habit_id) REFERENCES habits(id))
         """)
         self.conn.commit()
+        self.migrate()
+
+    def get_schema_version(self):
+        """Returns the schema version stored in the database file."""
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def migrate(self):
+        """
+        Upgrades the database in place by applying all pending schema migrations.
+
+        Each migration runs in its own transaction together with the version bump,
+        so an interrupted upgrade can simply be restarted.
+        """
+        version = self.get_schema_version()
+        for target_version, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            self.conn.execute("BEGIN")
+            try:
+                migration(self.conn)
+                self.conn.execute(f"PRAGMA user_version = {target_version}")
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
 
     def check_habit_exists(self, name):
         """
@@ -37,9 +536,7 @@ class Database:
         :param name: The name of the habit to check.
         :return: True if the habit exists, False otherwise.
         """
-        cursor = self.conn.execute("SELECT id FROM habits WHERE LOWER(name) = ?", (name.lower(),))
-        result = cursor.fetchone()
-        return result is not None
+        return self.get_habit_id(name) is not None
 
     def add_habit_to_table(self, habit):
         """Saves a habit in the database.
@@ -47,22 +544,38 @@ class Database:
         :param habit: The Habit object to save.
         :return: The ID of the newly added habit.
         """
-        self.conn.execute("INSERT INTO habits (name, description, periodicity, creation_date) VALUES (?, ?, ?, ?)",
-                          (habit.get_name(), habit.get_description(), habit.get_periodicity(),
-                          habit.get_creation_date().strftime("%Y-%m-%d %H:%M:%S")))
-        habit_id = self.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        cursor = self.conn.execute("INSERT INTO habits (name, description, periodicity, creation_date) "
+                                   "VALUES (?, ?, ?, ?)",
+                                   (habit.get_name(), habit.get_description(), habit.get_periodicity(),
+                                    habit.get_creation_date().strftime("%Y-%m-%d %H:%M:%S")))
+        habit_id = cursor.lastrowid
+        save_streak_state(self.conn, habit_id, StreakState())
         self.conn.commit()
         return habit_id
 
     def delete_habit_from_table(self, habit_id):
         """
         Deletes a habit and its associated checkoff dates from the tables.
+        The checkoff dates are removed by the ON DELETE CASCADE foreign key, after their counts
+        were subtracted from the rollups.
 
         :param habit_id: The ID of the habit to delete.
         """
-        self.conn.execute("DELETE FROM habits WHERE id = ?", (habit_id,))
-        self.conn.execute("DELETE FROM tracking WHERE habit_id = ?", (habit_id,))
-        self.conn.commit()
+        name = self.get_stored_name(habit_id)
+        try:
+            if not self.rollups_stale():
+                first_period, last_period = self.conn.execute("SELECT MIN(period), MAX(period) FROM tracking "
+                                                              "WHERE habit_id = ?", (habit_id,)).fetchone()
+                if first_period is not None:
+                    save_rollup_changes(self.conn,
+                                        compute_habit_rollups(self.conn, habit_id, first_period, last_period), {})
+            self.conn.execute("DELETE FROM habits WHERE id = ?", (habit_id,))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            self.invalidate_habit(habit_id, name)
 
     def add_streak_to_table(self, habit_id, checkoff_date):
         """
@@ -70,10 +583,196 @@ class Database:
 
         :param habit_id: The ID of the habit being checked off.
         :param checkoff_date: The date the habit was checked off.
+        :return: True if the checkoff was saved, False if the period was already checked off.
         """
-        self.conn.execute("INSERT INTO tracking (habit_id, checkoff_date) VALUES (?, ?)",
-                          (habit_id, checkoff_date.strftime("%Y-%m-%d %H:%M:%S")))
+        row = self.conn.execute(SELECT_STREAK_STATE, (habit_id,)).fetchone()
+        period = period_index(checkoff_date, row[0]) if row is not None else None # Unknown habits fail below
+        rollups_stale = self.rollups_stale()
+        cursor = self.conn.execute(INSERT_CHECKOFF, (habit_id, self.format_checkoff_date(checkoff_date),
+                                                     to_timestamp(checkoff_date), period))
+        if cursor.rowcount == 0:
+            return False
+
+        if not rollups_stale: # Update the rows of the checkoff's day and week and of the next period
+            first_period, last_period = rollup_period_range(period, period, row[0])
+            save_rollup_changes(self.conn,
+                                compute_habit_rollups(self.conn, habit_id, first_period, last_period,
+                                                      cursor.lastrowid - 1),
+                                compute_habit_rollups(self.conn, habit_id, first_period, last_period))
+
+        # Update the cached streak in O(1), or recompute it if the checkoff is back-dated before the current run.
+        state = StreakState(*row[1:]) if row[2] is not None else None
+        if state is None or not state.add(period):
+            state = compute_streak_state(self.conn, habit_id, row[0])
+        save_streak_state(self.conn, habit_id, state)
         self.conn.commit()
+        return True
+
+    def add_streaks_bulk(self, checkoffs, chunk_size=1000):
+        """
+        Saves many checkoff dates to the tracking table in a single transaction.
+
+        Checkoffs in an already checked off period, stored or earlier in the same import, are
+        skipped by the unique (habit_id, period) index, so importing the same data twice does not
+        add anything. The existing dates are not loaded for this. Checkoffs of unknown habits are
+        rejected too. If an error occurs, nothing is saved.
+
+        :param checkoffs: An iterable of (habit_id, checkoff_date) pairs, e.g. a generator.
+        :param chunk_size: The number of rows passed to each executemany call.
+        :return: A tuple with the number of inserted and the number of rejected checkoffs.
+        """
+        periodicities = {} # Habit ID -> periodicity, None for unknown habits
+        period_ranges = {} # Habit ID -> [first, last] period of the imported checkoffs
+        rows = []
+        total = inserted = 0
+        rollups_stale = self.rollups_stale()
+        last_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM tracking").fetchone()[0] # Rows before the import
+        try:
+            for habit_id, checkoff_date in checkoffs:
+                total += 1
+                if habit_id not in periodicities:
+                    info = self.get_habit_info(habit_id)
+                    periodicities[habit_id] = info['periodicity'] if info is not None else None
+                if periodicities[habit_id] is None:
+                    continue
+
+                period = period_index(checkoff_date, periodicities[habit_id])
+                period_range = period_ranges.get(habit_id)
+                if period_range is None:
+                    period_ranges[habit_id] = [period, period]
+                elif period < period_range[0]:
+                    period_range[0] = period
+                elif period > period_range[1]:
+                    period_range[1] = period
+                rows.append((habit_id, self.format_checkoff_date(checkoff_date), to_timestamp(checkoff_date), period))
+                if len(rows) >= chunk_size:
+                    inserted += self.insert_checkoffs(rows)
+                    rows = []
+            if rows:
+                inserted += self.insert_checkoffs(rows)
+
+            # A large import is cheaper to roll up in one pass than habit by habit.
+            rebuild = not rollups_stale and inserted > last_id * ROLLUP_REBUILD_SHARE
+            for habit_id, (first_period, last_period) in period_ranges.items():
+                self.update_streak_state(habit_id, first_period)
+                if not rollups_stale and not rebuild:
+                    self.update_rollups(habit_id, periodicities[habit_id], first_period, last_period, last_id)
+            if rebuild:
+                rebuild_rollups(self.conn)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return inserted, total - inserted
+
+    def insert_checkoffs(self, rows):
+        """
+        Inserts tracking rows with one executemany call, without committing.
+
+        :param rows: (habit_id, checkoff_date, checkoff_ts, period) tuples.
+        :return: The number of inserted rows, rows of already checked off periods are skipped.
+        """
+        changes = self.conn.total_changes
+        self.conn.executemany(INSERT_CHECKOFF, rows)
+        return self.conn.total_changes - changes
+
+    def update_streak_state(self, habit_id, first_period):
+        """
+        Updates the cached streak of a habit after new periods were checked off, without committing.
+
+        :param habit_id: The ID of the habit.
+        :param first_period: The earliest newly checked off period.
+        """
+        state = self.get_streak_state(habit_id)
+        if state.last_period is not None and first_period < state.run_start:
+            # Back-dated before the current run, only a recompute can tell which runs were joined.
+            state = compute_streak_state(self.conn, habit_id, self.get_habit_info(habit_id)['periodicity'])
+        else:
+            # New periods up to the last one are already part of the current run, read the later ones from the index.
+            start = state.last_period + 1 if state.last_period is not None else first_period
+            for (period,) in self.conn.execute("SELECT period FROM tracking WHERE habit_id = ? AND period >= ? "
+                                               "ORDER BY period", (habit_id, start)):
+                state.add(period)
+        save_streak_state(self.conn, habit_id, state)
+
+    def update_rollups(self, habit_id, periodicity, first_period, last_period, last_id):
+        """
+        Updates the rollups after new periods of a habit were checked off, without committing.
+
+        :param habit_id: The ID of the habit.
+        :param periodicity: The periodicity of the habit.
+        :param first_period: The earliest newly checked off period.
+        :param last_period: The latest newly checked off period.
+        :param last_id: The highest tracking ID before the new rows were inserted.
+        """
+        first_period, last_period = rollup_period_range(first_period, last_period, periodicity)
+        save_rollup_changes(self.conn, compute_habit_rollups(self.conn, habit_id, first_period, last_period, last_id),
+                            compute_habit_rollups(self.conn, habit_id, first_period, last_period))
+
+    def rollups_stale(self):
+        """
+        Checks if the rollups table was emptied by rows from a plain SQL script and must be rebuilt.
+
+        :return: True if there are checkoffs but no rollups.
+        """
+        return bool(self.conn.execute("SELECT NOT EXISTS (SELECT 1 FROM rollups) "
+                                      "AND EXISTS (SELECT 1 FROM tracking)").fetchone()[0])
+
+    def rebuild_rollups(self):
+        """
+        Recomputes the daily and weekly rollups from the whole tracking table, e.g. for a store that
+        was changed by other tools.
+
+        :return: The number of rollup rows.
+        """
+        try:
+            rebuild_rollups(self.conn)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return self.conn.execute("SELECT COUNT(*) FROM rollups").fetchone()[0]
+
+    def get_rollups(self, periodicity="daily", start=None, end=None):
+        """
+        Retrieves the checkoff counts of all habits per day or per ISO week, from the rollups table
+        instead of the tracking table. Stale rollups are rebuilt first (or computed without saving
+        them if the database is read-only).
+
+        :param periodicity: 'daily' for one row per day, 'weekly' for one row per week.
+        :param start: The first date to include, None for no limit.
+        :param end: The last date to include, None for no limit.
+        :return: A list of dictionaries with the 'period', its first day as 'date', the number of
+            'checkoffs', 'active_habits' (habits checked off) and 'habits_on_streak' (habits whose
+            previous period was checked off too), ordered by period. Days or weeks without checkoffs
+            are left out.
+        """
+        first_period = period_index(start, periodicity) if start else -MAX_INTEGER
+        last_period = period_index(end, periodicity) if end else MAX_INTEGER
+        stale = self.rollups_stale()
+        if stale and self.read_only:
+            rows = sorted(row[1:] for row in self.conn.execute(ROLLUP_ROWS_SQL)
+                          if row[0] == periodicity and first_period <= row[1] <= last_period)
+        else:
+            if stale:
+                self.rebuild_rollups()
+            rows = self.conn.execute("SELECT period, checkoffs, active_habits, habits_on_streak FROM rollups "
+                                     "WHERE periodicity = ? AND period BETWEEN ? AND ? ORDER BY period",
+                                     (periodicity, first_period, last_period)).fetchall()
+        return [{'period': period, 'date': period_start(period, periodicity), 'checkoffs': checkoffs,
+                 'active_habits': active_habits, 'habits_on_streak': habits_on_streak}
+                for period, checkoffs, active_habits, habits_on_streak in rows]
+
+    def format_checkoff_date(self, checkoff_date):
+        """
+        Formats a checkoff date for the readable TEXT column.
+
+        :param checkoff_date: The date the habit was checked off.
+        :return: The formatted date, or None in compact storage mode.
+        """
+        if self.compact_dates:
+            return None
+        return checkoff_date.strftime("%Y-%m-%d %H:%M:%S")
 
     def update_habit_in_table(self, habit_id, new_name, new_description):
         """
@@ -83,52 +782,328 @@ class Database:
         :param new_name: The new name for the habit.
         :param new_description: The new description for the habit.
         """
-        self.conn.execute("UPDATE habits SET name = ?, description = ?"
-                          "WHERE id = ?", (new_name, new_description, habit_id))
-        self.conn.commit()
+        name = self.get_stored_name(habit_id)
+        try:
+            self.conn.execute("UPDATE habits SET name = ?, description = ?"
+                              "WHERE id = ?", (new_name, new_description, habit_id))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            self.invalidate_habit(habit_id, name) # After the commit, so no thread caches the old row again
 
     def get_all_habits(self):
         """
         Retrieves all stored habits along with their checkoff dates.
 
+        Habits and their tracking rows are loaded with a single joined query and
+        grouped in one pass, instead of one extra query per habit.
+
          :return: A list of dictionaries containing habit information.
         """
-        habits = []
-        cursor = self.conn.execute("SELECT id, name, description, periodicity, creation_date FROM habits")
-        habit_data = cursor.fetchall()
-        for row in habit_data:
-            habit_id = row[0]
-            habit = {
-                'id': habit_id,
-                'name': row[1],
-                'description': row[2],
-                'periodicity': row[3],
-                'creation_date': row[4],
-                'checkoff_dates': self.get_all_checkoff_dates(habit_id)
-            }
-            habits.append(habit)
-        return habits
+        return list(self.iter_habits(include_checkoffs=True))
+
+    def iter_habits(self, include_checkoffs=False, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Yields the stored habits one by one, ordered by ID.
+
+        Rows are fetched batch_size at a time, so memory does not grow with the number of habits.
+        With include_checkoffs, each habit is loaded together with its checkoff dates by a single
+        joined query and yielded as soon as its last tracking row was read.
+
+        :param include_checkoffs: Add the 'checkoff_dates' of each habit.
+        :param batch_size: The number of rows fetched from SQLite at once.
+        :return: A generator of dictionaries containing habit information.
+        """
+        if not include_checkoffs:
+            cursor = self.conn.execute("SELECT id, name, description, periodicity, creation_date "
+                                       "FROM habits ORDER BY id")
+            for row in fetch_in_batches(cursor, batch_size):
+                yield {
+                    'id': row[0],
+                    'name': row[1],
+                    'description': row[2],
+                    'periodicity': row[3],
+                    'creation_date': row[4]
+                }
+            return
+
+        cursor = self.conn.execute("""SELECT h.id, h.name, h.description, h.periodicity, h.creation_date,
+                                             t.checkoff_ts
+                                      FROM habits h
+                                      LEFT JOIN tracking t ON t.habit_id = h.id
+                                      ORDER BY h.id, t.checkoff_ts""")
+        habit = None
+        for row in fetch_in_batches(cursor, batch_size):
+            if habit is None or habit['id'] != row[0]: # First row of a new habit
+                if habit is not None:
+                    habit['checkoff_dates'] = from_timestamps(habit['checkoff_dates'])
+                    yield habit
+                habit = {
+                    'id': row[0],
+                    'name': row[1],
+                    'description': row[2],
+                    'periodicity': row[3],
+                    'creation_date': row[4],
+                    'checkoff_dates': []
+                }
+            if row[5] is not None: # LEFT JOIN yields NULL for habits without checkoffs
+                habit['checkoff_dates'].append(row[5])
+        if habit is not None:
+            habit['checkoff_dates'] = from_timestamps(habit['checkoff_dates'])
+            yield habit
+
+    def iter_checkoffs(self, habit_id=None, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Yields stored checkoff dates one by one, ordered by habit and date.
+
+        :param habit_id: Only yield the checkoffs of this habit, all habits if None.
+        :param batch_size: The number of rows fetched from SQLite at once.
+        :return: A generator of (habit_id, datetime) tuples.
+        """
+        if habit_id is None:
+            cursor = self.conn.execute("SELECT habit_id, checkoff_ts FROM tracking ORDER BY habit_id, checkoff_ts")
+        else:
+            cursor = self.conn.execute("SELECT habit_id, checkoff_ts FROM tracking WHERE habit_id = ? "
+                                       "ORDER BY checkoff_ts", (habit_id,))
+        for row in fetch_in_batches(cursor, batch_size):
+            yield row[0], from_timestamp(row[1])
 
     def get_all_checkoff_dates(self, habit_id):
         """
         Retrieves all stored checkoff dates for a specified habit.
 
         :param habit_id: The ID of the habit for which to retrieve checkoff dates.
-        :return: A list of datetime objects representing the checkoff dates.
+        :return: A list of datetime objects representing the checkoff dates, oldest first.
         """
-        cursor = self.conn.execute("SELECT checkoff_date FROM tracking WHERE habit_id = ?", (habit_id,))
+        cursor = self.conn.execute("SELECT checkoff_ts FROM tracking WHERE habit_id = ? ORDER BY checkoff_ts",
+                                   (habit_id,))
+        return from_timestamps([row[0] for row in cursor.fetchall()])
 
-        checkoff_dates = []
+    def get_checkoff_dates(self, habit_id, start=None, end=None):
+        """
+        Retrieves the checkoff dates of a habit in a date range, e.g. one month, with a range search
+        on the (habit_id, checkoff_ts) index instead of loading the whole history.
+
+        :param habit_id: The ID of the habit.
+        :param start: The first date to include, None for no limit.
+        :param end: The first date to exclude, None for no limit.
+        :return: A list of datetime objects, oldest first.
+        """
+        cursor = self.conn.execute("SELECT checkoff_ts FROM tracking "
+                                   "WHERE habit_id = ? AND checkoff_ts >= ? AND checkoff_ts < ? ORDER BY checkoff_ts",
+                                   (habit_id, *timestamp_range(start, end)))
+        return from_timestamps([row[0] for row in cursor.fetchall()])
+
+    def get_checkoffs_page(self, habit_ids=None, start=None, end=None, after=None, limit=DEFAULT_PAGE_SIZE):
+        """
+        Retrieves one page of the checkoffs of several habits in a date range, ordered by habit and date.
+
+        The next page continues after the (habit_id, date) key of the last row instead of skipping rows
+        with OFFSET, so every page is a few range searches on the (habit_id, checkoff_ts) index and costs
+        the same however old the habits are.
+
+        :param habit_ids: The IDs of the habits, all habits if None.
+        :param start: The first date to include, None for no limit.
+        :param end: The first date to exclude, None for no limit.
+        :param after: The key returned with the previous page, None for the first page.
+        :param limit: The maximum number of checkoffs per page, at least 1.
+        :return: A tuple with a list of (habit_id, datetime) tuples and the key of the next page,
+            None if this is the last page.
+        """
+        if limit < 1:
+            raise ValueError(f"The page size must be at least 1, got {limit}.")
+        if habit_ids is not None and not habit_ids:
+            return [], None
+        after_id, after_ts = (after[0], to_timestamp(after[1])) if after else (0, -MAX_INTEGER)
+        first_ts, end_ts = timestamp_range(start, end)
+        habit_filter = f"h.id IN ({', '.join('?' * len(habit_ids))}) AND " if habit_ids is not None else ""
+        # The habits are joined in ID order, which lets SQLite search each habit's range without sorting.
+        cursor = self.conn.execute(f"""SELECT t.habit_id, t.checkoff_ts
+                                        FROM habits h
+                                        JOIN tracking t ON t.habit_id = h.id
+                                        WHERE {habit_filter}h.id >= ? AND (h.id > ? OR t.checkoff_ts > ?)
+                                              AND t.checkoff_ts >= ? AND t.checkoff_ts < ?
+                                        ORDER BY h.id, t.checkoff_ts
+                                        LIMIT ?""",
+                                   (*(habit_ids or ()), after_id, after_id, after_ts, first_ts, end_ts, limit + 1))
+        rows = cursor.fetchall()
+        checkoffs = [(habit_id, date) for (habit_id, _), date
+                     in zip(rows[:limit], from_timestamps([row[1] for row in rows[:limit]]))]
+        return checkoffs, (checkoffs[-1] if len(rows) > limit else None)
+
+    def get_habit_names(self, periodicity=None, checked_off=None):
+        """
+        Retrieves habit names, filtered in SQL without loading any checkoff dates.
+
+        The checkoff filter is an EXISTS lookup on the tracking index, so its cost does not
+        depend on the number of stored checkoffs.
+
+        :param periodicity: Only return habits with this periodicity, all habits if None.
+        :param checked_off: True for habits with at least one checkoff, False for habits without, None for both.
+        :return: A list of habit names, ordered by ID.
+        """
+        conditions = []
+        parameters = []
+        if periodicity is not None:
+            conditions.append("periodicity = ?")
+            parameters.append(periodicity)
+        if checked_off is not None:
+            exists = "EXISTS (SELECT 1 FROM tracking t WHERE t.habit_id = h.id)"
+            conditions.append(exists if checked_off else "NOT " + exists)
+
+        query = "SELECT name FROM habits h"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        cursor = self.conn.execute(query + " ORDER BY id", parameters)
+        return [row[0] for row in cursor.fetchall()]
+
+    def get_habit(self, habit_id):
+        """
+        Retrieves a stored habit as a Habit object including its checkoff dates.
+
+        :param habit_id: The ID of the habit to load.
+        :return: The Habit object if found, None otherwise.
+        """
+        info = self.get_habit_info(habit_id)
+        if info is None:
+            return None
+
+        habit = Habit(info['name'], info['description'], info['periodicity'])
+        habit.creation_date = datetime.strptime(info['creation_date'], "%Y-%m-%d %H:%M:%S")
+        habit.checkoff_dates = self.get_all_checkoff_dates(habit_id)
+        return habit
+
+    def get_habit_info(self, habit_id):
+        """
+        Retrieves the metadata of a stored habit, served from the cache when possible.
+
+        :param habit_id: The ID of the habit.
+        :return: A dictionary with the id, name, description, periodicity and creation_date, or None.
+        """
+        generation = self.habit_cache.generation
+        row = self.habit_cache.get(habit_id)
+        if row is MISSING:
+            row = self.conn.execute("SELECT name, description, periodicity, creation_date FROM habits WHERE id = ?",
+                                    (habit_id,)).fetchone()
+            if row is None:
+                return None
+            self.habit_cache.put(habit_id, row, generation)
+
+        return {
+            'id': habit_id,
+            'name': row[0],
+            'description': row[1],
+            'periodicity': row[2],
+            'creation_date': row[3]
+        }
+
+    def get_streak_state(self, habit_id):
+        """
+        Retrieves the cached streak state of a habit, recomputing it if it is missing.
+
+        :param habit_id: The ID of the habit.
+        :return: A StreakState object, or None if the habit does not exist.
+        """
+        row = self.conn.execute(SELECT_STREAK_STATE, (habit_id,)).fetchone()
+        if row is None:
+            return None
+        if row[2] is not None:
+            return StreakState(*row[1:])
+
+        state = compute_streak_state(self.conn, habit_id, row[0])
+        if not self.read_only:
+            in_transaction = self.conn.in_transaction # E.g. called by add_streaks_bulk, which commits itself
+            save_streak_state(self.conn, habit_id, state)
+            if not in_transaction:
+                self.conn.commit()
+        return state
+
+    def get_all_streaks(self):
+        """
+        Retrieves the cached current and longest streak of all habits, without reading the tracking table.
+
+        :return: A list of dictionaries with the id, name, periodicity, current_streak and longest_streak.
+        """
+        return list(self.iter_streaks())
+
+    def iter_streaks(self, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Yields the cached current and longest streak of the habits one by one, ordered by ID.
+
+        :param batch_size: The number of rows fetched from SQLite at once.
+        :return: A generator of dictionaries with the id, name, periodicity, current_streak and longest_streak.
+        """
+        cursor = self.conn.execute("""SELECT h.id, h.name, h.periodicity, s.current_length, s.longest_length
+                                      FROM habits h
+                                      LEFT JOIN streaks s ON s.habit_id = h.id
+                                      ORDER BY h.id""")
+        for habit_id, name, periodicity, current, longest in fetch_in_batches(cursor, batch_size):
+            if current is None: # Missing cache entry, e.g. after rows were added by a SQL script
+                state = self.get_streak_state(habit_id)
+                current, longest = state.current, state.longest
+            yield {
+                'id': habit_id,
+                'name': name,
+                'periodicity': periodicity,
+                'current_streak': current,
+                'longest_streak': longest
+            }
+
+    def get_completion_counts(self, windows):
+        """
+        Counts the expected and the checked off periods of every habit in date windows, with one query
+        that counts on the (habit_id, period) index instead of loading any checkoff dates.
+
+        A habit is expected to be checked off in every period from its creation (or its first checkoff,
+        if that is earlier) until the end of a window.
+
+        :param windows: A list of (start, end) dates, start None for the whole history until end.
+        :return: A list of dictionaries with the id, name, periodicity and 'windows', a list with an
+            (expected, checked_off) tuple per window, ordered by ID.
+        """
+        parameters = {}
+        bounds = []
+        for i, (start, end) in enumerate(windows):
+            parameters.update({f"start_day_{i}": day_index(start) if start else 0,
+                               f"start_week_{i}": week_index(start) if start else 0,
+                               f"end_day_{i}": day_index(end), f"end_week_{i}": week_index(end)})
+            bounds.append(f"""MAX(habit_start, CASE periodicity WHEN 'weekly' THEN :start_week_{i}
+                                                    ELSE :start_day_{i} END) AS first_{i},
+                              CASE periodicity WHEN 'weekly' THEN :end_week_{i} ELSE :end_day_{i} END AS last_{i}""")
+
+        # Each count is a range search on the (habit_id, period) index, the bounds are computed once per habit.
+        counts = ", ".join(f"""first_{i}, last_{i},
+                               (SELECT COUNT(*) FROM tracking
+                                WHERE habit_id = b.id AND period BETWEEN b.first_{i} AND b.last_{i})"""
+                           for i in range(len(windows)))
+        cursor = self.conn.execute(f"""SELECT id, name, periodicity, {counts}
+                                        FROM (SELECT id, name, periodicity, {', '.join(bounds)}
+                                              FROM ({HABIT_START_SQL})) b
+                                        ORDER BY id""", parameters)
+
+        habits = []
         for row in cursor.fetchall():
-            date_str = row[0]
-            try: # First try parsing the full date-time format
-                checkoff_date = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-            except ValueError: # If it fails, try parsing just the date part
-                checkoff_date = datetime.strptime(date_str, "%Y-%m-%d")
+            window_counts = []
+            for first_period, last_period, checked_off in zip(row[3::3], row[4::3], row[5::3]):
+                expected = max(0, last_period - first_period + 1) if first_period is not None else 0
+                window_counts.append((expected, checked_off))
+            habits.append({'id': row[0], 'name': row[1], 'periodicity': row[2], 'windows': window_counts})
+        return habits
 
-            checkoff_dates.append(checkoff_date)
+    def get_gap_counts(self):
+        """
+        Finds the gaps (missed periods) between consecutive checkoffs of every habit in one query.
 
-        return checkoff_dates
+        :return: A list of dictionaries with the id, name, periodicity, the number of 'gaps', the
+            'longest_gap' and the total 'missed' periods between the first and the last checkoff,
+            and the 'last_period' checked off (None without checkoffs), ordered by ID.
+        """
+        return [{'id': habit_id, 'name': name, 'periodicity': periodicity, 'gaps': gaps or 0,
+                 'longest_gap': longest_gap or 0, 'missed': missed or 0, 'last_period': last_period}
+                for habit_id, name, periodicity, gaps, longest_gap, missed, last_period
+                in self.conn.execute(GAPS_SQL)]
 
     def get_habit_id(self, name):
         """
@@ -137,6 +1112,13 @@ class Database:
         :param name: The name of the habit to search for.
         :return: The ID of the habit if found, None otherwise.
         """
-        cursor = self.conn.execute("SELECT id FROM habits WHERE LOWER(name) = LOWER(?)", (name,))
-        result = cursor.fetchone()
-        return result[0] if result else None
\ No newline at end of file
+        key = name.translate(NOCASE)
+        generation = self.name_cache.generation
+        habit_id = self.name_cache.get(key)
+        if habit_id is MISSING:
+            result = self.conn.execute("SELECT id FROM habits WHERE name = ? COLLATE NOCASE", (name,)).fetchone()
+            if result is None:
+                return None # Unknown names are not cached
+            habit_id = result[0]
+            self.name_cache.put(key, habit_id, generation)
+        return habit_id
\ No newline at end of file
@@ -0,0 +1,259 @@
+import csv
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from itertools import accumulate
+from db import DEFAULT_BATCH_SIZE, fetch_in_batches
+from periods import from_timestamp
+
+# File extensions of the supported export formats.
+FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".hcol": "columnar"}
+
+# The CSV columns, habit rows leave 'date' empty and checkoff rows the habit fields, like the importer expects.
+CSV_FIELDS = ["name", "description", "periodicity", "creation_date", "date"]
+
+# Columnar files start with this magic, followed by blocks of at most batch_size rows. A block is a
+# kind byte (b"H" habits, b"C" checkoffs), the row count as uint32 and the columns, each stored as
+# uint32 size + zlib-compressed little-endian data. IDs and timestamps are delta encoded.
+MAGIC = b"HCOL\x01"
+HABIT_COLUMNS = ["id", "name", "description", "periodicity", "creation_date"]
+CHECKOFF_COLUMNS = ["id", "habit_id", "checkoff_ts"]
+
+
+def detect_format(path):
+    """
+    Returns the export format of a file by its extension.
+
+    :param path: The path of the file.
+    :return: 'csv', 'ndjson' or 'columnar'.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unknown file format '{extension}', use one of {', '.join(FORMATS)}.")
+    return FORMATS[extension]
+
+
+def get_export_position(db, name):
+    """
+    Returns the last habit and tracking IDs written by a named incremental export.
+
+    :param db: The Database to export from.
+    :param name: The name of the incremental export.
+    :return: A (last_habit_id, last_tracking_id) tuple, (0, 0) if the export never ran.
+    """
+    row = db.conn.execute("SELECT last_habit_id, last_tracking_id FROM export_progress WHERE name = ?",
+                          (name,)).fetchone()
+    return tuple(row) if row is not None else (0, 0)
+
+
+def iter_habit_rows(db, first_id, last_id, batch_size):
+    """Yields (id, name, description, periodicity, creation_date) of the habits with IDs in [first_id, last_id]."""
+    cursor = db.conn.execute("SELECT id, name, description, periodicity, creation_date FROM habits "
+                             "WHERE id BETWEEN ? AND ? ORDER BY id", (first_id, last_id))
+    return fetch_in_batches(cursor, batch_size)
+
+
+def iter_checkoff_rows(db, first_id, last_id, batch_size):
+    """Yields (id, habit_id, habit name, checkoff_ts) of the tracking rows with IDs in [first_id, last_id]."""
+    cursor = db.conn.execute("""SELECT t.id, t.habit_id, h.name, t.checkoff_ts
+                                FROM tracking t
+                                JOIN habits h ON h.id = t.habit_id
+                                WHERE t.id BETWEEN ? AND ?
+                                ORDER BY t.id""", (first_id, last_id))
+    return fetch_in_batches(cursor, batch_size)
+
+
+def format_timestamp(timestamp):
+    """Formats a stored timestamp like the dates in the database."""
+    return from_timestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def iter_records(habit_rows, checkoff_rows):
+    """
+    Converts habit and tracking rows to the records read by importer.import_records.
+
+    :return: A generator of ('habit' or 'checkoff', record dictionary) tuples.
+    """
+    for _, name, description, periodicity, creation_date in habit_rows:
+        yield "habit", {'name': name, 'description': description, 'periodicity': periodicity,
+                        'creation_date': creation_date}
+    for _, _, name, timestamp in checkoff_rows:
+        yield "checkoff", {'name': name, 'date': format_timestamp(timestamp)}
+
+
+def write_csv(out, habit_rows, checkoff_rows, report):
+    """Writes the rows as CSV with the columns CSV_FIELDS."""
+    writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, lineterminator="\n")
+    writer.writeheader()
+    for kind, record in iter_records(habit_rows, checkoff_rows):
+        writer.writerow(record)
+        report[kind + "s"] += 1
+
+
+def write_ndjson(out, habit_rows, checkoff_rows, report):
+    """Writes the rows as one JSON object per line."""
+    for kind, record in iter_records(habit_rows, checkoff_rows):
+        out.write(json.dumps(record) + "\n")
+        report[kind + "s"] += 1
+
+
+def pack_part(data):
+    """Compresses bytes, prefixed by the compressed size as uint32."""
+    data = zlib.compress(data)
+    return struct.pack("<I", len(data)) + data
+
+
+def pack_column(values):
+    """Packs an array as little-endian bytes."""
+    if sys.byteorder == "big":
+        values.byteswap()
+    return pack_part(values.tobytes())
+
+
+def pack_integers(values, delta=False):
+    """Packs a column of integers, optionally as differences to the previous value."""
+    if delta:
+        values = [value - previous for previous, value in zip([0] + values, values)]
+    return pack_column(array("q", values))
+
+
+def pack_strings(values):
+    """Packs a column of strings as their UTF-8 lengths (-1 for None) and the concatenated bytes."""
+    encoded = [value.encode("utf-8") if value is not None else None for value in values]
+    lengths = array("i", [len(value) if value is not None else -1 for value in encoded])
+    return pack_column(lengths) + pack_part(b"".join(value for value in encoded if value is not None))
+
+
+def write_block(out, kind, columns):
+    """Writes one block of the columnar format, see MAGIC."""
+    out.write(struct.pack("<cI", kind, len(columns[0])))
+    if kind == b"H":
+        out.write(pack_integers(columns[0], delta=True))
+        for values in columns[1:]:
+            out.write(pack_strings(values))
+    else:
+        out.write(pack_integers(columns[0], delta=True))
+        out.write(pack_integers(columns[1]))
+        out.write(pack_integers(columns[2], delta=True))
+
+
+def write_columnar(out, habit_rows, checkoff_rows, report, batch_size=DEFAULT_BATCH_SIZE):
+    """Writes the rows in the columnar binary format, one block per batch_size rows."""
+    out.write(MAGIC)
+    for kind, rows, width in ((b"H", habit_rows, len(HABIT_COLUMNS)), (b"C", checkoff_rows, len(CHECKOFF_COLUMNS))):
+        columns = [[] for _ in range(width)]
+        for row in rows:
+            if kind == b"C":
+                row = (row[0], row[1], row[3]) # Names are in the habit blocks
+            for column, value in zip(columns, row):
+                column.append(value)
+            if len(columns[0]) >= batch_size:
+                write_block(out, kind, columns)
+                columns = [[] for _ in range(width)]
+            report["habits" if kind == b"H" else "checkoffs"] += 1
+        if columns[0]:
+            write_block(out, kind, columns)
+
+
+def read_part(columnar_file):
+    """Reads one part written by pack_part and returns the decompressed bytes."""
+    size, = struct.unpack("<I", columnar_file.read(4))
+    return zlib.decompress(columnar_file.read(size))
+
+
+def read_column(columnar_file, typecode):
+    """Reads one column written by pack_column as an array."""
+    values = array(typecode, read_part(columnar_file))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def read_columnar(path):
+    """
+    Reads a file written in the columnar format, one block at a time.
+
+    :param path: The path of the file.
+    :return: A generator of ('habits' or 'checkoffs', {column name: list of values}) tuples.
+    """
+    with open(path, "rb") as columnar_file:
+        if columnar_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"'{path}' is not a columnar habit export.")
+        while True:
+            header = columnar_file.read(5)
+            if not header:
+                return
+            kind, count = struct.unpack("<cI", header)
+            ids = list(accumulate(read_column(columnar_file, "q")))
+            if len(ids) != count:
+                raise ValueError(f"'{path}' is corrupt, a block has the wrong number of rows.")
+
+            if kind == b"H":
+                block = {'id': ids}
+                for name in HABIT_COLUMNS[1:]:
+                    lengths = read_column(columnar_file, "i")
+                    text = read_part(columnar_file)
+                    values, position = [], 0
+                    for length in lengths:
+                        if length < 0:
+                            values.append(None)
+                        else:
+                            values.append(text[position:position + length].decode("utf-8"))
+                            position += length
+                    block[name] = values
+                yield "habits", block
+            else:
+                habit_ids = read_column(columnar_file, "q").tolist()
+                timestamps = list(accumulate(read_column(columnar_file, "q")))
+                yield "checkoffs", {'id': ids, 'habit_id': habit_ids, 'checkoff_ts': timestamps}
+
+
+def export_file(db, path, file_format=None, export_name=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Streams the habits and checkoffs of a database to a CSV, NDJSON or columnar file in constant memory.
+
+    With an export_name, only the habits and checkoffs added since the last export of that name are
+    written (by their AUTOINCREMENT IDs, so edited descriptions are not exported again), and the
+    position is saved once the file is complete. The rows are bounded by the IDs at the start, so
+    rows added during the export are left for the next one.
+
+    :param db: The Database to export from.
+    :param path: The path of the file to write.
+    :param file_format: 'csv', 'ndjson' or 'columnar', detected from the extension if None.
+    :param export_name: The name of an incremental export, None to export everything.
+    :param batch_size: The number of rows fetched from SQLite at once and per columnar block.
+    :return: A dictionary with the number of 'habits' and 'checkoffs', the 'last_tracking_id',
+        'seconds' and 'rows_per_sec'.
+    """
+    start = time.perf_counter()
+    file_format = file_format or detect_format(path)
+    last_habit_id, last_tracking_id = get_export_position(db, export_name) if export_name else (0, 0)
+    max_habit_id, max_tracking_id = db.conn.execute("SELECT (SELECT COALESCE(MAX(id), 0) FROM habits), "
+                                                    "(SELECT COALESCE(MAX(id), 0) FROM tracking)").fetchone()
+    max_habit_id = max(max_habit_id, last_habit_id) # Deleted rows must not move the position back
+    max_tracking_id = max(max_tracking_id, last_tracking_id)
+
+    habit_rows = iter_habit_rows(db, last_habit_id + 1, max_habit_id, batch_size)
+    checkoff_rows = iter_checkoff_rows(db, last_tracking_id + 1, max_tracking_id, batch_size)
+    report = {'habits': 0, 'checkoffs': 0, 'last_tracking_id': max_tracking_id}
+    if file_format == "columnar":
+        with open(path, "wb") as out:
+            write_columnar(out, habit_rows, checkoff_rows, report, batch_size)
+    else:
+        writer = write_csv if file_format == "csv" else write_ndjson
+        with open(path, "w", newline="" if file_format == "csv" else None, encoding="utf-8") as out:
+            writer(out, habit_rows, checkoff_rows, report)
+
+    if export_name:
+        db.conn.execute("INSERT OR REPLACE INTO export_progress (name, last_habit_id, last_tracking_id, updated_ts) "
+                        "VALUES (?, ?, ?, ?)", (export_name, max_habit_id, max_tracking_id, int(time.time())))
+        db.conn.commit()
+
+    report['seconds'] = time.perf_counter() - start
+    rows = report['habits'] + report['checkoffs']
+    report['rows_per_sec'] = rows / report['seconds'] if report['seconds'] else 0.0
+    return report
@@ -1,4 +1,7 @@
 from datetime import datetime
+from periods import period_index
+from profiling import profiled
+from streak import StreakState, streaks_for_dates
 
 
 class Habit:
@@ -19,6 +22,23 @@ class Habit:
         self.creation_date = datetime.now()
         self.checkoff_dates = []
 
+    @property
+    def checkoff_dates(self):
+        """The list of checkoff dates, assigning a new list resets the cached streak."""
+        return self._checkoff_dates
+
+    @checkoff_dates.setter
+    def checkoff_dates(self, checkoff_dates):
+        self._checkoff_dates = checkoff_dates
+        self.streak_state = None # Recomputed from the new dates when needed
+        self.checked_off_periods = None # Built from the new dates on the next checkoff
+
+    def get_checked_off_periods(self):
+        """Returns the set of period numbers (see periods.period_index) that are already checked off."""
+        if self.checked_off_periods is None:
+            self.checked_off_periods = {period_index(date, self.periodicity) for date in self.checkoff_dates}
+        return self.checked_off_periods
+
     # Accessor methods
     def get_name(self):
         """Returns the name of the habit."""
@@ -49,14 +69,16 @@ class Habit:
         if not checkoff_date:
             checkoff_date = datetime.now()
 
-        if self.checkoff_dates:
-            last_checkoff = self.checkoff_dates[-1]
-            if self.periodicity == "daily" and last_checkoff.date() == checkoff_date.date():
-                return False # Already checked off today
-            elif self.periodicity == "weekly" and last_checkoff.isocalendar()[1] == checkoff_date.isocalendar()[1]:
-                return False # Already checked off this week
+        # The day or ISO week of the checkoff, a back-dated checkoff is compared with all earlier ones.
+        period = period_index(checkoff_date, self.periodicity)
+        checked_off_periods = self.get_checked_off_periods()
+        if period in checked_off_periods:
+            return False # Already checked off on that day or in that week
 
+        checked_off_periods.add(period)
         self.checkoff_dates.append(checkoff_date)
+        if self.streak_state is not None and not self.streak_state.add(period):
+            self.streak_state = None # Back-dated before the current run, recompute when needed
         return True # Habit was checked off successfully
 
     def edit_habit(self, new_name, new_description):
@@ -68,41 +90,40 @@ class Habit:
         self.name = new_name
         self.description = new_description
 
+    @profiled
     def streak(self):
         """
         Calculates the current streak of checkoff dates.
 
         :return: The number of the consecutive checkoffs for the habit.
         """
-        if not self.checkoff_dates:
-            return 0
-
-        sorted_checkoff_dates = sorted(set(self.checkoff_dates))
-        current_streak = 1
-
-        for i in range(len(sorted_checkoff_dates) -1, 0, -1):
-            current = sorted_checkoff_dates[i]
-            previous = sorted_checkoff_dates[i - 1]
-
-            if self.periodicity == "daily":
-                if (current - previous).days == 1:
-                    current_streak += 1
-                else:
-                    break
-
-            elif self.periodicity == "weekly":
-                current_week = current.isocalendar()[1]
-                previous_week = previous.isocalendar()[1]
-                current_year = current.isocalendar()[0]
-                previous_year = previous.isocalendar()[0]
-
-                if (current_year == previous_year and current_week == previous_week + 1) or (
-                        current_year == previous_year +1 and current_week == 1 and previous_week in {52, 53}):
-                    current_streak += 1
-                else:
-                    break
-
-        return current_streak
+        return self.get_streak_state().current
+
+    def longest_streak(self):
+        """
+        Calculates the longest streak in the whole checkoff history.
+
+        :return: The highest number of consecutive checkoffs for the habit.
+        """
+        return self.get_streak_state().longest
+
+    def get_streak_state(self):
+        """
+        Returns the streak summary, which checkoff_habit keeps up to date after the first computation.
+
+        :return: A StreakState object (see streak.py).
+        """
+        if self.streak_state is None:
+            self.streak_state = StreakState.from_stats(self.streak_stats())
+        return self.streak_state
+
+    def streak_stats(self):
+        """
+        Calculates current streak, longest streak and all runs of the habit in one pass.
+
+        :return: A StreakStats tuple (see streak.py).
+        """
+        return streaks_for_dates(self.checkoff_dates, self.periodicity)
 
 def __str__(self) -> str:
     """Returns a string representation of the habit."""
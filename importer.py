@@ -0,0 +1,297 @@
+import csv
+import json
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+
+# File extensions of the supported dump formats.
+FORMATS = {".sql": "sql", ".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+PERIODICITIES = ("daily", "weekly")
+
+# Habits are matched by name (ignoring case, like the unique index). The description of an existing
+# habit is updated, its periodicity and creation date are kept since the stored periods depend on them.
+UPSERT_HABIT = """INSERT INTO habits (name, description, periodicity, creation_date) VALUES (?, ?, ?, ?)
+                  ON CONFLICT (name COLLATE NOCASE) DO UPDATE SET description = excluded.description"""
+
+# SQL dumps are run against these tables in a scratch database, then read back as records.
+STAGING_SCHEMA = """
+    CREATE TABLE habits (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, description TEXT,
+                         periodicity TEXT, creation_date DATE);
+    CREATE TABLE tracking (id INTEGER PRIMARY KEY AUTOINCREMENT, habit_id INTEGER, checkoff_date DATE);
+"""
+LEADING_COMMENTS = re.compile(r"^(\s+|--[^\n]*(\n|$)|/\*.*?\*/)*", re.DOTALL)
+INSERT_TARGET = re.compile(r"INSERT\s+(OR\s+\w+\s+)?INTO\s+[\"`\[]?(\w+)", re.IGNORECASE)
+SKIPPED_STATEMENTS = ("CREATE", "BEGIN", "COMMIT", "END", "PRAGMA")
+
+
+def detect_format(path):
+    """
+    Returns the dump format of a file by its extension.
+
+    :param path: The path of the file.
+    :return: 'sql', 'csv' or 'ndjson'.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unknown file format '{extension}', use one of {', '.join(FORMATS)}.")
+    return FORMATS[extension]
+
+
+def read_csv_records(lines):
+    """
+    Reads records from CSV lines with a header, e.g. 'name,description,periodicity,creation_date'
+    for habits or 'name,date' for checkoffs. Empty cells count as missing.
+
+    :param lines: An iterable of lines, e.g. an open file.
+    :return: A generator of record dictionaries.
+    """
+    for row in csv.DictReader(lines):
+        yield {key: value for key, value in row.items() if value not in (None, "")}
+
+
+def read_ndjson_records(lines):
+    """
+    Reads records from lines holding one JSON object each, blank lines are skipped.
+
+    :param lines: An iterable of lines, e.g. an open file.
+    :return: A generator of record dictionaries.
+    """
+    for line_number, line in enumerate(lines, start=1):
+        if line.strip():
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError(f"Line {line_number}: expected a JSON object.")
+            yield record
+
+
+def split_sql_statements(lines):
+    """
+    Splits SQL text into complete statements without reading it all at once.
+
+    :param lines: An iterable of lines, e.g. an open file.
+    :return: A generator of statements, comments before a statement are removed.
+    """
+    statement = ""
+    for line in lines:
+        statement += line
+        if sqlite3.complete_statement(statement):
+            statement = LEADING_COMMENTS.sub("", statement)
+            if statement:
+                yield statement
+            statement = ""
+    if LEADING_COMMENTS.sub("", statement):
+        raise ValueError(f"Incomplete SQL statement at the end: {statement.strip()[:80]}")
+
+
+def read_sql_records(lines):
+    """
+    Reads records from an SQL dump with INSERT statements into habits and tracking, like example_habit.sql.
+
+    The statements run in an in-memory database with the original tables, which translates the
+    dump's habit IDs to names. CREATE, BEGIN, COMMIT and PRAGMA statements are skipped.
+
+    :param lines: An iterable of lines, e.g. an open file.
+    :return: A generator of record dictionaries.
+    """
+    staging = sqlite3.connect(":memory:")
+    staging.executescript(STAGING_SCHEMA)
+    names = {} # Staging habit ID -> name
+    last_habit_id = 0
+    try:
+        for statement in split_sql_statements(lines):
+            keyword = statement.split(None, 1)[0].upper().rstrip(";")
+            if keyword in SKIPPED_STATEMENTS:
+                continue
+            target = INSERT_TARGET.match(statement)
+            if target is None or target.group(2).lower() not in ("habits", "tracking"):
+                raise ValueError(f"Unsupported SQL statement: {statement.strip()[:80]}")
+            staging.execute(statement)
+
+            if target.group(2).lower() == "habits":
+                for habit_id, name, description, periodicity, creation_date in staging.execute(
+                        "SELECT * FROM habits WHERE id > ? ORDER BY id", (last_habit_id,)).fetchall():
+                    names[habit_id] = name
+                    last_habit_id = habit_id
+                    yield {'name': name, 'description': description, 'periodicity': periodicity,
+                           'creation_date': creation_date}
+            else:
+                for habit_id, checkoff_date in staging.execute("SELECT habit_id, checkoff_date FROM tracking "
+                                                               "ORDER BY id").fetchall():
+                    yield {'name': names.get(habit_id), 'date': checkoff_date}
+                staging.execute("DELETE FROM tracking") # Only the habits are needed for later statements
+    finally:
+        staging.close()
+
+
+def read_records(path, file_format=None):
+    """
+    Streams the records of a dump file.
+
+    :param path: The path of the file.
+    :param file_format: 'sql', 'csv' or 'ndjson', detected from the extension if None.
+    :return: A generator of record dictionaries.
+    """
+    readers = {'sql': read_sql_records, 'csv': read_csv_records, 'ndjson': read_ndjson_records}
+    file_format = file_format or detect_format(path)
+    with open(path, newline="" if file_format == "csv" else None, encoding="utf-8") as lines:
+        yield from readers[file_format](lines)
+
+
+def parse_date(value):
+    """
+    Parses a date written as YYYY-MM-DD, optionally followed by a time.
+
+    :param value: The date string or a datetime, e.g. '2024-05-01T08:00:00Z'.
+    :return: A naive datetime in local time, or None if the value is not a valid date.
+    """
+    try:
+        date = value if isinstance(value, datetime) else datetime.fromisoformat(value.strip())
+    except (AttributeError, ValueError):
+        return None
+    if date.tzinfo is not None:
+        date = date.astimezone().replace(tzinfo=None) # Stored dates are naive local times
+    return date
+
+
+def file_fingerprint(path):
+    """Returns the size and modification time of a file, which change when the file is rewritten."""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def get_import_position(db, source, fingerprint=None):
+    """
+    Returns the number of records of a source that were already imported by an interrupted import.
+
+    :param db: The Database to import into.
+    :param source: The name of the source, e.g. the absolute path of the file.
+    :param fingerprint: The current file_fingerprint of the source, None if it has none.
+    :return: The number of committed records, 0 if the source is new or was changed since.
+    """
+    row = db.conn.execute("SELECT position, fingerprint FROM import_progress WHERE source = ?", (source,)).fetchone()
+    return row[0] if row is not None and row[1] == fingerprint else 0
+
+
+def import_chunk(db, records, source, position, report, fingerprint=None):
+    """
+    Imports a chunk of records in one transaction together with the import position.
+
+    :param db: The Database to import into.
+    :param records: The record dictionaries of the chunk.
+    :param source: The name of the source, None to not record the position.
+    :param position: The number of records of the source imported after this chunk.
+    :param report: The report dictionary, its counters are updated.
+    :param fingerprint: The file_fingerprint of the source, stored with the position.
+    """
+    conn = db.conn
+    habits = [] # Invalidated after the commit, the descriptions may have changed
+    try:
+        if source is not None:
+            conn.execute("INSERT OR REPLACE INTO import_progress (source, position, updated_ts, fingerprint) "
+                         "VALUES (?, ?, ?, ?)", (source, position, int(time.time()), fingerprint))
+
+        # Habits first, so checkoffs can refer to habits of the same chunk.
+        checkoffs = []
+        for record in records:
+            name = record.get('name')
+            if record.get('periodicity') is not None:
+                if not name or record['periodicity'] not in PERIODICITIES:
+                    raise ValueError(f"Invalid habit record: {record}")
+                creation_date = parse_date(record['creation_date']) if record.get('creation_date') else datetime.now()
+                if creation_date is None:
+                    report['rejected'] += 1 # Stored dates must be readable by Database.get_habit
+                    continue
+                conn.execute(UPSERT_HABIT, (name, record.get('description', ""), record['periodicity'],
+                                            creation_date.strftime("%Y-%m-%d %H:%M:%S")))
+                habit_id = db.get_habit_id(name)
+                habits.append((habit_id, name))
+                conn.execute("INSERT OR IGNORE INTO streaks (habit_id) VALUES (?)", (habit_id,))
+                report['habits'] += 1
+            if record.get('date') is not None:
+                checkoffs.append((name, record['date']))
+
+        resolved = []
+        for name, checkoff_date in checkoffs:
+            habit_id = db.get_habit_id(name) if name else None
+            checkoff_date = parse_date(checkoff_date)
+            if habit_id is None or checkoff_date is None:
+                report['rejected'] += 1 # Unknown habit or invalid date
+            else:
+                resolved.append((habit_id, checkoff_date))
+
+        # add_streaks_bulk commits the progress, the habits and the checkoffs together.
+        inserted, skipped = db.add_streaks_bulk(resolved)
+        report['checkoffs'] += inserted
+        report['skipped'] += skipped
+    except Exception:
+        conn.rollback()
+        db.clear_caches() # May hold habits of the rolled back chunk
+        raise
+    for habit_id, name in habits:
+        db.invalidate_habit(habit_id, name)
+
+
+def import_records(db, records, source=None, chunk_size=10000, restart=False, fingerprint=None):
+    """
+    Imports habit and checkoff records, committing every chunk_size records.
+
+    A record with a periodicity adds the habit named 'name' or updates its description, a record with
+    a 'date' checks off the habit named 'name' (both may be in one record). Checkoffs in an already
+    checked off period are skipped, so importing the same data twice does not add anything.
+    Creation dates are stored as 'YYYY-MM-DD HH:MM:SS' like the app writes them, records with a
+    date that cannot be parsed are rejected.
+    If a source name is given, the position is committed with each chunk, and a later import of
+    the same source with the same fingerprint continues after the last committed record. The
+    position is removed once all records were read, so the next import reads everything again.
+
+    :param db: The Database to import into.
+    :param records: An iterable of record dictionaries, e.g. from read_records.
+    :param source: The name of the source to resume, None to always import everything.
+    :param chunk_size: The number of records per transaction.
+    :param restart: Import the source from the beginning, ignoring the stored position.
+    :param fingerprint: Identifies the content of the source, e.g. from file_fingerprint. A stored
+        position with another fingerprint is ignored.
+    :return: A dictionary with the counts of 'records', 'habits', 'checkoffs', 'skipped' (already
+        checked off) and 'rejected' (unknown habit or invalid date), 'resumed_from', 'seconds' and
+        'rows_per_sec'.
+    """
+    start = time.perf_counter()
+    position = 0 if source is None or restart else get_import_position(db, source, fingerprint)
+    report = {'records': 0, 'habits': 0, 'checkoffs': 0, 'skipped': 0, 'rejected': 0, 'resumed_from': position}
+
+    chunk = []
+    for index, record in enumerate(records):
+        if index < position:
+            continue # Committed by an earlier, interrupted import
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            import_chunk(db, chunk, source, position + report['records'] + len(chunk), report, fingerprint)
+            report['records'] += len(chunk)
+            chunk = []
+    if chunk:
+        import_chunk(db, chunk, source, position + report['records'] + len(chunk), report, fingerprint)
+        report['records'] += len(chunk)
+    if source is not None: # Complete, nothing to resume
+        db.conn.execute("DELETE FROM import_progress WHERE source = ?", (source,))
+        db.conn.commit()
+
+    report['seconds'] = time.perf_counter() - start
+    report['rows_per_sec'] = report['records'] / report['seconds'] if report['seconds'] else 0.0
+    return report
+
+
+def import_file(db, path, file_format=None, chunk_size=10000, restart=False):
+    """
+    Imports an SQL, CSV or NDJSON dump file, resuming an interrupted import of the unchanged file.
+
+    :param db: The Database to import into.
+    :param path: The path of the file.
+    :param file_format: 'sql', 'csv' or 'ndjson', detected from the extension if None.
+    :param chunk_size: The number of records per transaction.
+    :param restart: Import the file from the beginning, ignoring the stored position.
+    :return: The report of import_records.
+    """
+    return import_records(db, read_records(path, file_format), source=os.path.abspath(path),
+                          chunk_size=chunk_size, restart=restart, fingerprint=file_fingerprint(path))
@@ -1,14 +1,20 @@
 from datetime import datetime
-import questionary
-import sqlite3
 import os
+import sys
+import commands
 from db import Database
 from habit import Habit
 from analyse import Analyse
+from importer import import_file
 
 # Set the default database to be used
 current_db = "main.db"
 
+def load_ui():
+    """Import questionary, which pulls in prompt_toolkit and is only needed for the interactive menu."""
+    global questionary
+    import questionary
+
 def initialize_modules():
     """Initialize the Database and Analyse instances with the current database."""
     global db, analyse
@@ -26,17 +32,14 @@ def load_sql_script(script_path):
     try:
         current_db = "example.db" # Switch to example.db for predefined data
 
-        with sqlite3.connect(current_db) as conn:
-            with open(script_path, 'r') as sql_file:
-                sql_script = sql_file.read()
-            conn.executescript(sql_script)
+        # Habits are matched by name and checkoffs by period, so loading the data again adds no duplicates.
+        db = Database(db_name=current_db)
+        report = import_file(db, script_path)
 
-        print(f"Example data was successfully loaded into {current_db}. "
+        print(f"Example data was successfully loaded into {current_db} "
+              f"({report['records']} new rows, {report['rows_per_sec']:.0f} rows/s). "
               "'Make it a Habit' now uses the predefined example data.")
 
-        # Reinitialize database with example.db
-        db = Database(db_name=current_db)
-
     except Exception as e:
         print(f"Error loading SQL script: {e}")
 
@@ -54,41 +57,46 @@ def prompt_load_example_data():
         print("Okay, we are continuing without loading the example data.")
 
 def main_menu():
-    """Display the main menu and route the user to different actions based on their selection."""
-    start = questionary.confirm("Welcome! Are you ready to start?").ask()
+    """Display the main menu and route the user to different actions based on their selection.
 
-    if not start:
-        exit_cli() # Exit the program if user don't want to start.
+    The menu runs in a loop, each action returns here when it is done, until the user exits.
+    """
+    # Split choices into separated functions to keep better track.
+    actions = {
+        "Add habit": add_habit_cli,
+        "Check off habit": checkoff_habit_cli,
+        "Edit habit": edit_habit_cli,
+        "Analyse habits": analyse_habit_cli,
+        "Delete habit": delete_habit_cli
+    }
 
-    choice = questionary.select(
-        "What do you want to do?",
-        choices = ["Add habit", "Check off habit", "Edit habit", "Analyse habits", "Delete habit", "Exit"]
-    ).ask()
+    while True:
+        start = questionary.confirm("Welcome! Are you ready to start?").ask()
 
-    # Split choices into separated functions to keep better track.
-    if choice == "Add habit":
-        add_habit_cli()
-    elif choice == "Check off habit":
-        checkoff_habit_cli()
-    elif choice == "Edit habit":
-        edit_habit_cli()
-    elif choice == "Analyse habits":
-        analyse_habit_cli()
-    elif choice == "Delete habit":
-        delete_habit_cli()
-    elif choice == "Exit":
-        exit_cli()
+        if not start:
+            exit_cli() # Exit the program if user don't want to start.
+            return
+
+        choice = questionary.select(
+            "What do you want to do?",
+            choices = list(actions) + ["Exit"]
+        ).ask()
+
+        if choice in actions:
+            actions[choice]()
+        else: # "Exit", or the prompt was cancelled
+            exit_cli()
+            return
 
 def add_habit_cli():
     """Add a new habit based on user input."""
-    name = questionary.text("Please enter the name of your habit.").ask()
+    while True:
+        name = questionary.text("Please enter the name of your habit.").ask()
 
-    # Check for already existing habit names to prevent duplicates.
-    existing_habits = [habit['name'] for habit in db.get_all_habits()]
-    if name in existing_habits:
+        # Check for already existing habit names (ignoring case) to prevent duplicates.
+        if not db.check_habit_exists(name):
+            break # Exit loop if valid name is found.
         print(f"The habit '{name}' already exists. Please enter another name for your new habit.")
-        add_habit_cli() # Come back to start
-        return
 
     description = questionary.text("If you want to, you can add a description.").ask()
     periodicity = questionary.select(
@@ -98,27 +106,19 @@ def add_habit_cli():
     habit = Habit(name, description, periodicity)
     db.add_habit_to_table(habit)
     print(f"Your new habit '{name}' was added successfully!")
-    main_menu()
 
 def checkoff_habit_cli():
     """Check off a habit for today or a custom date."""
-    habits = db.get_all_habits()
-    if not habits: # Check if there are habits, if not go back to main menu
+    habit_names = db.get_habit_names()
+    if not habit_names: # Check if there are habits, if not go back to main menu
         print("Sorry, there are no habits to check off.")
-        main_menu()
         return
 
-    habit_names = [habit['name'] for habit in habits]
     habit_name = questionary.select("Which habit do you want to check off?", choices=habit_names).ask()
 
-    # Look for habit details.
-    habit_data = next(h for h in habits if h['name'] == habit_name)
+    # Load the habit with its checkoff dates from the database.
     habit_id = db.get_habit_id(habit_name)
-
-    # Look for checkoff dates in the database and create object.
-    checkoff_dates = db.get_all_checkoff_dates(habit_id)
-    habit = Habit(habit_data['name'], habit_data['description'], habit_data['periodicity'])
-    habit.checkoff_dates = checkoff_dates
+    habit = db.get_habit(habit_id)
 
     # Ask if the user wants to add a custom date or today's date.
     use_custom_date = questionary.confirm("Do you want to enter a custom checkoff date?").ask()
@@ -144,25 +144,21 @@ def checkoff_habit_cli():
     else:
         print(f"Your habit '{habit_name}' was already checked off in the given periodicity.")
 
-    main_menu()
-
 def edit_habit_cli():
     """Edit an existing habit's name and description."""
-    habits = db.get_all_habits()
-    if not habits:
+    habit_names = db.get_habit_names()
+    if not habit_names:
         print("Sorry, there are no habits to edit.")
-        main_menu()
         return
 
-    habit_names = [habit['name'] for habit in habits]
     habit_name = questionary.select("Which habit do you want to edit?", choices=habit_names).ask()
 
     # Start a loop to check for already existing habit names to prevent duplicates.
     while True:
         new_name = questionary.text("Please enter the new name for your habit.").ask()
     # Make sure that the same name can be reused.
-        existing_habits = [habit['name'] for habit in habits if habit['name'] != habit_name]
-        if new_name in existing_habits:
+        existing_habits = [name.lower() for name in habit_names if name != habit_name]
+        if new_name.lower() in existing_habits:
             print(f"The habit '{new_name}' already exists. Please enter another name for your new habit.")
         else:
             break # Exit loop if valid name is found.
@@ -172,7 +168,6 @@ def edit_habit_cli():
     habit_id = db.get_habit_id(habit_name)
     db.update_habit_in_table(habit_id, new_name, new_description)
     print(f"Your habit '{new_name}' was edited successfully!")
-    main_menu()
 
 def analyse_habit_cli():
     """Provide analysis options for the user to view their habits' data."""
@@ -195,7 +190,6 @@ def analyse_habit_cli():
             print("These are all your currently tracked habits:", ", ".join(all_habits))
         else:
             print("There are no currently tracked habits.")
-        main_menu()
 
     elif choice == "Show all at least once checked off habits":
         # Retrieve all stored habits (daily AND weekly) with at least one checkoff date, sorted by ID.
@@ -205,7 +199,6 @@ def analyse_habit_cli():
                   "with at least one checkoff date:", ", ".join(tracked_habits))
         else:
             print("There are no currently tracked habits.")
-        main_menu()
 
     elif choice == "Show all habits by periodicity":
         # Retrieve all stored habits with or without checkoff dates, filtered by periodicity (i.e. daily OR weekly).
@@ -217,7 +210,6 @@ def analyse_habit_cli():
               ", ".join(with_checkoff) if with_checkoff else "None")
         print(f"Your {periodicity} habits without checkoff dates are:",
               ", ".join(without_checkoff) if without_checkoff else "None")
-        main_menu()
 
     elif choice == "Show all at least once checked off habits by periodicity":
         # Retrieve all stored habits with at least one checkoff date, filtered by periodicity (i.e. daily OR weekly).
@@ -230,7 +222,6 @@ def analyse_habit_cli():
                 ", ".join(with_checkoff))
         else:
             print(f"There are not {periodicity} habits with at least one checkoff date.")
-        main_menu()
 
     elif choice == "Show longest streak for daily habits":
         # Retrieve the daily habit(s) with the longest streak.
@@ -240,7 +231,6 @@ def analyse_habit_cli():
             print(f"Your daily habits with the longest streak are '{habit_list}' with {streak} days.")
         else:
             print("There are no daily habits with a streak.")
-        main_menu()
 
     elif choice == "Show longest streak for weekly habits":
         # Retrieve the weekly habit(s) with the longest streak.
@@ -250,16 +240,13 @@ def analyse_habit_cli():
             print(f"Your weekly habits with the longest streak are '{habit_list}' with {streak} weeks.")
         else:
             print("There are no weekly habits with a streak.")
-        main_menu()
 
     elif choice == "Show longest streak for a specific habit":
         # Retrieve the longest streak of a given habit.
-        habits = db.get_all_habits()
-        if not habits:
+        habit_names = db.get_habit_names()
+        if not habit_names:
             print("Sorry, there are no habits to analyze.")
-            main_menu()
             return
-        habit_names = [habit['name'] for habit in habits]
         habit_name = questionary.select("Which habit do you want to analyze?", choices=habit_names).ask()
 
         habit_name, streak = analyse.get_longest_streak_by_name(habit_name)
@@ -267,20 +254,16 @@ def analyse_habit_cli():
             print(f"The longest streak for your habit '{habit_name}' is: {streak}")
         else:
             print(f"There is no streak for habit '{habit_name}'.")
-        main_menu()
 
-    elif choice == "Exit Analyse habits":
-        main_menu()
+    # "Exit Analyse habits" returns to the main menu.
 
 def delete_habit_cli():
     """Delete a habit from the database based on user selection."""
-    habits = db.get_all_habits()
-    if not habits:
+    habit_names = db.get_habit_names()
+    if not habit_names:
         print("Sorry, there are no habits to delete.")
-        main_menu()
         return
 
-    habit_names = [habit['name'] for habit in habits]
     habit_name = questionary.select("Which habit do you want to delete?", choices=habit_names).ask()
 
     confirm_delete = questionary.confirm(f"Are you sure you want to delete '{habit_name}'? "
@@ -291,7 +274,6 @@ def delete_habit_cli():
         print(f"Your habit '{habit_name}' was deleted successfully!")
     else:
         print(f"Your habit '{habit_name}' was not deleted.")
-    main_menu()
 
 def exit_cli():
     """Exit the application."""
@@ -299,6 +281,12 @@ def exit_cli():
     exit()
 
 if __name__ == "__main__":
+    # With arguments, run a single command without prompts, e.g. 'python main.py stats'.
+    if len(sys.argv) > 1:
+        sys.exit(commands.run(sys.argv[1:]))
+
+    load_ui()
+
     # Ask the user whether to load example data or not
     prompt_load_example_data()
 
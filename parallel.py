@@ -0,0 +1,119 @@
+import heapq
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from analyse import add_to_leaderboard
+from db import Database
+from periods import period_indices
+from streak import compute_streaks
+
+
+def get_id_chunks(db_name, chunk_size):
+    """
+    Partitions the habit IDs of a database into ranges of at most chunk_size habits.
+
+    :param db_name: The name of the database file.
+    :param chunk_size: The maximum number of habits per chunk.
+    :return: A list of (first_id, last_id) tuples in ascending order.
+    """
+    db = Database(db_name, read_only=True)
+    try:
+        ids = [row[0] for row in db.conn.execute("SELECT id FROM habits ORDER BY id")]
+    finally:
+        db.close()
+    return [(ids[start], ids[min(start + chunk_size, len(ids)) - 1]) for start in range(0, len(ids), chunk_size)]
+
+
+def compute_chunk(db_name, first_id, last_id, top_k):
+    """
+    Computes the streaks of the habits with IDs in [first_id, last_id], run in a worker process.
+
+    The checkoffs are loaded as integer timestamps into one array per habit and the streaks are
+    computed from the full history, without creating datetime objects.
+
+    :param db_name: The name of the database file.
+    :param first_id: The first habit ID of the chunk.
+    :param last_id: The last habit ID of the chunk.
+    :param top_k: The number of entries to keep per ranking.
+    :return: A dictionary {periodicity: partial statistics}, see merge_chunks.
+    """
+    db = Database(db_name, read_only=True)
+    try:
+        habits = db.conn.execute("SELECT id, name, periodicity FROM habits WHERE id BETWEEN ? AND ? ORDER BY id",
+                                 (first_id, last_id)).fetchall()
+        timestamps = {habit_id: array("q") for habit_id, _, _ in habits}
+        for habit_id, timestamp in db.conn.execute("SELECT habit_id, checkoff_ts FROM tracking "
+                                                   "WHERE habit_id BETWEEN ? AND ? ORDER BY habit_id, checkoff_ts",
+                                                   (first_id, last_id)):
+            timestamps[habit_id].append(timestamp)
+    finally:
+        db.close()
+
+    results = {}
+    for habit_id, name, periodicity in habits:
+        stats = compute_streaks(period_indices(timestamps[habit_id], periodicity))
+        result = results.setdefault(periodicity, {
+            "habits": 0, "checkoffs": 0, "current": [], "longest": [],
+            "current_leaders": ([], 0), "longest_leaders": ([], 0)})
+        result["habits"] += 1
+        result["checkoffs"] += len(timestamps[habit_id])
+
+        for kind, streak in (("current", stats.current), ("longest", stats.longest)):
+            add_to_leaderboard(result, kind, habit_id, name, streak, top_k)
+    return results
+
+
+def merge_chunks(chunk_results, top_k):
+    """
+    Merges the partial statistics of the chunks, which must be in ascending ID order.
+
+    :param chunk_results: The results of compute_chunk.
+    :param top_k: The number of entries per ranking.
+    :return: A dictionary keyed by periodicity, like Analyse.get_leaderboard plus 'habits' and 'checkoffs' counts.
+    """
+    report = {}
+    for results in chunk_results:
+        for periodicity, result in results.items():
+            board = report.setdefault(periodicity, {
+                "habits": 0, "checkoffs": 0, "current": [], "longest": [],
+                "current_leaders": ([], 0), "longest_leaders": ([], 0)})
+            board["habits"] += result["habits"]
+            board["checkoffs"] += result["checkoffs"]
+            for kind in ("current", "longest"):
+                board[kind].extend(result[kind])
+
+                # Chunks arrive in ID order, so appending keeps the tie lists in the same order as Analyse.
+                leaders, longest_streak = result[kind + "_leaders"]
+                if longest_streak > board[kind + "_leaders"][1]:
+                    board[kind + "_leaders"] = (list(leaders), longest_streak)
+                elif longest_streak == board[kind + "_leaders"][1]:
+                    board[kind + "_leaders"][0].extend(leaders)
+
+    for board in report.values():
+        for kind in ("current", "longest"):
+            board[kind] = [(name, streak) for streak, _, name in heapq.nlargest(top_k, board[kind])]
+    return report
+
+
+def parallel_leaderboard(db_name, top_k=3, chunk_size=10000, processes=None):
+    """
+    Computes the streak leaderboard of a large database in parallel worker processes.
+
+    The habits are split into chunks of consecutive IDs, each worker computes the streaks of one
+    chunk from the raw checkoffs and the partial results are merged. Equal streaks are ranked by
+    habit ID, so the result is the same for any number of workers.
+
+    :param db_name: The name of the database file.
+    :param top_k: The number of entries per periodicity and ranking.
+    :param chunk_size: The maximum number of habits per chunk.
+    :param processes: The number of worker processes, all cores if None, 0 to run in this process.
+    :return: A dictionary keyed by periodicity, like Analyse.get_leaderboard plus 'habits' and 'checkoffs' counts.
+    """
+    chunks = get_id_chunks(db_name, chunk_size)
+    if processes == 0:
+        results = [compute_chunk(db_name, first_id, last_id, top_k) for first_id, last_id in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as executor:
+            results = list(executor.map(compute_chunk, [db_name] * len(chunks), [first for first, _ in chunks],
+                                        [last for _, last in chunks], [top_k] * len(chunks)))
+    return merge_chunks(results, top_k)
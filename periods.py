@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+
+# NumPy is optional and only used for large batches, it is imported on first use since the import is slow.
+np = None
+numpy_checked = False
+
+# Checkoff dates are stored as whole seconds since this (naive) epoch.
+EPOCH = datetime(1970, 1, 1)
+SECONDS_PER_DAY = 86400
+
+# Below this size the plain Python decoding is faster than converting to a NumPy array.
+VECTORIZE_THRESHOLD = 1000
+
+
+def to_timestamp(date):
+    """
+    Converts a datetime to the integer stored in the tracking table.
+
+    :param date: The datetime to convert, microseconds are dropped.
+    :return: The number of seconds since the epoch.
+    """
+    return (date - EPOCH) // timedelta(seconds=1)
+
+
+def from_timestamp(timestamp):
+    """
+    Converts a stored integer timestamp back to a datetime.
+
+    :param timestamp: The number of seconds since the epoch.
+    :return: A datetime object.
+    """
+    return EPOCH + timedelta(seconds=timestamp)
+
+
+def get_numpy():
+    """
+    Imports NumPy on first use.
+
+    :return: The numpy module, or None if it is not installed.
+    """
+    global np, numpy_checked
+    if not numpy_checked:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        numpy_checked = True
+    return np
+
+
+def from_timestamps(timestamps):
+    """
+    Converts a sequence of stored integer timestamps back to datetimes in one go.
+
+    :param timestamps: A sequence of seconds since the epoch.
+    :return: A list of datetime objects.
+    """
+    if len(timestamps) >= VECTORIZE_THRESHOLD and get_numpy() is not None:
+        return np.asarray(timestamps, dtype="datetime64[s]").tolist()
+    return [EPOCH + timedelta(seconds=timestamp) for timestamp in timestamps]
+
+
+def day_index(date):
+    """
+    Returns the number of days between the epoch and the given date.
+
+    :param date: A datetime or date object.
+    :return: The day number, 0 for 1970-01-01.
+    """
+    return date.toordinal() - EPOCH.toordinal()
+
+
+def week_index(date):
+    """
+    Returns the number of ISO weeks between the epoch and the given date.
+    Weeks start on Monday, week 0 is the week of 1970-01-01 (a Thursday).
+
+    :param date: A datetime or date object.
+    :return: The week number.
+    """
+    return (day_index(date) + 3) // 7
+
+
+def period_index(date, periodicity):
+    """
+    Maps a date to the integer period it falls into.
+
+    :param date: A datetime or date object.
+    :param periodicity: The periodicity of the habit, either 'daily' or 'weekly'.
+    :return: The day number for daily habits, the week number for weekly habits.
+    """
+    if periodicity == "weekly":
+        return week_index(date)
+    return day_index(date)
+
+
+def period_indices(timestamps, periodicity):
+    """
+    Maps stored integer timestamps to period numbers without creating datetime objects.
+
+    :param timestamps: A sequence of seconds since the epoch.
+    :param periodicity: The periodicity of the habit, either 'daily' or 'weekly'.
+    :return: A list of day numbers for daily habits or week numbers for weekly habits.
+    """
+    if periodicity == "weekly":
+        return [(timestamp // SECONDS_PER_DAY + 3) // 7 for timestamp in timestamps]
+    return [timestamp // SECONDS_PER_DAY for timestamp in timestamps]
+
+
+def period_start(period, periodicity):
+    """
+    Returns the first day of a period, the inverse of period_index.
+
+    :param period: The day number for daily habits, the week number for weekly habits.
+    :param periodicity: Either 'daily' or 'weekly'.
+    :return: A datetime at midnight, a Monday for weekly periods.
+    """
+    if periodicity == "weekly":
+        return EPOCH + timedelta(days=period * 7 - 3)
+    return EPOCH + timedelta(days=period)
@@ -0,0 +1,223 @@
+import functools
+import json
+import sqlite3
+import threading
+import time
+
+# The Profiler that collects function timings, set while a Profiler is used as a context manager.
+active = None
+
+
+class Stat:
+    """Call count, total and maximum time and row count of one SQL statement or function."""
+    __slots__ = ("calls", "seconds", "max_seconds", "rows")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+
+
+class Profiler:
+    """
+    Collects the timing of SQL statements and of instrumented functions.
+
+    SQL statements are recorded for every Database created with profiler=..., the functions
+    decorated with profiled (the Analyse methods and Habit.streak) while the profiler is active:
+
+        profiler = Profiler()
+        db = Database("main.db", profiler=profiler)
+        with profiler:
+            Analyse(db).get_leaderboard()
+        print(profiler.to_prometheus())
+    """
+
+    def __init__(self):
+        """Initializing a new Profiler instance without any recorded calls."""
+        self.statements = {} # Normalized SQL -> Stat
+        self.functions = {} # Qualified function name -> Stat
+        self.lock = threading.Lock()
+        self.previous = []
+
+    def record_statement(self, sql, seconds, rows=0, calls=1):
+        """
+        Adds the time spent on an SQL statement.
+
+        :param sql: The SQL statement, whitespace is normalized so equal statements are grouped.
+        :param seconds: The time spent executing the statement or fetching its rows.
+        :param rows: The number of rows fetched or changed.
+        :param calls: 1 for an execution, 0 for fetching more rows of an earlier execution.
+        """
+        sql = " ".join(sql.split())
+        with self.lock:
+            stat = self.statements.get(sql)
+            if stat is None:
+                stat = self.statements[sql] = Stat()
+            stat.calls += calls
+            stat.seconds += seconds
+            stat.max_seconds = max(stat.max_seconds, seconds)
+            stat.rows += rows
+
+    def record_function(self, name, seconds):
+        """Adds the time of one call of an instrumented function."""
+        with self.lock:
+            stat = self.functions.get(name)
+            if stat is None:
+                stat = self.functions[name] = Stat()
+            stat.calls += 1
+            stat.seconds += seconds
+            stat.max_seconds = max(stat.max_seconds, seconds)
+
+    def reset(self):
+        """Drops all recorded calls."""
+        with self.lock:
+            self.statements.clear()
+            self.functions.clear()
+
+    def snapshot(self):
+        """
+        Returns the recorded statistics, the most expensive first.
+
+        :return: A dictionary with a list of statistics for 'statements' (with an 'sql' key)
+            and for 'functions' (with a 'function' key).
+        """
+        with self.lock:
+            statements = [{'sql': sql, 'calls': stat.calls, 'seconds': stat.seconds, 'max_seconds': stat.max_seconds,
+                           'rows': stat.rows} for sql, stat in self.statements.items()]
+            functions = [{'function': name, 'calls': stat.calls, 'seconds': stat.seconds,
+                          'max_seconds': stat.max_seconds} for name, stat in self.functions.items()]
+        statements.sort(key=lambda stat: stat['seconds'], reverse=True)
+        functions.sort(key=lambda stat: stat['seconds'], reverse=True)
+        return {'timestamp': time.time(), 'statements': statements, 'functions': functions}
+
+    def to_json(self, indent=None):
+        """Returns the snapshot as a JSON string."""
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self, prefix="habit"):
+        """
+        Returns the snapshot in the Prometheus text exposition format.
+
+        :param prefix: The prefix of the metric names.
+        :return: The metrics as a string.
+        """
+        snapshot = self.snapshot()
+        metrics = [
+            ("sql_statement_calls_total", "Number of executions of an SQL statement.", "statements", "sql", "calls"),
+            ("sql_statement_seconds_total", "Time spent executing an SQL statement and fetching its rows.",
+             "statements", "sql", "seconds"),
+            ("sql_statement_rows_total", "Number of rows fetched or changed by an SQL statement.",
+             "statements", "sql", "rows"),
+            ("function_calls_total", "Number of calls of an instrumented function.", "functions", "function", "calls"),
+            ("function_seconds_total", "Time spent in an instrumented function.", "functions", "function", "seconds"),
+        ]
+        lines = []
+        for name, description, group, label, key in metrics:
+            lines.append(f"# HELP {prefix}_{name} {description}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for stat in snapshot[group]:
+                value = stat[label].replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+                label_name = "statement" if label == "sql" else label
+                lines.append(f'{prefix}_{name}{{{label_name}="{value}"}} {stat[key]}')
+        return "\n".join(lines) + "\n"
+
+    def __enter__(self):
+        """Makes this profiler collect the timings of the instrumented functions."""
+        global active
+        self.previous.append(active)
+        active = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global active
+        active = self.previous.pop()
+
+
+def profiled(function):
+    """
+    Decorator that records the time of each call in the active Profiler.
+
+    Without an active profiler the function is called directly.
+    """
+    name = function.__qualname__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        profiler = active
+        if profiler is None:
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profiler.record_function(name, time.perf_counter() - start)
+    return wrapper
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """A cursor that records the time and rows of its statements in the profiler of its connection."""
+
+    def execute(self, sql, parameters=()):
+        self.sql = sql
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.connection.profiler.record_statement(sql, time.perf_counter() - start, max(self.rowcount, 0))
+
+    def executemany(self, sql, parameters):
+        self.sql = sql
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, parameters)
+        finally:
+            self.connection.profiler.record_statement(sql, time.perf_counter() - start, max(self.rowcount, 0))
+
+    def executescript(self, sql_script):
+        self.sql = sql_script
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self.connection.profiler.record_statement(sql_script, time.perf_counter() - start)
+
+    def fetch(self, fetch, *args):
+        """Calls a fetch method and adds its time and rows to the statement that produced them."""
+        start = time.perf_counter()
+        rows = fetch(*args)
+        count = len(rows) if isinstance(rows, list) else int(rows is not None)
+        self.connection.profiler.record_statement(self.sql, time.perf_counter() - start, count, calls=0)
+        return rows
+
+    def fetchone(self):
+        return self.fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self.fetch(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self.fetch(super().fetchall)
+
+    def __next__(self):
+        row = self.fetch(super().fetchone)
+        if row is None:
+            raise StopIteration
+        return row
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """A connection whose statements are timed, its profiler attribute is set by the ConnectionManager."""
+    profiler = None
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, parameters):
+        return self.cursor().executemany(sql, parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
@@ -0,0 +1,167 @@
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote, unquote
+from analyse import Analyse
+from db import Database
+
+
+def shard_leaderboard(shard_dir, top_k):
+    """
+    Computes the leaderboards of all users in one shard directory, run in a worker process.
+
+    :param shard_dir: The directory holding the user databases of the shard.
+    :param top_k: The number of entries per ranking and user.
+    :return: A dictionary {periodicity: {'current': [...], 'longest': [...]}} with (streak, user, rank, name) entries.
+    """
+    entries = {}
+    if not os.path.isdir(shard_dir):
+        return entries
+
+    for file_name in sorted(os.listdir(shard_dir)):
+        if not file_name.endswith(".db"):
+            continue
+        user = unquote(file_name[:-3])
+        db = Database(os.path.join(shard_dir, file_name), read_only=True)
+        try:
+            leaderboard = Analyse(db).get_leaderboard(top_k)
+        finally:
+            db.close()
+
+        for periodicity, board in leaderboard.items():
+            merged = entries.setdefault(periodicity, {"current": [], "longest": []})
+            for kind in ("current", "longest"):
+                merged[kind].extend((streak, user, rank, name) for rank, (name, streak) in enumerate(board[kind]))
+    return entries
+
+
+class ShardedDatabase:
+    """
+    Stores the habits of many users, one small SQLite file per user, spread over shard directories.
+
+    A user is routed to one of shard_count directories by a stable hash of the user ID, so each
+    directory holds a bounded number of files and analytics can fan out over the shards in parallel.
+    Per-user queries only touch the user's own small database. Recently used Database handles are
+    kept open in an LRU cache and are leased to callers, a leased handle is only closed once it is idle.
+    """
+
+    def __init__(self, directory, shard_count=16, max_open=32, **database_options):
+        """
+        Initializing a new ShardedDatabase instance.
+        :param directory: The root directory of the shard directories.
+        :param shard_count: The number of shards, must not change once users are stored.
+        :param max_open: The maximum number of idle Database handles kept open, leased handles are never closed.
+        :param database_options: Further arguments for Database, e.g. journal_mode='WAL'.
+        """
+        self.directory = directory
+        self.shard_count = shard_count
+        self.max_open = max_open
+        self.database_options = database_options
+        self.open_databases = OrderedDict() # User ID -> Database, least recently used first
+        self.leases = {} # User ID -> number of callers using the handle
+        self.lock = threading.Lock()
+
+    def get_shard(self, user):
+        """
+        Returns the shard number of a user, which is the same in every process.
+
+        :param user: The user ID.
+        :return: A number between 0 and shard_count - 1.
+        """
+        return zlib.crc32(str(user).encode("utf-8")) % self.shard_count
+
+    def get_shard_dir(self, shard):
+        """Returns the directory of a shard."""
+        return os.path.join(self.directory, f"shard_{shard:03d}")
+
+    def get_path(self, user):
+        """Returns the database file of a user."""
+        return os.path.join(self.get_shard_dir(self.get_shard(user)), quote(str(user), safe="") + ".db")
+
+    @contextmanager
+    def lease(self, user):
+        """
+        Lends the Database of a user for the duration of a with block, opening (and creating) it if
+        it is not cached. The handle is not closed by the LRU cache while it is leased.
+
+        :param user: The user ID.
+        :return: A context manager that yields a Database instance.
+        """
+        with self.lock:
+            db = self.open_databases.get(user)
+            if db is not None:
+                self.open_databases.move_to_end(user)
+            else:
+                path = self.get_path(user)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                db = self.open_databases[user] = Database(path, **self.database_options)
+            self.leases[user] = self.leases.get(user, 0) + 1
+            self.close_idle()
+        try:
+            yield db
+        finally:
+            with self.lock:
+                count = self.leases.pop(user, 0) - 1 # The lease is gone if close() ran in the meantime
+                if count > 0:
+                    self.leases[user] = count
+                self.close_idle()
+
+    @contextmanager
+    def lease_analyse(self, user):
+        """
+        Lends an Analyse instance for the habits of a user for the duration of a with block.
+
+        :param user: The user ID.
+        :return: A context manager that yields an Analyse instance.
+        """
+        with self.lease(user) as db:
+            yield Analyse(db)
+
+    def close_idle(self):
+        """Closes the least recently used idle handles beyond max_open, the caller must hold the lock."""
+        excess = len(self.open_databases) - self.max_open
+        if excess > 0:
+            for user in [user for user in self.open_databases if user not in self.leases][:excess]:
+                self.open_databases.pop(user).close()
+
+    def get_leaderboard(self, top_k=3, processes=None):
+        """
+        Ranks the habits of all users by current and by longest streak.
+
+        The shards are processed in parallel worker processes. Equal streaks are ranked by user ID
+        and then by the user's own ranking, so the result does not depend on the worker order.
+
+        :param top_k: The number of entries per periodicity and ranking.
+        :param processes: The number of worker processes, all cores if None, 0 to run in this process.
+        :return: A dictionary {periodicity: {'current': [...], 'longest': [...]}} of (user, habit name, streak).
+        """
+        shard_dirs = [self.get_shard_dir(shard) for shard in range(self.shard_count)]
+        if processes == 0:
+            results = [shard_leaderboard(shard_dir, top_k) for shard_dir in shard_dirs]
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                results = list(executor.map(shard_leaderboard, shard_dirs, [top_k] * len(shard_dirs)))
+
+        leaderboard = {}
+        for result in results:
+            for periodicity, entries in result.items():
+                merged = leaderboard.setdefault(periodicity, {"current": [], "longest": []})
+                for kind in ("current", "longest"):
+                    merged[kind].extend(entries[kind])
+
+        for board in leaderboard.values():
+            for kind in ("current", "longest"):
+                ranked = sorted(board[kind], key=lambda entry: (-entry[0], entry[1], entry[2]))[:top_k]
+                board[kind] = [(user, name, streak) for streak, user, _, name in ranked]
+        return leaderboard
+
+    def close(self):
+        """Closes all open Database handles, including leased ones."""
+        with self.lock:
+            for db in self.open_databases.values():
+                db.close()
+            self.open_databases.clear()
+            self.leases.clear()
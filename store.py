@@ -0,0 +1,129 @@
+from array import array
+from datetime import datetime, timedelta
+from habit import Habit
+from periods import EPOCH, SECONDS_PER_DAY
+from streak import compute_streaks
+
+
+class HabitRecord:
+    """Compact metadata of a habit, its checkoff days are kept in the shared HabitStore buffer."""
+    __slots__ = ("id", "name", "description", "periodicity", "creation_date", "offset", "count")
+
+    def __init__(self, habit_id, name, description, periodicity, creation_date):
+        """
+        Initializing a new HabitRecord instance.
+        :param habit_id: The ID of the habit in the database.
+        :param name: The name of the habit.
+        :param description: A brief description of the habit.
+        :param periodicity: The frequency of the habit, either 'daily' or 'weekly'.
+        :param creation_date: The creation date as stored in the database.
+        """
+        self.id = habit_id
+        self.name = name
+        self.description = description
+        self.periodicity = periodicity
+        self.creation_date = creation_date
+        self.offset = 0 # Position of the first checkoff day in the shared buffer
+        self.count = 0 # Number of checkoff days of this habit
+
+
+class HabitStore:
+    """
+    A read-only, columnar snapshot of all habits.
+
+    The checkoff dates of all habits are stored as day numbers (see periods.day_index) in one
+    shared array of 32-bit integers, grouped by habit and sorted. Each HabitRecord points to its
+    slice, which takes 4 bytes per checkoff instead of a datetime object in a list.
+    The time of day is not kept, it does not matter for streaks and checkoff rules.
+    """
+
+    def __init__(self):
+        """Initializing an empty HabitStore."""
+        self.records = []
+        self.positions = {} # Habit ID -> index in records
+        self.days = array("i")
+
+    @classmethod
+    def from_database(cls, db):
+        """
+        Loads all habits and checkoff days from a database, with one query per table.
+
+        :param db: The Database instance to load from.
+        :return: A new HabitStore.
+        """
+        store = cls()
+        for row in db.conn.execute("SELECT id, name, description, periodicity, creation_date FROM habits ORDER BY id"):
+            store.positions[row[0]] = len(store.records)
+            store.records.append(HabitRecord(*row))
+
+        record = None
+        for habit_id, timestamp in db.conn.execute("SELECT habit_id, checkoff_ts FROM tracking "
+                                                   "ORDER BY habit_id, checkoff_ts"):
+            if record is None or record.id != habit_id: # First checkoff of the next habit
+                record = store.records[store.positions[habit_id]]
+                record.offset = len(store.days)
+            store.days.append(timestamp // SECONDS_PER_DAY)
+            record.count += 1
+        return store
+
+    def __len__(self):
+        """Returns the number of habits in the store."""
+        return len(self.records)
+
+    def __iter__(self):
+        """Iterates over the HabitRecords in order of their IDs."""
+        return iter(self.records)
+
+    def get_record(self, habit_id):
+        """
+        Returns the metadata of a habit.
+
+        :param habit_id: The ID of the habit.
+        :return: The HabitRecord if found, None otherwise.
+        """
+        position = self.positions.get(habit_id)
+        return self.records[position] if position is not None else None
+
+    def get_days(self, habit_id):
+        """
+        Returns the checkoff days of a habit.
+
+        :param habit_id: The ID of the habit.
+        :return: A sorted array of day numbers.
+        """
+        record = self.records[self.positions[habit_id]]
+        return self.days[record.offset:record.offset + record.count]
+
+    def get_habit(self, habit_id):
+        """
+        Creates a Habit object for a stored habit, so streak() and checkoff_habit() can be used.
+        Changes to the returned Habit are not written back to the store.
+
+        :param habit_id: The ID of the habit.
+        :return: The Habit object if found, None otherwise.
+        """
+        record = self.get_record(habit_id)
+        if record is None:
+            return None
+
+        habit = Habit(record.name, record.description, record.periodicity)
+        habit.creation_date = datetime.strptime(record.creation_date, "%Y-%m-%d %H:%M:%S")
+        habit.checkoff_dates = [EPOCH + timedelta(days=day) for day in self.get_days(habit_id)]
+        return habit
+
+    def streak_stats(self, habit_id):
+        """
+        Computes the streaks of a habit directly from its day numbers, without creating datetimes.
+
+        :param habit_id: The ID of the habit.
+        :return: A StreakStats tuple (see streak.py).
+        """
+        record = self.records[self.positions[habit_id]]
+        days = self.get_days(habit_id)
+        if record.periodicity == "weekly":
+            return compute_streaks([(day + 3) // 7 for day in days])
+        return compute_streaks(days)
+
+    def nbytes(self):
+        """Returns the size of the shared checkoff buffer in bytes."""
+        return len(self.days) * self.days.itemsize
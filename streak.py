@@ -0,0 +1,134 @@
+from typing import NamedTuple
+from periods import VECTORIZE_THRESHOLD, get_numpy, period_index
+
+
+class StreakStats(NamedTuple):
+    """The streaks found in the checkoff history of a habit."""
+    current: int # Length of the run that ends with the latest checkoff
+    longest: int # Length of the longest run in the whole history
+    runs: list # (first_period, last_period) of every run, oldest first
+
+
+def compute_streaks(periods):
+    """
+    Computes current streak, longest streak and all runs in one linear pass.
+
+    :param periods: Sorted period numbers (see periods.period_index), duplicates are allowed.
+    :return: A StreakStats tuple.
+    """
+    if len(periods) >= VECTORIZE_THRESHOLD and get_numpy() is not None:
+        return compute_streaks_vectorized(periods)
+
+    runs = []
+    start = previous = None
+    for period in periods:
+        if period == previous:
+            continue # Several checkoffs in the same period count once
+        if previous is not None and period != previous + 1:
+            runs.append((start, previous)) # A gap ends the run
+            start = period
+        elif previous is None:
+            start = period
+        previous = period
+    if previous is not None:
+        runs.append((start, previous))
+
+    return streak_stats_from_runs(runs)
+
+
+def compute_streaks_vectorized(periods):
+    """
+    Computes the same result as compute_streaks with NumPy, for very long histories.
+
+    :param periods: Sorted period numbers, duplicates are allowed.
+    :return: A StreakStats tuple.
+    """
+    np = get_numpy()
+    unique_periods = np.unique(np.asarray(periods, dtype=np.int64))
+    if not len(unique_periods):
+        return StreakStats(0, 0, [])
+
+    breaks = np.flatnonzero(np.diff(unique_periods) != 1) + 1 # Index of the first period after each gap
+    starts = np.concatenate(([0], breaks))
+    ends = np.concatenate((breaks, [len(unique_periods)])) - 1
+    runs = list(zip(unique_periods[starts].tolist(), unique_periods[ends].tolist()))
+    return streak_stats_from_runs(runs)
+
+
+def streak_stats_from_runs(runs):
+    """
+    Builds the streak statistics from a list of runs.
+
+    :param runs: (first_period, last_period) of every run, oldest first.
+    :return: A StreakStats tuple.
+    """
+    if not runs:
+        return StreakStats(0, 0, [])
+    longest = max(last - first + 1 for first, last in runs)
+    current = runs[-1][1] - runs[-1][0] + 1
+    return StreakStats(current, longest, runs)
+
+
+def streaks_for_dates(dates, periodicity):
+    """
+    Computes the streak statistics for a list of checkoff dates.
+
+    :param dates: The checkoff dates in any order.
+    :param periodicity: The periodicity of the habit, either 'daily' or 'weekly'.
+    :return: A StreakStats tuple.
+    """
+    periods = [period_index(date, periodicity) for date in dates]
+    if any(later < earlier for earlier, later in zip(periods, periods[1:])):
+        periods.sort() # Only needed if back-dated checkoffs were appended
+    return compute_streaks(periods)
+
+
+class StreakState:
+    """The streak summary of a habit that can be updated checkoff by checkoff."""
+
+    def __init__(self, run_start=None, current=0, longest=0, last_period=None):
+        """
+        Initializing a new StreakState instance.
+        :param run_start: The first period of the current run.
+        :param current: The length of the current run.
+        :param longest: The length of the longest run so far.
+        :param last_period: The latest checked off period.
+        """
+        self.run_start = run_start
+        self.current = current
+        self.longest = longest
+        self.last_period = last_period
+
+    @classmethod
+    def from_stats(cls, stats):
+        """Creates the state from fully computed StreakStats."""
+        if not stats.runs:
+            return cls()
+        run_start, last_period = stats.runs[-1]
+        return cls(run_start, stats.current, stats.longest, last_period)
+
+    def add(self, period):
+        """
+        Updates the state with a newly checked off period in O(1).
+
+        :param period: The period number of the checkoff.
+        :return: False if the period lies before the current run, the state must then be recomputed.
+        """
+        if self.last_period is None:
+            self.run_start = period
+            self.current = 1
+        elif period == self.last_period + 1:
+            self.current += 1
+        elif period > self.last_period:
+            self.run_start = period # A gap breaks the streak
+            self.current = 1
+        elif period >= self.run_start:
+            return True # Already covered by the current run
+        else:
+            return False
+        self.last_period = period
+        self.longest = max(self.longest, self.current)
+        return True
+
+    def __eq__(self, other):
+        return isinstance(other, StreakState) and vars(self) == vars(other)
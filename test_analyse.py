@@ -148,4 +148,85 @@ class TestAnalyse:
         # Verify that the longest streak for the specific habit is correct.
         habit_name, streak = analyse.get_longest_streak_by_name("Test your code")
         assert habit_name == "Test your code"
-        assert streak == 5
\ No newline at end of file
+        assert streak == 5
+
+    def test_get_leaderboard(self, setup_analyse):
+        # Test that habits are ranked by current and longest streak for every periodicity at once.
+        db, analyse = setup_analyse
+        habit_id1 = db.add_habit_to_table(Habit("Do exercises", "Strengthen your body", "daily"))
+        habit_id2 = db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+        habit_id3 = db.add_habit_to_table(Habit("Read the newspaper", "Inform yourself", "daily"))
+        habit_id4 = db.add_habit_to_table(Habit("Do yoga", "Connect to your inner self", "weekly"))
+
+        # habit_1: longest streak 4 but current streak 1, habit_2 and habit_3: current streak 2.
+        db.add_streaks_bulk([(habit_id1, datetime(2024, 10, 1 + i)) for i in range(4)])
+        db.add_streak_to_table(habit_id1, datetime(2024, 10, 9))
+        for habit_id in (habit_id2, habit_id3):
+            db.add_streaks_bulk([(habit_id, datetime(2024, 10, 8)), (habit_id, datetime(2024, 10, 9))])
+        db.add_streak_to_table(habit_id4, datetime(2024, 10, 1))
+
+        leaderboard = analyse.get_leaderboard(top_k=2)
+        assert leaderboard["daily"]["current"] == [("Go for a walk", 2), ("Read the newspaper", 2)]
+        assert leaderboard["daily"]["longest"] == [("Do exercises", 4), ("Go for a walk", 2)]
+        assert leaderboard["daily"]["current_leaders"] == (["Go for a walk", "Read the newspaper"], 2)
+        assert leaderboard["daily"]["longest_leaders"] == (["Do exercises"], 4)
+        assert leaderboard["weekly"]["current"] == [("Do yoga", 1)]
+
+        # The tie-list API is answered from the same leaderboard.
+        assert analyse.get_longest_streak_daily() == (["Go for a walk", "Read the newspaper"], 2)
+        assert analyse.get_longest_streak_weekly() == (["Do yoga"], 1)
+
+    def test_get_completion_rates(self, setup_analyse):
+        # Test that expected periods are counted from the first checkoff (before creation) until the end.
+        db, analyse = setup_analyse
+        habit_id1 = db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+        habit_id2 = db.add_habit_to_table(Habit("Do yoga", "Connect to your inner self", "weekly"))
+        db.add_habit_to_table(Habit("Do exercises", "Strengthen your body", "daily")) # Created today
+        db.add_streaks_bulk([(habit_id1, datetime(2024, 10, day)) for day in (1, 2, 3, 5, 9, 10)])
+        db.add_streaks_bulk([(habit_id2, datetime(2024, 9, 30)), (habit_id2, datetime(2024, 10, 16))])
+
+        rates = analyse.get_completion_rates(end=datetime(2024, 10, 10))
+        assert [(rate['expected'], rate['checked_off']) for rate in rates] == [(10, 6), (2, 1), (0, 0)]
+        assert rates[0]['rate'] == 0.6
+        assert rates[2]['rate'] is None # Did not exist in the window
+
+        # A window that starts after the first checkoff.
+        rates = analyse.get_completion_rates(start=datetime(2024, 10, 5), end=datetime(2024, 10, 10))
+        assert (rates[0]['expected'], rates[0]['checked_off']) == (6, 3)
+
+    def test_get_rolling_completion_rates(self, setup_analyse):
+        # Test the rolling rates of several windows, computed in one query.
+        db, analyse = setup_analyse
+        habit_id = db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+        db.add_streaks_bulk([(habit_id, datetime(2024, 10, 1 + day)) for day in range(0, 30, 2)]) # Every other day
+
+        rates = analyse.get_rolling_completion_rates(windows=(1, 2, 30, 90), end=datetime(2024, 10, 29))
+        assert rates[0]['rates'] == {1: 1.0, 2: 0.5, 30: 15 / 29, 90: 15 / 29}
+
+    def test_get_gap_stats(self, setup_analyse):
+        # Test that gaps between checkoffs and the periods missed since the last checkoff are found.
+        db, analyse = setup_analyse
+        habit_id = db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+        db.add_habit_to_table(Habit("Do yoga", "Connect to your inner self", "weekly"))
+        db.add_streaks_bulk([(habit_id, datetime(2024, 10, day)) for day in (1, 2, 5, 6, 8, 20)])
+
+        walk, yoga = analyse.get_gap_stats(end=datetime(2024, 10, 23))
+        assert (walk['gaps'], walk['longest_gap'], walk['missed'], walk['mean_gap']) == (3, 11, 14, 14 / 3)
+        assert walk['since_last'] == 2
+        assert (yoga['gaps'], yoga['mean_gap'], yoga['since_last']) == (0, None, None)
+
+    def test_get_activity(self, setup_analyse):
+        # Test that the activity per day and week is read from the rollups.
+        db, analyse = setup_analyse
+        habit_id1 = db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+        habit_id2 = db.add_habit_to_table(Habit("Do yoga", "Connect to your inner self", "weekly"))
+        db.add_streaks_bulk([(habit_id1, datetime(2024, 10, day)) for day in (1, 2, 3, 8)])
+        db.add_streaks_bulk([(habit_id2, datetime(2024, 9, 24)), (habit_id2, datetime(2024, 10, 2))])
+
+        days = analyse.get_activity(end=datetime(2024, 10, 3))
+        assert [(day['date'].day, day['checkoffs'], day['active_habits'], day['habits_on_streak'])
+                for day in days] == [(24, 1, 1, 0), (1, 1, 1, 0), (2, 2, 2, 2), (3, 1, 1, 1)]
+
+        weeks = analyse.get_activity("weekly", start=datetime(2024, 9, 30))
+        assert [(week['date'], week['checkoffs'], week['active_habits'], week['habits_on_streak'])
+                for week in weeks] == [(datetime(2024, 9, 30), 4, 2, 2), (datetime(2024, 10, 7), 1, 1, 0)]
@@ -0,0 +1,80 @@
+import asyncio
+from datetime import datetime
+from async_analyse import AsyncAnalyse
+from async_db import AsyncDatabase
+from habit import Habit
+
+
+# Test that writes and many concurrent reads can be awaited from one event loop.
+def test_concurrent_requests(tmp_path):
+    async def scenario():
+        async with AsyncDatabase(str(tmp_path / "async.db"), max_readers=2, journal_mode="WAL") as async_db:
+            habit_id = await async_db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+            await asyncio.gather(*(async_db.add_streak_to_table(habit_id, datetime(2024, 10, day))
+                                   for day in range(1, 4)))
+            inserted, rejected = await async_db.add_streaks_bulk([(habit_id, datetime(2024, 10, 3, 12))])
+
+            analyse = AsyncAnalyse(async_db)
+            results = await asyncio.gather(*(analyse.get_longest_streak_by_name("Go for a walk") for _ in range(50)))
+            habits = await async_db.get_all_habits()
+            return inserted, rejected, results, habits
+
+    inserted, rejected, results, habits = asyncio.run(scenario())
+    assert (inserted, rejected) == (0, 1)
+    assert results == [("Go for a walk", 3)] * 50
+    assert len(habits[0]['checkoff_dates']) == 3
+
+# Test that reads never write: missing cache entries are computed by the readers but saved by the writer.
+def test_readers_do_not_write(tmp_path):
+    async def scenario():
+        async with AsyncDatabase(str(tmp_path / "async.db"), max_readers=2) as async_db:
+            habit_id = await async_db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+            await async_db.add_streaks_bulk([(habit_id, datetime(2024, 10, day)) for day in (1, 2)])
+            async_db.db.conn.execute("DELETE FROM streaks")
+            async_db.db.conn.execute("DELETE FROM rollups")
+            async_db.db.conn.commit()
+
+            state = await async_db.get_streak_state(habit_id)
+            activity = await AsyncAnalyse(async_db).get_activity()
+            unsaved = async_db.db.conn.execute("SELECT (SELECT COUNT(*) FROM streaks), "
+                                               "(SELECT COUNT(*) FROM rollups)").fetchone()
+            rebuilt = await async_db.rebuild_rollups()
+            info = await async_db.get_habit_info(habit_id)
+            return state.current, len(activity), unsaved, rebuilt, info['name'], await async_db.cache_info()
+
+    current, days, unsaved, rebuilt, name, cache_info = asyncio.run(scenario())
+    assert (current, days, unsaved, rebuilt, name) == (2, 2, (0, 0), 3, "Go for a walk") # Two days, one week
+    assert cache_info['habits'].hits >= 1
+
+# Test that reads between a write and its commit do not leave the old habit in the shared caches.
+def test_read_between_write_and_commit(tmp_path):
+    async def scenario():
+        async with AsyncDatabase(str(tmp_path / "async.db"), max_readers=2, journal_mode="WAL") as async_db:
+            read_id = await async_db.add_habit_to_table(Habit("Read", "Ten pages", "daily"))
+            run_id = await async_db.add_habit_to_table(Habit("Run", "Five kilometres", "daily"))
+
+            def read_before_commit(statement):
+                if statement == "COMMIT": # Runs on the writer thread, the readers still see the old rows
+                    async_db.readers.submit(lambda: (async_db.read_db.get_habit_info(read_id),
+                                                     async_db.read_db.get_habit_id("Read"),
+                                                     async_db.read_db.get_habit_id("Run"))).result()
+
+            await async_db.write(lambda: async_db.db.conn.set_trace_callback(read_before_commit))
+            await async_db.update_habit_in_table(read_id, "Read more", "Twenty pages")
+            await async_db.delete_habit_from_table(run_id)
+            await async_db.write(lambda: async_db.db.conn.set_trace_callback(None))
+
+            return ((await async_db.get_habit_info(read_id))['name'], await async_db.get_habit_id("Read"),
+                    await async_db.check_habit_exists("Run"))
+
+    assert asyncio.run(scenario()) == ("Read more", None, False)
+
+# Test that an in-memory database works with its single shared connection.
+def test_in_memory_database():
+    async def scenario():
+        async with AsyncDatabase(":memory:") as async_db:
+            await async_db.add_habit_to_table(Habit("Do yoga", "Connect to your inner self", "weekly"))
+            analyse = AsyncAnalyse(async_db)
+            return await analyse.get_habits_by_periodicity("weekly"), await async_db.get_habit_id("do yoga")
+
+    assert asyncio.run(scenario()) == (([], ["Do yoga"]), 1)
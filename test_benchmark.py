@@ -0,0 +1,76 @@
+import json
+from analyse import Analyse
+from benchmark import benchmark_startup, compare_to_baseline, generate_store, main, percentile, run_benchmarks
+from db import Database
+from streak import StreakState
+
+
+# Test that the generator creates the requested store and keeps the streak cache consistent.
+def test_generate_store(tmp_path):
+    db = generate_store(str(tmp_path / "store.db"), habits=20, checkoffs=1003, seed=1)
+
+    assert db.conn.execute("SELECT COUNT(*) FROM habits").fetchone()[0] == 20
+    assert db.conn.execute("SELECT COUNT(*) FROM tracking").fetchone()[0] == 1003
+    for habit_id in range(1, 21):
+        habit = db.get_habit(habit_id)
+        assert db.get_streak_state(habit_id) == StreakState.from_stats(habit.streak_stats())
+    assert Analyse(db).get_leaderboard()["daily"]["longest"]
+    db.close()
+
+# Test that the same seed generates the same checkoffs.
+def test_generate_store_is_deterministic(tmp_path):
+    checkoffs = []
+    for name in ("a.db", "b.db"):
+        db = generate_store(str(tmp_path / name), habits=5, checkoffs=100, seed=7)
+        checkoffs.append(db.conn.execute("SELECT habit_id, checkoff_ts FROM tracking ORDER BY id").fetchall())
+        db.close()
+    assert checkoffs[0] == checkoffs[1]
+
+# Test the nearest-rank percentile.
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([3], 0.95) == 3
+
+# Test that every case runs and reports its statistics.
+def test_run_benchmarks(tmp_path):
+    db = generate_store(str(tmp_path / "store.db"), habits=10, checkoffs=200)
+    results = run_benchmarks(db, repeat=3)
+    db.close()
+
+    assert "Database.add_streaks_bulk (100 rows)" in results
+    assert "Analyse.get_leaderboard" in results
+    for result in results.values():
+        assert result['runs'] == 3
+        assert result['p50_ms'] <= result['p95_ms'] <= result['p99_ms']
+
+# Test that the startup cases run main.py commands against the store.
+def test_benchmark_startup(tmp_path):
+    db_name = str(tmp_path / "store.db")
+    generate_store(db_name, habits=2, checkoffs=10).close()
+    results = benchmark_startup(db_name, repeat=2)
+
+    assert set(results) == {"Startup: main.py checkoff", "Startup: main.py leaderboard"}
+    db = Database(db_name)
+    assert db.conn.execute("SELECT COUNT(*) FROM tracking WHERE habit_id = 1").fetchone()[0] == 5 + 2
+    db.close()
+
+# Test that only slowdowns beyond the tolerance are regressions and sizes in case names are ignored.
+def test_compare_to_baseline():
+    baseline = {"fast": {'p50_ms': 1.0}, "Habit.streak (10 checkoffs)": {'p50_ms': 1.0}}
+    results = {"fast": {'p50_ms': 1.2}, "Habit.streak (20 checkoffs)": {'p50_ms': 1.5}, "new": {'p50_ms': 9.0}}
+
+    assert compare_to_baseline(results, baseline, tolerance=0.25) == [("Habit.streak (20 checkoffs)", 1.0, 1.5)]
+
+# Test that the command line fails on a regression against a saved baseline.
+def test_main_baseline(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    arguments = ["--habits", "5", "--checkoffs", "50", "--repeat", "2", "--startup-runs", "0"]
+    assert main(arguments + ["--save-baseline", str(baseline)]) == 0
+
+    results = json.loads(baseline.read_text())
+    assert main(arguments + ["--baseline", str(baseline), "--tolerance", "1000"]) == 0
+
+    baseline.write_text(json.dumps({name: dict(result, p50_ms=0.0) for name, result in results.items()}))
+    assert main(arguments + ["--baseline", str(baseline)]) == 1
@@ -0,0 +1,30 @@
+from cache import MISSING, LRUCache
+
+
+# Test that the least recently used entry is evicted and hits and misses are counted.
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", None) # None is a valid cached value
+    assert cache.get("a") == 1 # "b" is now the least recently used entry
+    cache.put("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert cache.get("c") == 3
+    assert cache.info() == (2, 1, 2, 2)
+
+    cache.pop("a")
+    cache.pop("unknown")
+    assert cache.get("a") is MISSING
+    cache.clear()
+    assert cache.info().currsize == 0
+
+# Test that a value loaded before an entry was removed is not cached.
+def test_lru_cache_generation():
+    cache = LRUCache(maxsize=2)
+    generation = cache.generation
+    cache.pop("a") # E.g. invalidated by a commit while the value was loaded
+    cache.put("a", 1, generation)
+    assert cache.get("a") is MISSING
+    cache.put("a", 1, cache.generation)
+    assert cache.get("a") == 1
@@ -0,0 +1,110 @@
+import csv
+import io
+import json
+import pytest
+from commands import CommandError, parse_date, run
+from db import Database
+
+
+# Fixture that returns a function running a command on a temporary database and returning its output.
+@pytest.fixture
+def cli(tmp_path):
+    db_name = str(tmp_path / "commands.db")
+
+    def run_command(*argv):
+        out = io.StringIO()
+        exit_code = run(["--db", db_name] + list(argv), out)
+        return exit_code, out.getvalue()
+    run_command.db_name = db_name
+    return run_command
+
+# Test adding and checking off habits with JSON output.
+def test_add_and_checkoff(cli):
+    assert cli("add", "Read", "--periodicity", "weekly") == (0, "id=1  name=Read  periodicity=weekly\n")
+    assert cli("add", "read")[0] == 1 # Names are unique ignoring case
+
+    exit_code, output = cli("--format", "json", "checkoff", "Read", "--date", "2024-05-01")
+    assert exit_code == 0
+    assert json.loads(output) == [{"name": "Read", "date": "2024-05-01 00:00:00", "checked_off": True}]
+    assert json.loads(cli("--format", "json", "checkoff", "Read", "--date", "2024-05-03")[1])[0]["checked_off"] is False
+    assert cli("checkoff", "Unknown")[0] == 1
+
+# Test that bulk checkoffs are read from CSV and reported, skipping duplicates and unknown habits.
+def test_bulk_checkoff(cli, tmp_path):
+    cli("add", "Read")
+    checkoffs = tmp_path / "checkoffs.csv"
+    checkoffs.write_text("name,date\nRead,2024-05-01\nRead,2024-05-02\nread,2024-05-02\nUnknown,2024-05-02\n")
+
+    exit_code, output = cli("--format", "json", "bulk-checkoff", str(checkoffs))
+    assert exit_code == 0
+    assert json.loads(output) == [{"inserted": 2, "skipped": 1, "unknown_habits": 1}]
+
+    checkoffs.write_text("Read,2024-05-03\nRead,not a date\n")
+    assert cli("bulk-checkoff", str(checkoffs))[0] == 1
+    db = Database(cli.db_name)
+    assert len(db.get_all_checkoff_dates(1)) == 2 # The failed import was rolled back
+    db.close()
+
+    exit_code, output = cli("bulk-checkoff", str(tmp_path / "missing.csv"))
+    assert (exit_code, output) == (1, "") # Reported as an error instead of a traceback
+
+# Test the stats and leaderboard commands with CSV output.
+def test_stats_and_leaderboard(cli):
+    cli("add", "Read")
+    cli("add", "Run", "--periodicity", "weekly")
+    for day in ("2024-05-01", "2024-05-02"):
+        cli("checkoff", "Read", "--date", day)
+
+    rows = list(csv.DictReader(io.StringIO(cli("--format", "csv", "stats", "--periodicity", "daily")[1])))
+    assert rows == [{"id": "1", "name": "Read", "periodicity": "daily", "current_streak": "2", "longest_streak": "2"}]
+
+    rows = list(csv.DictReader(io.StringIO(cli("--format", "csv", "leaderboard", "--top", "1")[1])))
+    assert [(row["periodicity"], row["ranking"], row["name"], row["streak"]) for row in rows] == [
+        ("daily", "current", "Read", "2"), ("daily", "longest", "Read", "2"),
+        ("weekly", "current", "Run", "0"), ("weekly", "longest", "Run", "0")]
+    assert cli("leaderboard", "--top", "0") == (0, "")
+    with pytest.raises(SystemExit): # Rejected by argparse with a usage message
+        cli("leaderboard", "--top", "-1")
+
+# Test the activity command and that rebuild-rollups restores the rollups.
+def test_activity_and_rebuild_rollups(cli):
+    cli("add", "Read")
+    cli("add", "Run", "--periodicity", "weekly")
+    for name, day in (("Read", "2024-05-01"), ("Read", "2024-05-02"), ("Run", "2024-05-02")):
+        cli("checkoff", name, "--date", day)
+
+    rows = list(csv.DictReader(io.StringIO(cli("--format", "csv", "activity", "--start", "2024-05-02")[1])))
+    assert rows == [{"date": "2024-05-02", "checkoffs": "2", "active_habits": "2", "habits_on_streak": "1"}]
+    weekly = json.loads(cli("--format", "json", "activity", "--periodicity", "weekly")[1])
+    assert [(row["date"], row["checkoffs"], row["active_habits"]) for row in weekly] == [("2024-04-29", 3, 2)]
+
+    db = Database(db_name=cli.db_name)
+    db.conn.execute("DELETE FROM rollups")
+    db.conn.commit()
+    db.close()
+    assert cli("rebuild-rollups") == (0, "rollups=3\n")
+
+# Test that the history command lists a date range page by page.
+def test_history(cli, capsys):
+    cli("add", "Read")
+    for day in ("2024-04-30", "2024-05-01", "2024-05-02", "2024-05-03"):
+        cli("checkoff", "Read", "--date", day)
+
+    exit_code, output = cli("history", "Read", "--start", "2024-05-01", "--end", "2024-05-31", "--limit", "2")
+    assert (exit_code, output) == (0, "id=1  name=Read  date=2024-05-01 00:00:00\n"
+                                      "id=1  name=Read  date=2024-05-02 00:00:00\n")
+    assert "--after 1,2024-05-02T00:00:00" in capsys.readouterr().err
+
+    exit_code, output = cli("--format", "json", "history", "--start", "2024-05-01", "--after", "1,2024-05-02T00:00:00")
+    assert [row["date"] for row in json.loads(output)] == ["2024-05-03 00:00:00"]
+    assert cli("history", "Unknown")[0] == 1
+    for limit in ("0", "-1", "ten"):
+        with pytest.raises(SystemExit): # Rejected by argparse with a usage message
+            cli("history", "--limit", limit)
+
+# Test the accepted date formats.
+def test_parse_date():
+    assert parse_date("2024-05-01").day == 1
+    assert parse_date("2024-05-01 12:30:00").hour == 12
+    with pytest.raises(CommandError):
+        parse_date("01.05.2024")
@@ -0,0 +1,83 @@
+import pytest
+import sqlite3
+import threading
+from datetime import datetime
+from analyse import Analyse
+from connection import ConnectionManager
+from db import Database
+from habit import Habit
+
+
+# Test that the configured pragmas are applied to every new connection.
+def test_pragmas(tmp_path):
+    manager = ConnectionManager(str(tmp_path / "tuned.db"), journal_mode="wal", synchronous="NORMAL",
+                                cache_size=-2000, mmap_size=1 << 20)
+    conn = manager.get_connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1 # NORMAL
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == -2000
+    assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+    manager.close()
+
+# Test that unknown pragma values are rejected instead of being put into SQL.
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        ConnectionManager("main.db", journal_mode="WAL; DROP TABLE habits")
+    with pytest.raises(ValueError):
+        ConnectionManager("main.db", synchronous="sometimes")
+    with pytest.raises(ValueError):
+        ConnectionManager(":memory:", read_only=True)
+
+# Test that every thread gets its own connection, except for in-memory databases.
+def test_connection_per_thread(tmp_path):
+    manager = ConnectionManager(str(tmp_path / "threads.db"))
+    connections = []
+    thread = threading.Thread(target=lambda: connections.append(manager.get_connection()))
+    thread.start()
+    thread.join()
+
+    assert manager.get_connection() is manager.get_connection()
+    assert connections[0] is not manager.get_connection()
+    manager.close()
+
+    memory = ConnectionManager(":memory:")
+    assert memory.get_connection() is memory.shared
+
+# Test that a closed manager raises instead of opening new connections.
+def test_closed_manager(tmp_path):
+    manager = ConnectionManager(str(tmp_path / "closed.db"))
+    manager.get_connection()
+    manager.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        manager.get_connection()
+    thread = threading.Thread(target=lambda: pytest.raises(sqlite3.ProgrammingError, manager.get_connection))
+    thread.start()
+    thread.join()
+    assert manager.connections == []
+
+# Test that a read-only Database serves analyses in other threads while checkoffs are written.
+def test_read_only_analyse_next_to_writer(tmp_path):
+    db_name = str(tmp_path / "wal.db")
+    writer = Database(db_name=db_name, journal_mode="WAL", synchronous="NORMAL")
+    habit_id = writer.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+    writer.add_streak_to_table(habit_id, datetime(2024, 10, 1))
+
+    reader = Database(db_name=db_name, read_only=True)
+    with pytest.raises(sqlite3.OperationalError):
+        reader.add_habit_to_table(Habit("Do yoga", "Connect to your inner self", "weekly"))
+
+    # Keep a write transaction open, WAL still lets the readers see the last committed state.
+    writer.conn.execute("INSERT INTO tracking (habit_id, checkoff_date, checkoff_ts) VALUES (?, '2024-10-02', 0)",
+                        (habit_id,))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(Analyse(reader).get_longest_streak_daily()))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.conn.commit()
+
+    assert results == [(["Go for a walk"], 1)] * 4
+    reader.close()
+    writer.close()
@@ -1,7 +1,10 @@
 import pytest
+import sqlite3
+import threading
 from habit import Habit
-from db import Database
+from db import ROLLUP_ROWS_SQL, Database, SCHEMA_VERSION
 from datetime import datetime
+from profiling import Profiler
 
 
 # Test suite for database-related functionality
@@ -111,7 +114,7 @@ class TestDatabase:
 
     def test_get_all_checkoff_dates(self, setup_db):
         # Ensure that all checkoff dates for a habit can be retrieved.
-        habit = Habit("Get your checkoff_dates", "all of them", "weekly")
+        habit = Habit("Get your checkoff_dates", "all of them", "daily") # One checkoff per day is allowed
         habit_id = setup_db.add_habit_to_table(habit)
 
         # Add multiple checkoff dates
@@ -136,4 +139,398 @@ class TestDatabase:
 
         # Fetch and verify the habit's ID
         fetched_id = setup_db.get_habit_id("Get your habit by ID")
-        assert fetched_id == habit_id, "The fetched habit ID does not match the inserted habit ID."
\ No newline at end of file
+        assert fetched_id == habit_id, "The fetched habit ID does not match the inserted habit ID."
+
+    def test_get_all_habits_with_checkoff_dates(self, setup_db):
+        # Ensure that habits and their checkoff dates are loaded with a single query.
+        habit_1 = Habit("Do yoga", "Connect to your inner self", "weekly")
+        habit_2 = Habit("Go for a walk", "Get some air", "daily")
+        habit_id1 = setup_db.add_habit_to_table(habit_1)
+        setup_db.add_habit_to_table(habit_2)
+
+        checkoff_dates = [datetime(2024, 10, 1), datetime(2024, 10, 8, 9, 15)]
+        for date in checkoff_dates:
+            setup_db.add_streak_to_table(habit_id1, date)
+
+        # Count the statements executed while loading all habits.
+        statements = []
+        setup_db.conn.set_trace_callback(statements.append)
+        habits = setup_db.get_all_habits()
+        setup_db.conn.set_trace_callback(None)
+
+        assert len(statements) == 1
+        assert habits[0]['checkoff_dates'] == checkoff_dates
+        assert habits[1]['checkoff_dates'] == [] # Habit without checkoff dates
+
+    def test_migrate_existing_database(self, tmp_path, caplog):
+        # Ensure that a database created with the original schema is upgraded in place.
+        db_path = str(tmp_path / "old.db")
+        conn = sqlite3.connect(db_path)
+        conn.executescript("""
+            CREATE TABLE habits (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, description TEXT,
+                                 periodicity TEXT, creation_date DATE);
+            CREATE TABLE tracking (id INTEGER PRIMARY KEY AUTOINCREMENT, habit_id INTEGER, checkoff_date DATE,
+                                   FOREIGN KEY (habit_id) REFERENCES habits(id));
+            INSERT INTO habits (name, description, periodicity, creation_date)
+            VALUES ('Do yoga', 'Connect to your inner self', 'weekly', '2024-08-28 00:00:00'),
+                   ('do yoga', 'A duplicate in another case', 'weekly', '2024-08-28 00:00:00');
+            INSERT INTO tracking (habit_id, checkoff_date)
+            VALUES (1, '2024-09-02 00:00:00'), (1, '2024-09-09'), (1, '2024-09-10 08:00:00');
+        """)
+        conn.close()
+
+        db = Database(db_name=db_path)
+        assert db.get_schema_version() == SCHEMA_VERSION
+        indexes = [row[0] for row in db.conn.execute("SELECT name FROM sqlite_master WHERE type='index'")]
+        assert "idx_habits_name" in indexes
+        assert "idx_tracking_habit_ts" in indexes
+
+        # Existing dates are kept except a second one in the same week, which is archived and reported,
+        # and the duplicate name was renamed.
+        assert db.get_all_checkoff_dates(1) == [datetime(2024, 9, 2), datetime(2024, 9, 9)]
+        assert db.conn.execute("SELECT habit_id, checkoff_date FROM tracking_duplicates").fetchall() == [
+            (1, '2024-09-10 08:00:00')]
+        assert "Moved 1 checkoffs" in caplog.text
+        assert db.get_habit_id("do yoga (2)") == 2
+        assert db.get_streak_state(1).current == 2 # The streak cache was filled from the existing rows
+
+        # Deleting a habit cascades to its checkoff dates.
+        db.delete_habit_from_table(1)
+        assert db.conn.execute("SELECT COUNT(*) FROM tracking").fetchone()[0] == 0
+
+        # Reopening an upgraded database does not run the migrations again.
+        db.conn.close()
+        assert Database(db_name=db_path).get_schema_version() == SCHEMA_VERSION
+
+    def test_reopen_skips_schema_creation(self, tmp_path):
+        # Ensure that opening a current database only reads the schema version.
+        db_path = str(tmp_path / "current.db")
+        Database(db_name=db_path).close()
+
+        profiler = Profiler()
+        db = Database(db_name=db_path, profiler=profiler)
+        assert [stat['sql'] for stat in profiler.snapshot()['statements']
+                if not stat['sql'].startswith("PRAGMA foreign_keys")] == ["PRAGMA user_version"]
+        db.close()
+
+    def test_habit_names_are_unique_ignoring_case(self, setup_db):
+        # Ensure that name lookups ignore case and are backed by the unique index.
+        setup_db.add_habit_to_table(Habit("Do yoga", "Connect to your inner self", "weekly"))
+        assert setup_db.check_habit_exists("DO YOGA") is True
+        assert setup_db.get_habit_id("do yoga") == 1
+
+        with pytest.raises(sqlite3.IntegrityError):
+            setup_db.add_habit_to_table(Habit("do YOGA", "Same habit again", "weekly"))
+
+        plan = setup_db.conn.execute("EXPLAIN QUERY PLAN SELECT id FROM habits "
+                                     "WHERE name = ? COLLATE NOCASE", ("do yoga",)).fetchall()
+        assert "idx_habits_name" in plan[0][3]
+
+    def test_checkoff_dates_stored_as_integers(self, setup_db):
+        # Ensure that checkoff dates are stored as integer timestamps, also for rows inserted by SQL scripts.
+        habit_id = setup_db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+        setup_db.add_streak_to_table(habit_id, datetime(2024, 10, 2, 7, 30))
+        setup_db.conn.execute("INSERT INTO tracking (habit_id, checkoff_date) VALUES (?, '2024-10-01')", (habit_id,))
+
+        rows = setup_db.conn.execute("SELECT checkoff_ts FROM tracking ORDER BY id").fetchall()
+        assert rows == [(1727854200,), (1727740800,)]
+        assert setup_db.get_all_checkoff_dates(habit_id) == [datetime(2024, 10, 1), datetime(2024, 10, 2, 7, 30)]
+
+    def test_compact_dates(self):
+        # Ensure that the compact storage mode keeps only the integer column.
+        db = Database(db_name=":memory:", compact_dates=True)
+        habit_id = db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+        db.add_streak_to_table(habit_id, datetime(2024, 10, 2))
+
+        row = db.conn.execute("SELECT checkoff_date, checkoff_ts FROM tracking").fetchone()
+        assert row == (None, 1727827200)
+        assert db.get_all_checkoff_dates(habit_id) == [datetime(2024, 10, 2)]
+
+    def test_add_streaks_bulk(self, setup_db):
+        # Ensure that checkoff dates can be imported in bulk with the same periodicity check as checkoff_habit.
+        daily_id = setup_db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+        weekly_id = setup_db.add_habit_to_table(Habit("Do yoga", "Connect to your inner self", "weekly"))
+        setup_db.add_streak_to_table(daily_id, datetime(2024, 10, 1, 8))
+
+        checkoffs = [
+            (daily_id, datetime(2024, 10, 1, 20)), # Rejected: already checked off that day
+            (daily_id, datetime(2024, 10, 2)),
+            (daily_id, datetime(2024, 10, 3)),
+            (weekly_id, datetime(2024, 10, 1)),
+            (weekly_id, datetime(2024, 10, 3)), # Rejected: same week
+            (weekly_id, datetime(2024, 10, 8)),
+            (999, datetime(2024, 10, 8)) # Rejected: unknown habit
+        ]
+        inserted, rejected = setup_db.add_streaks_bulk((checkoff for checkoff in checkoffs), chunk_size=2)
+
+        assert (inserted, rejected) == (4, 3)
+        assert setup_db.get_all_checkoff_dates(daily_id) == [datetime(2024, 10, 1, 8), datetime(2024, 10, 2),
+                                                             datetime(2024, 10, 3)]
+        assert setup_db.get_all_checkoff_dates(weekly_id) == [datetime(2024, 10, 1), datetime(2024, 10, 8)]
+
+    def test_add_streaks_bulk_rolls_back_on_error(self, setup_db):
+        # Ensure that a failing import does not leave a partial result behind.
+        habit_id = setup_db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+
+        def interrupted_import():
+            yield habit_id, datetime(2024, 10, 1)
+            yield habit_id, datetime(2024, 10, 2)
+            raise RuntimeError("Import interrupted")
+
+        with pytest.raises(RuntimeError):
+            setup_db.add_streaks_bulk(interrupted_import(), chunk_size=1)
+        assert setup_db.get_all_checkoff_dates(habit_id) == []
+
+    def test_add_streaks_bulk_keeps_transaction_without_streak_row(self, setup_db, monkeypatch):
+        # Ensure that recomputing a missing streak row does not commit a bulk import halfway through.
+        habit_id = setup_db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+        setup_db.conn.execute("DELETE FROM streaks WHERE habit_id = ?", (habit_id,))
+        setup_db.conn.commit()
+        update_streak_state = setup_db.update_streak_state
+
+        def interrupted_update(*args):
+            update_streak_state(*args) # Recomputes and saves the missing streak row first
+            raise RuntimeError("Import interrupted")
+
+        monkeypatch.setattr(setup_db, "update_streak_state", interrupted_update)
+        with pytest.raises(RuntimeError):
+            setup_db.add_streaks_bulk([(habit_id, datetime(2024, 10, 1)), (habit_id, datetime(2024, 10, 2))])
+        assert setup_db.get_all_checkoff_dates(habit_id) == []
+
+    def test_get_habit(self, setup_db):
+        # Ensure that a stored habit can be loaded as a Habit object.
+        habit = Habit("Go for a walk", "Get some air", "daily")
+        habit_id = setup_db.add_habit_to_table(habit)
+        setup_db.add_streak_to_table(habit_id, datetime(2024, 10, 1))
+
+        loaded = setup_db.get_habit(habit_id)
+        assert loaded.get_name() == "Go for a walk"
+        assert loaded.get_creation_date() == habit.get_creation_date().replace(microsecond=0)
+        assert loaded.get_checkoff_dates() == [datetime(2024, 10, 1)]
+        assert setup_db.get_habit(999) is None
+
+    def test_streak_cache(self, setup_db):
+        # Ensure that the cached streak follows new checkoffs and is recomputed for back-dated ones.
+        habit_id = setup_db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+        assert setup_db.get_streak_state(habit_id).current == 0
+
+        for day in [1, 2, 3, 6, 7]:
+            setup_db.add_streak_to_table(habit_id, datetime(2024, 10, day))
+        state = setup_db.get_streak_state(habit_id)
+        assert (state.current, state.longest) == (2, 3)
+
+        # A back-dated checkoff closes the gap before the current run.
+        setup_db.add_streak_to_table(habit_id, datetime(2024, 10, 5))
+        setup_db.add_streak_to_table(habit_id, datetime(2024, 10, 4))
+        state = setup_db.get_streak_state(habit_id)
+        assert (state.current, state.longest) == (7, 7)
+
+        # Rows added by SQL scripts drop the cached state, which is recomputed on the next read.
+        setup_db.conn.execute("INSERT INTO tracking (habit_id, checkoff_date) VALUES (?, '2024-10-08')", (habit_id,))
+        assert setup_db.get_all_streaks()[0]['current_streak'] == 8
+
+    def test_streak_cache_after_bulk_import(self, setup_db):
+        # Ensure that a bulk import in any order updates the cached streak like a full recompute.
+        habit_id = setup_db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+        for day in [1, 2, 5]:
+            setup_db.add_streak_to_table(habit_id, datetime(2024, 10, day))
+
+        setup_db.add_streaks_bulk([(habit_id, datetime(2024, 10, day)) for day in [9, 6, 8, 5, 7, 12]])
+        state = setup_db.get_streak_state(habit_id)
+        assert (state.current, state.longest) == (1, 5)
+
+        # A back-dated import joins the runs before the current one.
+        setup_db.add_streaks_bulk([(habit_id, datetime(2024, 10, day)) for day in [11, 3, 4, 10]])
+        state = setup_db.get_streak_state(habit_id)
+        assert (state.current, state.longest) == (12, 12)
+
+    def test_iter_habits_and_checkoffs(self, setup_db):
+        # Ensure that habits and checkoff dates can be streamed in small batches.
+        habit_id1 = setup_db.add_habit_to_table(Habit("Do yoga", "Connect to your inner self", "weekly"))
+        habit_id2 = setup_db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+        setup_db.add_habit_to_table(Habit("Do exercises", "Strengthen your body", "daily"))
+        setup_db.add_streak_to_table(habit_id2, datetime(2024, 10, 2))
+        setup_db.add_streak_to_table(habit_id1, datetime(2024, 10, 1))
+        setup_db.add_streak_to_table(habit_id2, datetime(2024, 10, 1, 9))
+
+        habits = setup_db.iter_habits(batch_size=1)
+        assert next(habits)['name'] == "Do yoga" # Rows are produced lazily
+        assert [habit['name'] for habit in habits] == ["Go for a walk", "Do exercises"]
+
+        habits = list(setup_db.iter_habits(include_checkoffs=True, batch_size=1))
+        assert [habit['checkoff_dates'] for habit in habits] == [
+            [datetime(2024, 10, 1)], [datetime(2024, 10, 1, 9), datetime(2024, 10, 2)], []]
+
+        assert list(setup_db.iter_checkoffs(batch_size=2)) == [
+            (habit_id1, datetime(2024, 10, 1)), (habit_id2, datetime(2024, 10, 1, 9)),
+            (habit_id2, datetime(2024, 10, 2))]
+        assert list(setup_db.iter_checkoffs(habit_id1)) == [(habit_id1, datetime(2024, 10, 1))]
+
+    def test_iter_streaks_recomputes_missing_entries(self, setup_db):
+        # Ensure that missing streak cache entries are recomputed while streaming the streaks.
+        for name in ["Go for a walk", "Do exercises"]:
+            habit_id = setup_db.add_habit_to_table(Habit(name, "", "daily"))
+            setup_db.conn.execute("INSERT INTO tracking (habit_id, checkoff_date) VALUES (?, '2024-10-01')",
+                                  (habit_id,))
+
+        streaks = list(setup_db.iter_streaks(batch_size=1))
+        assert [streak['current_streak'] for streak in streaks] == [1, 1]
+        assert setup_db.conn.execute("SELECT COUNT(*) FROM streaks").fetchone()[0] == 2
+
+    def test_get_habit_names(self, setup_db):
+        # Ensure that habit names can be filtered by periodicity and checkoffs with index lookups.
+        habit_id1 = setup_db.add_habit_to_table(Habit("Do yoga", "Connect to your inner self", "weekly"))
+        habit_id2 = setup_db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+        setup_db.add_habit_to_table(Habit("Do exercises", "Strengthen your body", "daily"))
+        setup_db.add_streak_to_table(habit_id1, datetime(2024, 10, 1))
+        setup_db.add_streak_to_table(habit_id2, datetime(2024, 10, 1))
+
+        assert setup_db.get_habit_names() == ["Do yoga", "Go for a walk", "Do exercises"]
+        assert setup_db.get_habit_names(checked_off=True) == ["Do yoga", "Go for a walk"]
+        assert setup_db.get_habit_names("daily") == ["Go for a walk", "Do exercises"]
+        assert setup_db.get_habit_names("daily", checked_off=False) == ["Do exercises"]
+        assert setup_db.get_habit_names("weekly", checked_off=False) == []
+
+        plan = setup_db.conn.execute("EXPLAIN QUERY PLAN SELECT name FROM habits h WHERE "
+                                     "EXISTS (SELECT 1 FROM tracking t WHERE t.habit_id = h.id)").fetchall()
+        assert any(step[3].startswith("SEARCH t USING COVERING INDEX") for step in plan)
+
+    def test_habit_cache(self, setup_db):
+        # Ensure that repeated lookups skip SQLite and that changes invalidate the cached entries.
+        habit_id = setup_db.add_habit_to_table(Habit("Do yoga", "Connect to your inner self", "weekly"))
+        assert setup_db.get_habit_id("Do yoga") == habit_id
+        assert setup_db.get_habit_info(habit_id)['periodicity'] == "weekly"
+
+        statements = []
+        setup_db.conn.set_trace_callback(statements.append)
+        assert setup_db.get_habit_id("DO YOGA") == habit_id
+        assert setup_db.check_habit_exists("do yoga") is True
+        assert setup_db.get_habit_info(habit_id)['name'] == "Do yoga"
+        setup_db.conn.set_trace_callback(None)
+        assert statements == []
+        assert setup_db.cache_info()['names'].hits == 2
+        assert setup_db.cache_info()['habits'].hits == 1
+
+        setup_db.update_habit_in_table(habit_id, "Do more yoga", "Stretch")
+        assert setup_db.get_habit_id("Do yoga") is None
+        assert setup_db.get_habit_id("Do more yoga") == habit_id
+        assert setup_db.get_habit_info(habit_id)['description'] == "Stretch"
+
+        setup_db.delete_habit_from_table(habit_id)
+        assert setup_db.get_habit_id("Do more yoga") is None
+        assert setup_db.get_habit_info(habit_id) is None
+
+    def test_cache_size_options(self, tmp_path):
+        # Ensure that cache_size reaches the SQLite pragma and metadata_cache_size sizes the LRU caches.
+        db = Database(db_name=str(tmp_path / "cache.db"), cache_size=-8000, metadata_cache_size=16)
+        assert db.conn.execute("PRAGMA cache_size").fetchone()[0] == -8000
+        assert db.cache_info()['habits'].maxsize == 16
+        db.close()
+
+        with pytest.raises(ValueError):
+            Database(db_name=":memory:", metadata_cache_size=0)
+
+    def test_cache_invalidated_after_commit(self, tmp_path):
+        # Ensure that a read from another thread between a change and its commit does not leave stale entries.
+        db = Database(db_name=str(tmp_path / "race.db"))
+        read_id = db.add_habit_to_table(Habit("Read", "Ten pages", "daily"))
+        run_id = db.add_habit_to_table(Habit("Run", "Five kilometres", "daily"))
+
+        def read_before_commit(statement):
+            if statement == "COMMIT":
+                reader = threading.Thread(target=lambda: (db.get_habit_info(read_id), db.get_habit_id("Read"),
+                                                          db.get_habit_id("Run")))
+                reader.start()
+                reader.join()
+
+        db.conn.set_trace_callback(read_before_commit)
+        db.update_habit_in_table(read_id, "Read more", "Twenty pages")
+        db.delete_habit_from_table(run_id)
+        db.conn.set_trace_callback(None)
+
+        assert db.get_habit_info(read_id)['name'] == "Read more"
+        assert db.get_habit_id("Read") is None
+        assert db.get_habit_id("Run") is None
+        db.close()
+
+    def test_checkoff_periods_are_unique(self, setup_db):
+        # Ensure that every period can only be checked off once, which makes bulk imports idempotent.
+        habit_id = setup_db.add_habit_to_table(Habit("Do yoga", "Connect to your inner self", "weekly"))
+        assert setup_db.add_streak_to_table(habit_id, datetime(2024, 10, 1)) is True
+        assert setup_db.add_streak_to_table(habit_id, datetime(2024, 10, 6)) is False # Same ISO week
+
+        checkoffs = [(habit_id, datetime(2024, 9, 17)), (habit_id, datetime(2024, 9, 24)),
+                     (habit_id, datetime(2024, 9, 25)), (habit_id, datetime(2024, 10, 8))]
+        assert setup_db.add_streaks_bulk(checkoffs) == (3, 1)
+        assert setup_db.add_streaks_bulk(checkoffs) == (0, 4) # Importing again adds nothing
+        state = setup_db.get_streak_state(habit_id)
+        assert (state.current, state.longest) == (4, 4)
+
+        # Plain SQL inserts get their period from the trigger and hit the same constraint.
+        with pytest.raises(sqlite3.IntegrityError):
+            setup_db.conn.execute("INSERT INTO tracking (habit_id, checkoff_date) VALUES (?, '2024-10-09')",
+                                  (habit_id,))
+
+    def test_rollups_are_maintained(self, setup_db):
+        # Ensure that checkoffs and deletions update the rollups like a full rebuild would.
+        def rollups():
+            return sorted(setup_db.conn.execute("SELECT * FROM rollups").fetchall())
+
+        walk_id = setup_db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+        yoga_id = setup_db.add_habit_to_table(Habit("Do yoga", "Connect to your inner self", "weekly"))
+        setup_db.add_streak_to_table(walk_id, datetime(2024, 10, 2))
+        setup_db.add_streak_to_table(walk_id, datetime(2024, 10, 1)) # Back-dated, puts 2024-10-02 on a streak
+        setup_db.add_streaks_bulk([(walk_id, datetime(2024, 10, 7)), (yoga_id, datetime(2024, 9, 24)),
+                                   (yoga_id, datetime(2024, 10, 3))])
+        assert setup_db.get_rollups("daily")[1:3] == [
+            {'period': 19997, 'date': datetime(2024, 10, 1), 'checkoffs': 1, 'active_habits': 1, 'habits_on_streak': 0},
+            {'period': 19998, 'date': datetime(2024, 10, 2), 'checkoffs': 1, 'active_habits': 1, 'habits_on_streak': 1}]
+        setup_db.add_streaks_bulk([(walk_id, datetime(2024, 9, 30))]) # Small imports are rolled up habit by habit
+        assert rollups() == sorted(setup_db.conn.execute(ROLLUP_ROWS_SQL).fetchall())
+
+        setup_db.delete_habit_from_table(yoga_id)
+        assert rollups() == sorted(setup_db.conn.execute(ROLLUP_ROWS_SQL).fetchall())
+        assert [week['checkoffs'] for week in setup_db.get_rollups("weekly")] == [3, 1]
+
+    def test_rollups_rebuilt_after_sql_script(self, setup_db):
+        # Ensure that rows from plain SQL invalidate the rollups, which are rebuilt on the next read.
+        habit_id = setup_db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+        setup_db.add_streak_to_table(habit_id, datetime(2024, 10, 1))
+        setup_db.conn.execute("INSERT INTO tracking (habit_id, checkoff_date) VALUES (?, '2024-10-02')", (habit_id,))
+        assert setup_db.rollups_stale()
+
+        setup_db.add_streak_to_table(habit_id, datetime(2024, 10, 3)) # Left for the rebuild
+        assert [day['habits_on_streak'] for day in setup_db.get_rollups()] == [0, 1, 1]
+        assert not setup_db.rollups_stale()
+
+    def test_checkoff_date_ranges_and_pages(self, setup_db):
+        # Ensure that checkoffs are fetched by date range and paged by their (habit_id, date) key.
+        walk_id = setup_db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+        yoga_id = setup_db.add_habit_to_table(Habit("Do yoga", "Connect to your inner self", "weekly"))
+        read_id = setup_db.add_habit_to_table(Habit("Read the newspaper", "Stay informed", "daily"))
+        setup_db.add_streaks_bulk([(walk_id, datetime(2024, 9, day)) for day in (28, 29, 30)] +
+                                  [(walk_id, datetime(2024, 10, day, 8)) for day in (1, 2, 31)] +
+                                  [(yoga_id, datetime(2024, 10, 3)), (read_id, datetime(2024, 10, 5))])
+
+        october = (datetime(2024, 10, 1), datetime(2024, 11, 1))
+        assert setup_db.get_checkoff_dates(walk_id, *october) == [datetime(2024, 10, 1, 8), datetime(2024, 10, 2, 8),
+                                                                 datetime(2024, 10, 31, 8)]
+        assert setup_db.get_checkoff_dates(walk_id, end=datetime(2024, 9, 30)) == [datetime(2024, 9, 28),
+                                                                                   datetime(2024, 9, 29)]
+
+        pages, key = [], None
+        while True:
+            checkoffs, key = setup_db.get_checkoffs_page(None, *october, after=key, limit=2)
+            pages.append(checkoffs)
+            if key is None:
+                break
+        assert pages == [[(walk_id, datetime(2024, 10, 1, 8)), (walk_id, datetime(2024, 10, 2, 8))],
+                         [(walk_id, datetime(2024, 10, 31, 8)), (yoga_id, datetime(2024, 10, 3))],
+                         [(read_id, datetime(2024, 10, 5))]]
+
+        # Selected habits only, and a page that exactly fits has no next key.
+        assert setup_db.get_checkoffs_page([read_id, yoga_id], *october, limit=2) == (
+            [(yoga_id, datetime(2024, 10, 3)), (read_id, datetime(2024, 10, 5))], None)
+        assert setup_db.get_checkoffs_page([], *october) == ([], None)
+        with pytest.raises(ValueError):
+            setup_db.get_checkoffs_page(None, *october, limit=0)
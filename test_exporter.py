@@ -0,0 +1,78 @@
+import csv
+import json
+import pytest
+from datetime import datetime, timedelta
+from db import Database
+from exporter import export_file, read_columnar
+from habit import Habit
+from importer import import_file
+from periods import to_timestamp
+
+
+# Fixture that creates a database with two habits and a few checkoffs.
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "export.db"))
+    db.add_habit_to_table(Habit("Read", "Ten pages", "daily"))
+    db.add_habit_to_table(Habit("Run", None, "weekly"))
+    db.add_streaks_bulk([(1, datetime(2024, 5, 1) + timedelta(days=day)) for day in range(5)] +
+                        [(2, datetime(2024, 5, 1, 18, 30))])
+    yield db
+    db.close()
+
+# Test that a CSV export can be imported into a new database with the same data.
+def test_csv_round_trip(db, tmp_path):
+    path = str(tmp_path / "habits.csv")
+    report = export_file(db, path)
+    assert (report['habits'], report['checkoffs'], report['last_tracking_id']) == (2, 6, 6)
+
+    with open(path, newline="") as csv_file:
+        rows = list(csv.DictReader(csv_file))
+    assert rows[0]['name'] == "Read" and rows[0]['date'] == ""
+    assert rows[-1] == {'name': "Run", 'description': "", 'periodicity': "", 'creation_date': "",
+                        'date': "2024-05-01 18:30:00"}
+
+    copy = Database(str(tmp_path / "copy.db"))
+    import_file(copy, path)
+    assert copy.get_habit_names() == ["Read", "Run"]
+    assert copy.get_all_checkoff_dates(2) == [datetime(2024, 5, 1, 18, 30)]
+    assert copy.get_streak_state(1).current == 5
+    copy.close()
+
+# Test that a named incremental export only writes the rows added since its last run.
+def test_export_since_last(db, tmp_path):
+    first = str(tmp_path / "first.ndjson")
+    assert export_file(db, first, export_name="nightly")['checkoffs'] == 6
+
+    db.add_habit_to_table(Habit("Swim", "", "weekly"))
+    db.add_streak_to_table(1, datetime(2024, 5, 6))
+    db.add_streak_to_table(3, datetime(2024, 5, 6))
+    second = str(tmp_path / "second.ndjson")
+    report = export_file(db, second, export_name="nightly")
+    assert (report['habits'], report['checkoffs']) == (1, 2)
+    with open(second) as ndjson_file:
+        assert [json.loads(line) for line in ndjson_file] == [
+            {'name': "Swim", 'description': "", 'periodicity': "weekly",
+             'creation_date': db.get_habit_info(3)['creation_date']},
+            {'name': "Read", 'date': "2024-05-06 00:00:00"}, {'name': "Swim", 'date': "2024-05-06 00:00:00"}]
+
+    assert export_file(db, str(tmp_path / "third.ndjson"), export_name="nightly")['checkoffs'] == 0
+    assert export_file(db, str(tmp_path / "full.ndjson"))['checkoffs'] == 8 # Other exports are not affected
+
+# Test that the columnar format is written in blocks and read back with the same values.
+def test_columnar_round_trip(db, tmp_path):
+    path = str(tmp_path / "habits.hcol")
+    export_file(db, path, batch_size=4)
+
+    blocks = list(read_columnar(path))
+    assert [(kind, len(block['id'])) for kind, block in blocks] == [("habits", 2), ("checkoffs", 4), ("checkoffs", 2)]
+    assert blocks[0][1]['name'] == ["Read", "Run"]
+    assert blocks[0][1]['description'] == ["Ten pages", None]
+    timestamps = blocks[1][1]['checkoff_ts'] + blocks[2][1]['checkoff_ts']
+    assert timestamps[-1] == to_timestamp(datetime(2024, 5, 1, 18, 30))
+    assert blocks[2][1]['habit_id'] == [1, 2]
+
+    with open(str(tmp_path / "not.hcol"), "wb") as other:
+        other.write(b"something else")
+    with pytest.raises(ValueError):
+        list(read_columnar(str(tmp_path / "not.hcol")))
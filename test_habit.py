@@ -81,4 +81,52 @@ def test_streak_weekly(sample_habits):
     assert habit.streak() == 3
 
     habit.checkoff_habit(base_week + timedelta(weeks=5)) # Skip week 4
-    assert habit.streak() == 1 # Streak breaks due to missed checkoff
\ No newline at end of file
+    assert habit.streak() == 1 # Streak breaks due to missed checkoff
+
+# Test that the longest streak is found even if a later run is shorter.
+def test_longest_streak(sample_habits):
+    habit = sample_habits[2]
+    base_date = datetime(2024, 10, 1)
+    for i in [0, 1, 2, 3, 5, 6]: # Run of four days, gap, run of two days
+        habit.checkoff_habit(base_date + timedelta(days=i))
+
+    assert habit.streak() == 2
+    assert habit.longest_streak() == 4
+    assert habit.streak_stats().runs == [(19997, 20000), (20002, 20003)]
+
+# Test that weekly streaks continue across the turn of the year, including years with 53 ISO weeks.
+def test_streak_weekly_across_years(sample_habits):
+    habit = sample_habits[0]
+    habit.checkoff_habit(datetime(2020, 12, 21)) # Week 52 of 2020
+    habit.checkoff_habit(datetime(2021, 1, 4)) # Week 1 of 2021, week 53 of 2020 was skipped
+    assert habit.streak() == 1
+
+    habit.checkoff_habit(datetime(2020, 12, 28)) # Back-dated checkoff for week 53
+    assert habit.streak() == 3
+
+# Test that the streak kept up to date by checkoff_habit matches a full recomputation.
+def test_streak_state_follows_checkoffs(sample_habits):
+    habit = sample_habits[1]
+    base_date = datetime(2024, 10, 1)
+    for i in [0, 1, 2, 4, 5, 3, 8]: # Includes a back-dated checkoff that joins two runs
+        habit.checkoff_habit(base_date + timedelta(days=i))
+        state = habit.get_streak_state()
+        assert (state.current, state.longest) == (habit.streak_stats().current, habit.streak_stats().longest)
+
+    assert habit.longest_streak() == 6
+    assert habit.streak() == 1
+
+    habit.checkoff_dates = [] # Assigning new dates resets the streak
+    assert habit.streak() == 0
+
+# Test that a checkoff is rejected in any period that is already checked off, not only the latest one.
+def test_checkoff_habit_rejects_duplicate_periods(sample_habits):
+    daily = sample_habits[1]
+    assert daily.checkoff_habit(datetime(2024, 10, 1, 8)) is True
+    assert daily.checkoff_habit(datetime(2024, 10, 3)) is True
+    assert daily.checkoff_habit(datetime(2024, 10, 1, 20)) is False # Back-dated to an already checked off day
+
+    weekly = sample_habits[0]
+    assert weekly.checkoff_habit(datetime(2024, 10, 1)) is True # Week 40 of 2024
+    assert weekly.checkoff_habit(datetime(2023, 10, 3)) is True # Week 40 of 2023 is another week
+    assert weekly.checkoff_habit(datetime(2024, 10, 6)) is False # Sunday of week 40 of 2024
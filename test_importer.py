@@ -0,0 +1,113 @@
+import pytest
+from datetime import datetime
+from analyse import Analyse
+from db import Database
+from importer import file_fingerprint, import_file, import_records, read_sql_records, split_sql_statements
+
+
+# Fixture that creates an empty database.
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "import.db"))
+    yield db
+    db.close()
+
+# Test that the example SQL script is imported once, however often it is loaded.
+def test_import_example_sql(db):
+    report = import_file(db, "example_habit.sql")
+    assert (report['records'], report['habits'], report['checkoffs']) == (70, 5, 65)
+    assert report['rows_per_sec'] > 0
+
+    report = import_file(db, "example_habit.sql") # Loading it again reads everything but adds nothing
+    assert (report['resumed_from'], report['records'], report['checkoffs'], report['skipped']) == (0, 70, 0, 65)
+
+    analyse = Analyse(db)
+    assert db.conn.execute("SELECT COUNT(*) FROM habits").fetchone()[0] == 5
+    assert analyse.get_longest_streak_daily() == (["Do exercises"], 28)
+    assert analyse.get_longest_streak_by_name("Go for a walk") == ("Go for a walk", 12)
+
+# Test that statements are split across lines and comments, and unsupported statements are rejected.
+def test_read_sql_records():
+    script = ["-- habits\n", "INSERT INTO habits (name, periodicity) VALUES\n", "('Read', 'daily');\n",
+              "/* checkoffs */ INSERT INTO tracking (habit_id, checkoff_date) VALUES (1, '2024-05-01'), (2, 'x');\n"]
+    assert list(split_sql_statements(script))[0] == "INSERT INTO habits (name, periodicity) VALUES\n('Read', 'daily');\n"
+    assert list(read_sql_records(script)) == [
+        {'name': 'Read', 'description': None, 'periodicity': 'daily', 'creation_date': None},
+        {'name': 'Read', 'date': '2024-05-01'}, {'name': None, 'date': 'x'}]
+
+    with pytest.raises(ValueError):
+        list(read_sql_records(["DELETE FROM habits;\n"]))
+
+# Test CSV and NDJSON files and the natural-key upsert of habits.
+def test_import_csv_and_ndjson(db, tmp_path):
+    habits = tmp_path / "habits.csv"
+    habits.write_text("name,description,periodicity,creation_date\n"
+                      "Read,Ten pages,daily,2024-05-01 00:00:00\nRun,,weekly,\n")
+    checkoffs = tmp_path / "checkoffs.ndjson"
+    checkoffs.write_text('{"name": "read", "date": "2024-05-01"}\n\n{"name": "Read", "date": "2024-05-02T08:00:00"}\n'
+                         '{"name": "Read", "date": "2024-05-02"}\n{"name": "Swim", "date": "2024-05-02"}\n'
+                         '{"name": "Read", "description": "Twenty pages", "periodicity": "weekly"}\n')
+
+    assert import_file(db, str(habits))['habits'] == 2
+    report = import_file(db, str(checkoffs))
+    assert (report['habits'], report['checkoffs'], report['skipped'], report['rejected']) == (1, 2, 1, 1)
+
+    info = db.get_habit_info(1)
+    assert (info['description'], info['periodicity']) == ("Twenty pages", "daily") # Periodicity is kept
+    assert db.get_streak_state(1).current == 2
+    assert db.get_habit_names() == ["Read", "Run"]
+
+# Test that creation dates are normalized and records with invalid dates are rejected.
+def test_import_normalizes_dates(db):
+    report = import_records(db, [{'name': 'Read', 'periodicity': 'daily', 'creation_date': '2024-05-01'},
+                                 {'name': 'Run', 'periodicity': 'weekly', 'creation_date': '01.05.2024'},
+                                 {'name': 'Read', 'date': 'yesterday'}, {'name': 'Read', 'date': 20240502}])
+    assert (report['habits'], report['rejected']) == (1, 3)
+    assert db.get_habit_info(1)['creation_date'] == "2024-05-01 00:00:00"
+    assert db.get_habit(1).creation_date == datetime(2024, 5, 1) # Readable by the checkoff menu
+    assert not db.check_habit_exists("Run")
+
+# Test that an interrupted import keeps the committed chunks and resumes after them.
+def test_resume_after_interruption(db):
+    def records(fail_at=None):
+        yield {'name': 'Read', 'periodicity': 'daily'}
+        for day in range(1, 10):
+            if day == fail_at:
+                raise RuntimeError("Interrupted")
+            yield {'name': 'Read', 'date': datetime(2024, 5, day)}
+
+    with pytest.raises(RuntimeError):
+        import_records(db, records(fail_at=6), source="seed", chunk_size=2)
+    assert db.conn.execute("SELECT COUNT(*) FROM tracking").fetchone()[0] == 5 # Three chunks were committed
+
+    report = import_records(db, records(), source="seed", chunk_size=2)
+    assert (report['resumed_from'], report['records'], report['checkoffs']) == (6, 4, 4)
+    assert db.get_streak_state(1).current == 9
+
+    # A complete import leaves nothing to resume, so the next one reads all records again.
+    assert import_records(db, records(), source="seed", chunk_size=2)['resumed_from'] == 0
+
+# Test that a changed file is imported from the beginning instead of resuming at the old position.
+def test_changed_file_is_not_resumed(db, tmp_path):
+    seed = tmp_path / "seed.csv"
+    seed.write_text("name,periodicity\nA,daily\nB,daily\n")
+    db.conn.execute("INSERT INTO import_progress (source, position, updated_ts, fingerprint) VALUES (?, 2, 0, ?)",
+                    (str(seed), file_fingerprint(str(seed))))
+    db.conn.commit()
+
+    seed.write_text("name,periodicity\nC,daily\nD,daily\nE,weekly\n") # Regenerated
+    report = import_file(db, str(seed))
+    assert (report['resumed_from'], report['habits']) == (0, 3)
+    assert db.get_habit_names() == ["C", "D", "E"]
+
+    db.delete_habit_from_table(db.get_habit_id("C"))
+    assert import_file(db, str(seed))['habits'] == 3 # Loading the file again restores the deleted habit
+    assert db.check_habit_exists("C")
+
+# Test that dates with a UTC offset are stored as naive local times.
+def test_import_offset_dates(db):
+    report = import_records(db, [{'name': 'Read', 'periodicity': 'daily'},
+                                 {'name': 'Read', 'date': '2024-05-01T08:00:00Z'}])
+    assert (report['checkoffs'], report['rejected']) == (1, 0)
+    expected = datetime.fromisoformat('2024-05-01T08:00:00+00:00').astimezone().replace(tzinfo=None)
+    assert db.get_all_checkoff_dates(1) == [expected]
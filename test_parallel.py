@@ -0,0 +1,39 @@
+import random
+import pytest
+from datetime import datetime, timedelta
+from analyse import Analyse
+from db import Database
+from habit import Habit
+from parallel import get_id_chunks, parallel_leaderboard
+
+
+# Fixture that creates a database with random checkoff histories, including equal streaks.
+@pytest.fixture
+def db_name(tmp_path):
+    db_name = str(tmp_path / "parallel.db")
+    db = Database(db_name)
+    generator = random.Random(42)
+    checkoffs = []
+    for i in range(40):
+        habit_id = db.add_habit_to_table(Habit(f"Habit {i}", "", "daily" if i % 3 else "weekly"))
+        for day in range(60):
+            if generator.random() < 0.7:
+                checkoffs.append((habit_id, datetime(2024, 1, 1) + timedelta(days=day)))
+    db.add_streaks_bulk(checkoffs)
+    db.close()
+    return db_name
+
+# Test that habit IDs are split into consecutive ranges.
+def test_get_id_chunks(db_name):
+    assert get_id_chunks(db_name, 15) == [(1, 15), (16, 30), (31, 40)]
+
+# Test that the parallel result matches the serial Analyse leaderboard for any chunking.
+@pytest.mark.parametrize("chunk_size, processes", [(7, 0), (40, 0), (5, 2)])
+def test_parallel_leaderboard(db_name, chunk_size, processes):
+    expected = Analyse(Database(db_name)).get_leaderboard(top_k=5)
+    report = parallel_leaderboard(db_name, top_k=5, chunk_size=chunk_size, processes=processes)
+
+    assert report["daily"]["habits"] + report["weekly"]["habits"] == 40
+    for periodicity in ("daily", "weekly"):
+        for key in ("current", "longest", "current_leaders", "longest_leaders"):
+            assert report[periodicity][key] == expected[periodicity][key]
@@ -0,0 +1,36 @@
+from datetime import datetime
+import periods
+from periods import EPOCH, day_index, from_timestamp, from_timestamps, period_index, period_start, to_timestamp
+
+
+# Test that datetimes survive the conversion to integer timestamps and back.
+def test_timestamp_round_trip():
+    date = datetime(2024, 10, 4, 14, 30, 15)
+    assert to_timestamp(date) == 1728052215
+    assert from_timestamp(to_timestamp(date)) == date
+    assert to_timestamp(EPOCH) == 0
+
+# Test that microseconds are dropped like in the TEXT format.
+def test_timestamp_drops_microseconds():
+    assert from_timestamp(to_timestamp(datetime(2024, 10, 4, 14, 30, 15, 999999))) == datetime(2024, 10, 4, 14, 30, 15)
+
+# Test that a batch of timestamps is decoded in order, with and without the vectorized path.
+def test_from_timestamps(monkeypatch):
+    dates = [datetime(2024, 10, 1), datetime(2024, 10, 4, 14, 30), datetime(2024, 10, 7, 8, 45, 30)]
+    timestamps = [to_timestamp(date) for date in dates]
+    assert from_timestamps(timestamps) == dates
+
+    monkeypatch.setattr(periods, "VECTORIZE_THRESHOLD", 0)
+    assert from_timestamps(timestamps) == dates
+
+# Test that day numbers count whole days since the epoch.
+def test_day_index():
+    assert day_index(EPOCH) == 0
+    assert day_index(datetime(1970, 1, 2, 23, 59)) == 1
+    assert day_index(datetime(2024, 10, 1)) == to_timestamp(datetime(2024, 10, 1)) // periods.SECONDS_PER_DAY
+
+# Test that the first day of a period maps back to the same period.
+def test_period_start():
+    assert period_start(day_index(datetime(2024, 10, 4)), "daily") == datetime(2024, 10, 4)
+    assert period_start(period_index(datetime(2024, 10, 4), "weekly"), "weekly") == datetime(2024, 9, 30) # Monday
+    assert period_start(0, "weekly") == datetime(1969, 12, 29)
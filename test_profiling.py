@@ -0,0 +1,69 @@
+import json
+import pytest
+from datetime import datetime, timedelta
+from analyse import Analyse
+from db import Database
+from habit import Habit
+from profiling import Profiler
+
+
+# Fixture that creates a profiled database with a few habits.
+@pytest.fixture
+def profiler_db(tmp_path):
+    profiler = Profiler()
+    db = Database(str(tmp_path / "profiled.db"), profiler=profiler)
+    for i in range(3):
+        habit_id = db.add_habit_to_table(Habit(f"Habit {i}", "", "daily"))
+        db.add_streaks_bulk((habit_id, datetime(2024, 1, 1) + timedelta(days=day)) for day in range(i + 1))
+    profiler.reset()
+    yield profiler, db
+    db.close()
+
+# Test that statements are grouped with their call and row counts, including rows fetched lazily.
+def test_statement_stats(profiler_db):
+    profiler, db = profiler_db
+    for habit_id in (1, 2, 3):
+        db.get_all_checkoff_dates(habit_id)
+
+    statements = profiler.snapshot()['statements']
+    checkoffs = [stat for stat in statements if stat['sql'].startswith("SELECT checkoff_ts FROM tracking")]
+    assert len(checkoffs) == 1
+    assert checkoffs[0]['calls'] == 3
+    assert checkoffs[0]['rows'] == 1 + 2 + 3
+    assert checkoffs[0]['seconds'] >= checkoffs[0]['max_seconds'] > 0
+
+# Test that the instrumented functions are only timed while the profiler is active.
+def test_function_stats(profiler_db):
+    profiler, db = profiler_db
+    analyse = Analyse(db)
+    analyse.get_leaderboard()
+    assert profiler.snapshot()['functions'] == []
+
+    with profiler:
+        analyse.get_longest_streak_daily()
+        db.get_habit(3).streak()
+    analyse.get_leaderboard()
+
+    functions = {stat['function']: stat['calls'] for stat in profiler.snapshot()['functions']}
+    assert functions == {"Analyse.get_longest_streak_daily": 1, "Analyse.get_longest_current_streak": 1,
+                         "Analyse.get_leaderboard": 1, "Habit.streak": 1}
+
+# Test the JSON and Prometheus exports.
+def test_exports(profiler_db):
+    profiler, db = profiler_db
+    with profiler:
+        Analyse(db).get_all_stored_habits()
+
+    snapshot = json.loads(profiler.to_json())
+    assert snapshot['functions'][0]['function'] == "Analyse.get_all_stored_habits"
+
+    metrics = profiler.to_prometheus()
+    assert "# TYPE habit_sql_statement_calls_total counter" in metrics
+    assert 'habit_function_calls_total{function="Analyse.get_all_stored_habits"} 1' in metrics
+    assert 'habit_sql_statement_rows_total{statement="SELECT name FROM habits' in metrics
+
+# Test that a database without profiler uses plain sqlite3 connections.
+def test_disabled_by_default(tmp_path):
+    db = Database(str(tmp_path / "plain.db"))
+    assert type(db.conn).__name__ == "Connection"
+    db.close()
@@ -0,0 +1,62 @@
+import os
+import pytest
+import sqlite3
+from datetime import datetime
+from habit import Habit
+from shards import ShardedDatabase
+
+
+# Fixture that stores habits of three users in a sharded database.
+@pytest.fixture
+def sharded(tmp_path):
+    sharded = ShardedDatabase(str(tmp_path), shard_count=4, max_open=2)
+    for user, days in [("alice", 3), ("bob", 5), ("carol/c", 3)]:
+        with sharded.lease(user) as db:
+            habit_id = db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+            db.add_streaks_bulk([(habit_id, datetime(2024, 10, 1 + day)) for day in range(days)])
+    yield sharded
+    sharded.close()
+
+# Test that users are routed to stable shards and get their own database file.
+def test_routing(sharded):
+    assert sharded.get_shard("alice") == sharded.get_shard("alice")
+    assert os.path.exists(sharded.get_path("carol/c")) # User IDs are quoted for the file name
+    with sharded.lease_analyse("bob") as analyse:
+        assert analyse.get_longest_streak_daily() == (["Go for a walk"], 5)
+
+# Test that only max_open databases are kept open.
+def test_lru(sharded):
+    assert list(sharded.open_databases) == ["bob", "carol/c"]
+    with sharded.lease("bob"):
+        pass
+    with sharded.lease("alice"):
+        pass
+    assert list(sharded.open_databases) == ["bob", "alice"]
+
+# Test that a leased handle is only closed once it is idle, and that a closed handle does not reopen.
+def test_leased_handle_is_not_closed(sharded):
+    with sharded.lease("bob") as db:
+        streaks = db.iter_streaks(batch_size=1)
+        next(streaks)
+        for user in ["alice", "carol/c"]:
+            with sharded.lease(user):
+                pass
+        assert list(sharded.open_databases) == ["bob", "carol/c"]
+        assert len(list(streaks)) == 0 # The generator still reads from the open handle
+
+        with sharded.lease("carol/c"), sharded.lease("alice"):
+            assert list(sharded.open_databases) == ["bob", "carol/c", "alice"] # Leased handles exceed max_open
+        assert list(sharded.open_databases) == ["bob", "carol/c"] # Alice was released first
+
+    # A handle closed while it is leased raises instead of quietly reopening a connection.
+    with sharded.lease("bob") as db:
+        sharded.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        db.get_all_habits()
+
+# Test that the leaderboard merges all shards with a deterministic order of ties.
+@pytest.mark.parametrize("processes", [0, 2])
+def test_get_leaderboard(sharded, processes):
+    leaderboard = sharded.get_leaderboard(top_k=2, processes=processes)
+    assert leaderboard["daily"]["current"] == [("bob", "Go for a walk", 5), ("alice", "Go for a walk", 3)]
+    assert leaderboard["daily"]["longest"] == [("bob", "Go for a walk", 5), ("alice", "Go for a walk", 3)]
@@ -0,0 +1,55 @@
+import pytest
+from datetime import datetime
+from db import Database
+from habit import Habit
+from store import HabitStore
+
+
+# Fixture that creates a database with three habits and loads it into a HabitStore.
+@pytest.fixture
+def store():
+    db = Database(db_name=":memory:")
+    habit_id1 = db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+    db.add_habit_to_table(Habit("Do exercises", "Strengthen your body", "daily"))
+    habit_id3 = db.add_habit_to_table(Habit("Do yoga", "Connect to your inner self", "weekly"))
+
+    db.add_streaks_bulk([(habit_id1, datetime(2024, 10, day, 8, 30)) for day in [1, 2, 3, 5]])
+    db.add_streaks_bulk([(habit_id3, datetime(2024, 10, day)) for day in [1, 8, 22]])
+    return HabitStore.from_database(db)
+
+# Test that every habit points to its own slice of the shared checkoff buffer.
+def test_from_database(store):
+    assert len(store) == 3
+    assert [record.name for record in store] == ["Go for a walk", "Do exercises", "Do yoga"]
+    assert list(store.get_days(1)) == [19997, 19998, 19999, 20001]
+    assert list(store.get_days(2)) == []
+    assert list(store.get_days(3)) == [19997, 20004, 20018]
+    assert store.nbytes() == 7 * store.days.itemsize
+    assert store.get_record(99) is None
+
+# Test that streaks computed on day numbers match the Habit view.
+def test_streak_stats(store):
+    for habit_id in (1, 2, 3):
+        habit = store.get_habit(habit_id)
+        stats = store.streak_stats(habit_id)
+        assert (stats.current, stats.longest) == (habit.streak(), habit.longest_streak())
+    assert store.streak_stats(1).longest == 3
+    assert store.streak_stats(3).current == 1
+
+# Test that the Habit view still supports checking off.
+def test_get_habit(store):
+    habit = store.get_habit(1)
+    assert habit.get_checkoff_dates()[0] == datetime(2024, 10, 1) # The time of day is not stored
+    assert habit.checkoff_habit(datetime(2024, 10, 5, 20)) is False
+    assert habit.checkoff_habit(datetime(2024, 10, 6)) is True
+    assert habit.streak() == 2
+    assert store.get_habit(99) is None
+
+# Test that the Habit view keeps the stored creation date.
+def test_get_habit_creation_date():
+    db = Database(db_name=":memory:")
+    habit_id = db.add_habit_to_table(Habit("Go for a walk", "Get some air", "daily"))
+    db.conn.execute("UPDATE habits SET creation_date = '2024-09-30 12:00:00' WHERE id = ?", (habit_id,))
+    store = HabitStore.from_database(db)
+    assert store.get_habit(habit_id).get_creation_date() == datetime(2024, 9, 30, 12)
+    assert store.get_habit(habit_id).get_creation_date() == db.get_habit(habit_id).get_creation_date()
@@ -0,0 +1,49 @@
+import pytest
+import streak
+from streak import StreakState, compute_streaks, compute_streaks_vectorized, streaks_for_dates
+from datetime import datetime
+
+
+# Test that runs, current and longest streak are computed from sorted period numbers.
+def test_compute_streaks():
+    stats = compute_streaks([1, 2, 2, 3, 7, 8, 10])
+    assert stats.runs == [(1, 3), (7, 8), (10, 10)]
+    assert stats.current == 1
+    assert stats.longest == 3
+
+# Test that an empty history has no streak.
+def test_compute_streaks_empty():
+    assert compute_streaks([]) == (0, 0, [])
+
+# Test that checkoff dates in any order are mapped to periods before computing streaks.
+def test_streaks_for_dates():
+    dates = [datetime(2024, 10, 3), datetime(2024, 10, 1), datetime(2024, 10, 2, 23, 59)]
+    assert streaks_for_dates(dates, "daily").current == 3
+    assert streaks_for_dates(dates, "weekly").current == 1
+
+# Test that the NumPy implementation returns the same result as the plain Python pass.
+def test_compute_streaks_vectorized(monkeypatch):
+    pytest.importorskip("numpy")
+    periods = [1, 2, 2, 3, 7, 8, 10, 11, 12, 13]
+    assert compute_streaks_vectorized(periods) == compute_streaks(periods)
+    assert compute_streaks_vectorized([]) == (0, 0, [])
+
+    monkeypatch.setattr(streak, "VECTORIZE_THRESHOLD", 0)
+    assert compute_streaks(periods).longest == 4
+
+# Test that the streak state is updated in place and asks for a recompute for back-dated periods.
+def test_streak_state_add():
+    state = StreakState()
+    for period in [5, 6, 6, 7, 9]:
+        assert state.add(period) is True
+    assert (state.run_start, state.current, state.longest, state.last_period) == (9, 1, 3, 9)
+
+    assert state.add(10) is True
+    assert state.current == 2
+    assert state.add(9) is True # Already part of the current run
+    assert state.add(8) is False # Before the current run, needs a recompute
+
+# Test that the state created from full statistics matches the incremental one.
+def test_streak_state_from_stats():
+    assert StreakState.from_stats(compute_streaks([5, 6, 7, 9, 10])) == StreakState(9, 2, 3, 10)
+    assert StreakState.from_stats(compute_streaks([])) == StreakState()